@@ -0,0 +1,92 @@
+import json
+import os
+import re
+
+import numpy as np
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from src import FIdash
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "tests", "fixtures", "banxico"
+)
+
+# --- Mbono pricing constants, as in cpp_engine ---
+
+VN = 100
+DPP = 182
+YB = 360
+
+
+class RecordedBanxicoAdapter(BaseAdapter):
+    """Serves recorded Banxico `/datos/oportuno` responses without a network."""
+
+    SERIES_URL = re.compile(r"/series/(?P<ids>[^/]+)/datos/oportuno")
+
+    def __init__(self):
+        super().__init__()
+        with open(os.path.join(FIXTURES_DIR, "oportuno.json"), encoding="utf-8") as f:
+            series = json.load(f)["bmx"]["series"]
+        self.series = {s["idSerie"]: s for s in series}
+
+    def send(self, request, **kwargs):
+        match = self.SERIES_URL.search(request.url)
+        ids = match.group("ids").split(",") if match else []
+
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response._content = json.dumps(
+            {"bmx": {"series": [self.series[i] for i in ids if i in self.series]}}
+        ).encode("utf-8")
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def recorded_fetcher(monkeypatch):
+    monkeypatch.setenv("BANXICO_API_KEY", os.getenv("BANXICO_API_KEY") or "bench")
+    monkeypatch.setenv("BANXICO_SNAPSHOT_TTL", "0")
+    # the recorded upstream needs no protection, measure the pipeline only
+    monkeypatch.setenv("BANXICO_RATE_LIMIT", "1e9")
+    monkeypatch.setenv("BANXICO_RATE_BURST", "1000000")
+    monkeypatch.delenv("BANXICO_SNAPSHOT_PATH", raising=False)
+
+    fetcher = FIdash.BanxicoDataFetcher()
+    adapter = RecordedBanxicoAdapter()
+    fetcher.session.mount("https://", adapter)
+    fetcher.session.mount("http://", adapter)
+    return fetcher
+
+
+@pytest.fixture
+def recorded_data(recorded_fetcher):
+    return recorded_fetcher.call_api()
+
+
+def generate_bonds(n, seed=42):
+
+    # consistent Mbono inputs: prices are repriced from random yields
+    rng = np.random.default_rng(seed)
+
+    ylds = rng.uniform(4, 12, n)
+    coups = rng.integers(10, 24, n) / 2
+    dtms = rng.integers(1, 10950, n)
+
+    K = (dtms - 1) // DPP + 1
+    rem = DPP - dtms % DPP
+    d = np.where(rem == DPP, 0, rem)
+
+    R = 0.01 * ylds * DPP / YB
+    C = VN * (DPP * 0.01 * coups) / YB
+    pxs = (C + C * (1 / R - 1 / (R * (1 + R) ** (K - 1))) + VN / (1 + R) ** (K - 1)) / (
+        1 + R
+    ) ** (1 - d / DPP) - C * d / DPP
+
+    return pxs.round(6).tolist(), dtms.tolist(), coups.tolist()
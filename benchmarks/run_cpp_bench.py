@@ -0,0 +1,131 @@
+"""
+Builds and runs the C++ price_to_yield microbenchmark, stores the results
+under .benchmarks/cpp/ keyed by commit and compares them with the previous
+stored run.
+
+usage: python -m benchmarks.run_cpp_bench [--threshold 0.1] [--variant name]
+       [n_bonds ...]
+
+Every kernel variant the CPU supports is timed unless --variant is given.
+Exits with status 1 if any batch size and variant got slower than the
+threshold.
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = [
+    "cpp_engine/benchmarks/bench_price_to_yield.cpp",
+    "cpp_engine/price_to_yield.cpp",
+    "cpp_engine/dispatch.cpp",
+]
+BINARY = "cpp_engine/benchmarks/bench_price_to_yield"
+RESULTS_DIR = os.path.join(PROJECT_ROOT, ".benchmarks", "cpp")
+
+
+def build():
+    subprocess.run(
+        # the release profile of setup.py
+        ["g++", "-std=c++17", "-O3", "-DNDEBUG", "-flto=auto", *SOURCES, "-o", BINARY],
+        cwd=PROJECT_ROOT,
+        check=True,
+    )
+
+
+def run(sizes, variants=()):
+    variant_args = [arg for v in variants for arg in ("--variant", v)]
+    result = subprocess.run(
+        [os.path.join(PROJECT_ROOT, BINARY), "--json", *variant_args, *map(str, sizes)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [json.loads(line) for line in result.stdout.splitlines() if line]
+
+
+def commit_id():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_results():
+    runs = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), key=os.path.getmtime)
+    if not runs:
+        return None
+    with open(runs[-1]) as f:
+        return json.load(f)
+
+
+def compare(previous, current, threshold):
+
+    # returns the (variant, batch size) pairs that got slower than the
+    # threshold, runs stored before kernel variants count as baseline
+    def key(r):
+        return r.get("variant", "baseline"), r["n_bonds"]
+
+    before = {key(r): r["ns_per_bond"] for r in previous["results"]}
+    regressions = []
+
+    print(f"\nComparison with {previous['commit']}:")
+    for r in current["results"]:
+        if key(r) not in before:
+            continue
+        change = r["ns_per_bond"] / before[key(r)] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f" | {key(r)[0]:>8} | {r['n_bonds']:>8} bonds | {change:+.1%} {flag}")
+        if change > threshold:
+            regressions.append(key(r))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("sizes", nargs="*", type=int, default=[10, 10_000, 1_000_000])
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--variant", action="append", default=[])
+    args = parser.parse_args(argv)
+
+    build()
+    previous = previous_results()
+
+    current = {
+        "commit": commit_id(),
+        "timestamp": time.time(),
+        "results": run(args.sizes, args.variant),
+    }
+    for r in current["results"]:
+        print(
+            f" | {r['variant']:>8} | {r['n_bonds']:>8} bonds"
+            f" | median {r['median_ms']:.3f} ms"
+            f" | {r['ns_per_bond']:.0f} ns/bond | invalid {r['invalid']}"
+        )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(
+        RESULTS_DIR, f"{int(current['timestamp'])}_{current['commit']}.json"
+    )
+    with open(path, "w") as f:
+        json.dump(current, f, indent=2)
+
+    if previous is not None and compare(previous, current, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import pytest
+
+from src import FIdash
+from src import app as app_module
+from src import wire
+from src.banxico_stream import SeriesData
+from src.derived import DerivedSeriesEngine
+from src.downsample import downsample_rows
+from src.history import HistoryStore, HistoryStoreCache, resolve_date
+from src.rolling import RollingAnalytics
+from tests.banxico_stub import BanxicoStubServer
+
+COMPARE_DATES = ("latest", "1W", "1M", "1Y")
+
+
+@pytest.fixture(scope="module")
+def history_store():
+
+    # twenty years of synthetic daily history from the local stub
+    with BanxicoStubServer() as stub, pytest.MonkeyPatch.context() as mp:
+        mp.setenv("BANXICO_API_KEY", "bench")
+        mp.setenv("BANXICO_API_URL", stub.url)
+        mp.setenv("BANXICO_RATE_LIMIT", "1e9")
+        return HistoryStore().fetch(
+            FIdash.BanxicoDataFetcher(), "2005-01-01", "2025-10-27"
+        )
+
+
+def test_curves_asof(benchmark, history_store):
+    benchmark.group = "history"
+    dates = [resolve_date(x, history_store.latest) for x in COMPARE_DATES]
+
+    curves = benchmark(history_store.curves, dates)
+
+    assert len(curves) == len(COMPARE_DATES)
+
+
+def test_api_curves_route(benchmark, history_store, monkeypatch, tmp_path):
+    benchmark.group = "history"
+    path = str(tmp_path / "history.npz")
+    history_store.save(path)
+    monkeypatch.setattr(app_module, "history_cache", HistoryStoreCache(path))
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        response = benchmark(client.get, "/api/curves?dates=" + ",".join(COMPARE_DATES))
+
+    assert response.status_code == 200
+
+
+def test_derived_full_history(benchmark, history_store):
+    benchmark.group = "derived"
+
+    engine = benchmark(lambda: DerivedSeriesEngine().update(history_store))
+
+    assert len(engine.dates) == len(history_store)
+
+
+def test_derived_append_day(benchmark, history_store):
+    benchmark.group = "derived"
+    base = HistoryStore(
+        history_store.dates[:-1], history_store.series_ids, history_store.values[:-1]
+    )
+    last_day = {
+        s: SeriesData(history_store.dates[-1:], history_store.values[-1:, i])
+        for i, s in enumerate(history_store.series_ids)
+    }
+
+    def append_day(store, engine):
+        engine.update(store.merge(last_day))
+
+    def setup():
+        store = HistoryStore(base.dates, base.series_ids, base.values)
+        return (store, DerivedSeriesEngine().update(store)), {}
+
+    benchmark.pedantic(append_day, setup=setup, rounds=10)
+
+
+def test_rolling_stats_cold_window(benchmark, history_store):
+    benchmark.group = "rolling"
+    analytics = RollingAnalytics().update(history_store)
+
+    def setup():
+        analytics.sums.clear()
+        analytics.cache.clear()
+        return ("10 Years", 252), {}
+
+    stats = benchmark.pedantic(analytics.stats, setup=setup, rounds=20)
+
+    assert len(stats["mean"]) == len(history_store)
+
+
+def test_rolling_stats_cached(benchmark, history_store):
+    benchmark.group = "rolling"
+    analytics = RollingAnalytics().update(history_store)
+    analytics.stats("10 Years", 252)
+
+    benchmark(analytics.stats, "10 Years", 252)
+
+
+def test_downsample_twenty_years(benchmark, history_store):
+    benchmark.group = "downsample"
+    engine = DerivedSeriesEngine().update(history_store)
+    _, values = engine.series()
+
+    rows = benchmark(downsample_rows, list(values.values()), 800)
+
+    # bounded by the chart width, not the length of history
+    assert len(rows) <= 800 * len(values)
+
+
+@pytest.mark.parametrize("media_type", [wire.JSON, wire.NPZ, wire.MSGPACK, wire.ARROW])
+def test_api_derived_wire_format(
+    benchmark, history_store, media_type, monkeypatch, tmp_path
+):
+    # twenty years of every derived series, encode time and bytes per format
+    if media_type not in wire.available_formats():
+        pytest.skip(f"{media_type} support is not installed")
+
+    benchmark.group = "wire"
+    path = str(tmp_path / "history.npz")
+    history_store.save(path)
+    monkeypatch.setattr(app_module, "history_cache", HistoryStoreCache(path))
+    monkeypatch.setattr(app_module, "derived_engine", None)
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        url = "/api/derived?start=2005-01-01"
+        client.get(url)
+        response = benchmark(client.get, url, headers={"Accept": media_type})
+
+    assert response.status_code == 200
+    benchmark.extra_info["bytes"] = len(response.data)
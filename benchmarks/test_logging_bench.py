@@ -0,0 +1,83 @@
+import logging
+import time
+
+import pytest
+
+from src import app as app_module
+from src import logging_config
+
+# (level, format, asynchronous), the first one is the original synchronous setup
+LOGGING_MODES = {
+    "sync-debug-text": ("DEBUG", "text", False),
+    "async-debug-json": ("DEBUG", "json", True),
+    "async-info-json": ("INFO", "json", True),
+}
+
+
+class PipeStream:
+    """
+    File stream with a fixed latency per write, like stderr piped to a busy
+    log collector.
+    """
+
+    def __init__(self, stream, latency=1e-4):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, data):
+        time.sleep(self.latency)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+@pytest.fixture(params=["file", "pipe"])
+def log_sink(request, tmp_path):
+    with open(tmp_path / "app.log", "w", encoding="utf-8") as stream:
+        yield stream if request.param == "file" else PipeStream(stream)
+
+
+@pytest.fixture(params=list(LOGGING_MODES))
+def logging_mode(request, log_sink):
+
+    # log to the sink as a stand-in for stderr, without pytest's capture handlers
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    root.handlers = []
+
+    level, fmt, asynchronous = LOGGING_MODES[request.param]
+    logging_config.configure_logging(level, fmt, asynchronous, log_sink)
+    yield request.param
+
+    if logging_config.active_async_logging is not None:
+        logging_config.active_async_logging.stop()
+
+    root.handlers = saved_handlers
+    root.setLevel(saved_level)
+    logging_config.installed_handler = None
+    logging_config.active_async_logging = None
+
+
+def test_fi_dashboard_logging(benchmark, logging_mode, recorded_fetcher, monkeypatch):
+    benchmark.group = "logging"
+    monkeypatch.setattr(app_module, "banxico_data_fetcher", recorded_fetcher)
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        response = benchmark(client.get, "/fi_dashboard")
+
+    assert response.status_code == 200
+
+
+def test_log_call_throughput(benchmark, logging_mode):
+    benchmark.group = "logging-calls"
+    logger = logging.getLogger("src.FIdash")
+
+    def emit():
+        for i in range(100):
+            logger.debug("Fetching cetes yield data.")
+            logger.info("Retrieved data from Banxico API successfully.")
+            logger.debug("Banxico connection stats: %s", {"requests": i})
+
+    benchmark(emit)
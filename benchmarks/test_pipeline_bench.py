@@ -0,0 +1,146 @@
+import os
+
+import pytest
+
+import cpp_engine
+from cpp_engine import _numpy_engine
+from benchmarks.conftest import generate_bonds
+from src import app as app_module
+
+# the 1M bond solve takes minutes, only run it when asked to
+LARGE = pytest.mark.skipif(
+    not os.getenv("BENCHMARK_LARGE"), reason="set BENCHMARK_LARGE=1 to run"
+)
+
+
+# --- pipeline stages ---
+
+
+def test_clean_returned_data(benchmark, recorded_fetcher, recorded_data):
+    benchmark.group = "pipeline"
+    benchmark(
+        recorded_fetcher.clean_returned_data,
+        recorded_data["mbonos_px"],
+        recorded_data["mbonos_dtm"],
+        recorded_data["mbonos_coup"],
+    )
+
+
+def test_reorder_data(benchmark, recorded_fetcher, recorded_data):
+    benchmark.group = "pipeline"
+    cleaned = recorded_fetcher.clean_returned_data(
+        recorded_data["mbonos_px"],
+        recorded_data["mbonos_dtm"],
+        recorded_data["mbonos_coup"],
+    )
+    benchmark(recorded_fetcher.reorder_data, *cleaned)
+
+
+def test_prc_to_yld(benchmark, recorded_fetcher, recorded_data):
+    benchmark.group = "pipeline"
+    reordered = recorded_fetcher.reorder_data(
+        *recorded_fetcher.clean_returned_data(
+            recorded_data["mbonos_px"],
+            recorded_data["mbonos_dtm"],
+            recorded_data["mbonos_coup"],
+        )
+    )
+    benchmark(recorded_fetcher.prc_to_yld, *reordered)
+
+
+def test_get_labels_dates_yields(benchmark, recorded_fetcher, recorded_data):
+    benchmark.group = "pipeline"
+    cetes = recorded_fetcher.reorder_data(
+        *recorded_fetcher.clean_returned_data(
+            recorded_data["cetes_yld"], recorded_data["cetes_dtm"]
+        )
+    )
+    pxs, dtms, coups = recorded_fetcher.reorder_data(
+        *recorded_fetcher.clean_returned_data(
+            recorded_data["mbonos_px"],
+            recorded_data["mbonos_dtm"],
+            recorded_data["mbonos_coup"],
+        )
+    )
+    curve = {
+        "cetes": {"ylds": cetes[0], "dtms": cetes[1]},
+        "mbonos": {"ylds": recorded_fetcher.prc_to_yld(pxs, dtms, coups), "dtms": dtms},
+    }
+    benchmark(recorded_fetcher.get_labels_dates_yields, curve)
+
+
+def test_get_data(benchmark, recorded_fetcher):
+    # fetch (recorded, no network), clean, reorder, solve and label
+    benchmark.group = "pipeline"
+    benchmark(recorded_fetcher.get_data)
+
+
+# --- C++ engine ---
+
+
+@pytest.mark.parametrize("n_bonds", [10, 10_000, pytest.param(1_000_000, marks=LARGE)])
+def test_cpp_price_to_yield(benchmark, n_bonds):
+    benchmark.group = "price_to_yield"
+    benchmark.extra_info["n_bonds"] = n_bonds
+    pxs, dtms, coups = generate_bonds(n_bonds)
+
+    yields = benchmark.pedantic(
+        cpp_engine.price_to_yield,
+        args=(pxs, dtms, coups),
+        rounds=1 if n_bonds >= 10_000 else 100,
+        warmup_rounds=0,
+    )
+    assert -1.0 not in yields
+
+
+@pytest.mark.skipif(cpp_engine.BACKEND != "cpp", reason="C++ extension not built")
+@pytest.mark.parametrize("variant", cpp_engine.kernel_variants())
+@pytest.mark.parametrize("n_bonds", [10_000, pytest.param(1_000_000, marks=LARGE)])
+def test_cpp_kernel_variant(benchmark, variant, n_bonds):
+    # the same batch through each instruction set variant of the kernel
+    benchmark.group = f"kernel_variant n_bonds={n_bonds}"
+    benchmark.extra_info["n_bonds"] = n_bonds
+    pxs, dtms, coups = generate_bonds(n_bonds)
+
+    active = cpp_engine.kernel_variant()
+    cpp_engine.set_kernel_variant(variant)
+    try:
+        yields = benchmark.pedantic(
+            cpp_engine.price_to_yield,
+            args=(pxs, dtms, coups),
+            rounds=20 if n_bonds <= 10_000 else 3,
+            warmup_rounds=1,
+        )
+    finally:
+        cpp_engine.set_kernel_variant(active)
+    assert -1.0 not in yields
+
+
+@pytest.mark.parametrize("n_bonds", [10, 10_000, pytest.param(1_000_000, marks=LARGE)])
+def test_numpy_price_to_yield(benchmark, n_bonds):
+    # the fallback used when the C++ extension is not built
+    benchmark.group = "price_to_yield"
+    benchmark.extra_info["n_bonds"] = n_bonds
+    pxs, dtms, coups = generate_bonds(n_bonds)
+
+    yields = benchmark.pedantic(
+        _numpy_engine.price_to_yield,
+        args=(pxs, dtms, coups),
+        rounds=1 if n_bonds >= 10_000 else 100,
+        warmup_rounds=0,
+    )
+    assert -1.0 not in yields
+
+
+# --- full route ---
+
+
+def test_fi_dashboard_render(benchmark, recorded_fetcher, monkeypatch):
+    benchmark.group = "route"
+    monkeypatch.setattr(app_module, "banxico_data_fetcher", recorded_fetcher)
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        response = benchmark(client.get, "/fi_dashboard")
+
+    assert response.status_code == 200
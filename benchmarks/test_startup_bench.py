@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# fresh interpreters, so nothing is cached in sys.modules
+STARTUP_SCRIPTS = {
+    # import the app module, as gunicorn or flask run do
+    "import-app": "import src.app",
+    # import and serve the first page that needs no Banxico data
+    "first-home-page": (
+        "import src.app as m; m.app.test_client().get('/').status_code == 200 or exit(1)"
+    ),
+    # import and build the data subsystem, the previous import-time cost
+    "import-app-and-fetcher": (
+        "import os; os.environ.setdefault('BANXICO_API_KEY', 'bench'); "
+        "import src.app as m; m.get_banxico_data_fetcher()"
+    ),
+}
+
+
+@pytest.mark.parametrize("script", list(STARTUP_SCRIPTS))
+def test_cold_start(benchmark, script):
+    benchmark.group = "startup"
+
+    def run():
+        subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPTS[script]],
+            check=True,
+            capture_output=True,
+            cwd=PROJECT_ROOT,
+            env={"LOG_LEVEL": "WARNING", "PATH": ""},
+        )
+
+    # one run per round, each run is a new process
+    benchmark.pedantic(run, rounds=10, iterations=1, warmup_rounds=1)
+
+
+def test_interpreter_baseline(benchmark):
+    benchmark.group = "startup"
+    benchmark.pedantic(
+        subprocess.run,
+        args=([sys.executable, "-c", "pass"],),
+        kwargs={"check": True, "cwd": PROJECT_ROOT},
+        rounds=10,
+        iterations=1,
+        warmup_rounds=1,
+    )
@@ -1 +1,47 @@
-from ._cpp_engine import *
+import logging
+import os
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+# CPP_ENGINE_BACKEND=numpy forces the NumPy implementation
+BACKEND = os.getenv("CPP_ENGINE_BACKEND", "cpp").lower()
+
+if BACKEND == "cpp":
+    try:
+        from ._cpp_engine import *
+    except ImportError as e:
+        logger.warning("C++ engine unavailable (%s), using the NumPy fallback.", e)
+        BACKEND = "numpy"
+
+if BACKEND == "numpy":
+    from ._numpy_engine import (
+        bondes_discount_margin,
+        kernel_variant,
+        kernel_variants,
+        price_to_yield,
+        price_to_yield_iterations,
+        set_kernel_variant,
+        udibono_price_to_yield,
+        udibono_price_to_yield_iterations,
+    )
+elif BACKEND != "cpp":
+    raise ValueError(f"Unknown CPP_ENGINE_BACKEND: {BACKEND}")
+
+# CPP_ENGINE_KERNEL forces a kernel variant, e.g. baseline to compare against;
+# one this backend or CPU cannot run (any but "numpy" under the NumPy
+# fallback) is ignored rather than failing the import
+KERNEL = os.getenv("CPP_ENGINE_KERNEL", "").lower()
+
+if KERNEL:
+    try:
+        set_kernel_variant(KERNEL)
+    except ValueError:
+        logger.warning(
+            "Ignoring CPP_ENGINE_KERNEL=%s, the %s backend supports %s.",
+            KERNEL,
+            BACKEND,
+            kernel_variants(),
+        )
+
+logger.debug("cpp_engine: %s backend, %s kernels.", BACKEND, kernel_variant())
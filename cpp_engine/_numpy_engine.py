@@ -0,0 +1,183 @@
+"""
+Vectorised NumPy implementation of the C++ engine, used when the extension is
+not built. Functions take and return the same types as the C++ bindings and
+flag failed solves the same way; each Newton iteration runs over the whole
+batch, with converged bonds masked out.
+"""
+
+import numpy as np
+
+VN = 100  # par value
+DPP = 182  # days per Mbono and Udibono coupon period
+YB = 360  # year base (in days)
+FLOATER_DPP = 28  # days per Bondes F coupon period
+
+MAX_ITERS = 10000
+
+# the NumPy engine has a single variant, chosen by NumPy's own dispatch
+KERNEL_VARIANT = "numpy"
+
+
+def round_to(x, dp):
+
+    # round half away from zero, as std::round
+    scaled = np.asarray(x, dtype=float) * 10.0**dp
+    whole = np.trunc(scaled)
+    return (whole + np.where(np.abs(scaled - whole) >= 0.5, np.sign(scaled), 0.0)) / (
+        10.0**dp
+    )
+
+
+def find_k(dtms, dpp=DPP):
+
+    # number of coupon payments left until maturity
+    return (np.asarray(dtms, dtype=np.int64) - 1) // dpp + 1
+
+
+def find_d(dtms, dpp=DPP):
+
+    # days accrued in the current period, 0 on payment dates
+    rem = dpp - np.asarray(dtms, dtype=np.int64) % dpp
+    return np.where(rem == dpp, 0, rem)
+
+
+def px_at_rate(C, R, K, d, dpp=DPP):
+
+    # clean price of coupons C discounted at the per period rate R
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        return (
+            C + C * (1 / R - 1 / (R * (1 + R) ** (K - 1))) + VN / (1 + R) ** (K - 1)
+        ) / (1 + R) ** (1 - d / dpp) - C * d / dpp
+
+
+def px(TC, r, K, d):
+    return px_at_rate(VN * (DPP * 0.01 * TC) / YB, 0.01 * r * DPP / YB, K, d)
+
+
+def f_prime(R, C, K, d, dpp=DPP):
+
+    # derivative of the clean price with respect to the per period rate R
+    e = d / dpp
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        alpha = C * (e - 1) * (1 + R) ** (e - 2)
+        beta = C * ((1 / R) * (e - 1) * (1 + R) ** (e - 2) - (1 + R) ** (e - 1) / R**2)
+        gamma = C * (
+            (1 / R) * (e - K) * (1 + R) ** (e - K - 1) - (1 + R) ** (e - K) / R**2
+        )
+        sigma = VN * (e - K) * (1 + R) ** (e - K - 1)
+    return alpha + beta - gamma + sigma
+
+
+def newton(start, tolerance, step):
+    """
+    Newton iterations over a batch of per period rates from `start`, where
+    `step(R, active)` gives the step of the still active bonds. A bond stops
+    once its step is below `tolerance` or not finite. Returns the rates and
+    the iterations each used.
+    """
+
+    R = start.copy()
+    iterations = np.zeros(len(R), dtype=np.int64)
+    active = np.isfinite(R)
+
+    for _ in range(MAX_ITERS):
+        if not active.any():
+            break
+        iterations[active] += 1
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            R_next = R[active] - step(R[active], active)
+            diff = np.abs(R_next - R[active])
+        R[active] = R_next
+
+        # converged or diverged bonds stop iterating
+        done = ~(diff >= tolerance)
+        active[np.flatnonzero(active)[done]] = False
+
+    return R, iterations
+
+
+def price_to_yield_iterations(prices, dtms, coupons):
+    P = round_to(prices, 6)
+    TC = round_to(coupons, 2)
+    K = find_k(dtms)
+    d = find_d(dtms)
+    C = VN * ((0.01 * TC * DPP) / YB)
+
+    # per period rate R = r * DPP / (100 * YB) for a yield r in percent
+    rate = DPP / (100 * YB)
+
+    def step(R, active):
+        price = px_at_rate(C[active], R, K[active], d[active]) - P[active]
+        return price / f_prime(R, C[active], K[active], d[active])
+
+    # start at the current yield
+    with np.errstate(divide="ignore", invalid="ignore"):
+        start = rate * 100 * ((C * (360.0 / 182.0)) / P)
+    R, iterations = newton(start, 6e-11 * rate, step)
+    yields = R / rate
+
+    # verify by repricing, flagging mismatches greater than 2e-6 as invalid
+    with np.errstate(invalid="ignore"):
+        diff = np.abs(round_to(px(TC, yields, K, d), 6) - P)
+    invalid = ~(diff < 2e-6) | ~np.isfinite(yields)
+    yields = np.where(invalid, -1.0, yields)
+
+    return yields.tolist(), iterations.tolist()
+
+
+def price_to_yield(prices, dtms, coupons):
+    return price_to_yield_iterations(prices, dtms, coupons)[0]
+
+
+def to_udis(prices, udis):
+    prices, udis = np.asarray(prices, dtype=float), np.asarray(udis, dtype=float)
+    if udis.size != 1 and udis.size != prices.size:
+        raise ValueError("udis must hold one value or one per price")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(udis > 0, prices / udis, np.nan)
+
+
+def udibono_price_to_yield_iterations(prices, dtms, coupons, udis=(1.0,)):
+    return price_to_yield_iterations(to_udis(prices, udis), dtms, coupons)
+
+
+def udibono_price_to_yield(prices, dtms, coupons, udis=(1.0,)):
+    return udibono_price_to_yield_iterations(prices, dtms, coupons, udis)[0]
+
+
+def bondes_discount_margin(prices, dtms, coupons):
+    P = round_to(prices, 6)
+    TC = round_to(coupons, 4)
+    K = find_k(dtms, FLOATER_DPP)
+    d = find_d(dtms, FLOATER_DPP)
+    C = VN * (0.01 * TC * FLOATER_DPP) / YB
+
+    def step(R, active):
+        price = px_at_rate(C[active], R, K[active], d[active], FLOATER_DPP)
+        derivative = f_prime(R, C[active], K[active], d[active], FLOATER_DPP)
+        return (price - P[active]) / derivative
+
+    # start at the coupon rate, i.e. a zero margin
+    R, _ = newton(C / VN, 1e-12, step)
+    margins = 100 * (100 * R * YB / FLOATER_DPP - TC)
+
+    # verify by repricing, any margin is a valid quote so failures are NaN
+    R_check = 0.01 * (TC + 0.01 * margins) * FLOATER_DPP / YB
+    with np.errstate(invalid="ignore"):
+        diff = np.abs(round_to(px_at_rate(C, R_check, K, d, FLOATER_DPP), 6) - P)
+    return np.where((diff < 2e-6) & np.isfinite(margins), margins, np.nan).tolist()
+
+
+def kernel_variant():
+    return KERNEL_VARIANT
+
+
+def kernel_variants():
+    return [KERNEL_VARIANT]
+
+
+def set_kernel_variant(name):
+    if name != KERNEL_VARIANT:
+        raise ValueError(f"Unsupported kernel variant: {name}")
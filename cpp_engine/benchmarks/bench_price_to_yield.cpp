@@ -0,0 +1,136 @@
+// Microbenchmark for PriceToYield::price_to_yield.
+//
+// usage: bench_price_to_yield [--json] [--variant name] [n_bonds ...]
+//
+// Times the batched solve for each requested batch size (10, 10k and 1M bonds
+// by default) with each kernel variant the CPU supports (or only --variant)
+// and prints a summary table, or one JSON object per size and variant with
+// --json so results can be stored and compared between commits.
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdlib>
+#include <iostream>
+#include <random>
+#include <string>
+#include <vector>
+
+#include "../dispatch.h"
+#include "../price_to_yield.h"
+
+namespace {
+
+constexpr int DPP = 182;
+constexpr int YB = 360;
+constexpr double MIN_TOTAL_BONDS = 1e4;  // bonds solved per size, at least one rep
+
+struct Inputs {
+    std::vector<double> prices;
+    std::vector<int> dtms;
+    std::vector<double> coupons;
+};
+
+Inputs generate_inputs(size_t n, unsigned seed) {
+    // consistent inputs: prices are repriced from random yields
+    std::mt19937 gen(seed);
+    std::uniform_real_distribution<> dist_r(4, 12);
+    std::uniform_int_distribution<> dist_TC(10, 23);
+    std::uniform_int_distribution<> dist_dtm(1, 10950);
+
+    Inputs inputs;
+    inputs.prices.resize(n);
+    inputs.dtms.resize(n);
+    inputs.coupons.resize(n);
+
+    for (size_t i = 0; i < n; i++) {
+        inputs.coupons[i] = dist_TC(gen) / 2.0;
+        inputs.dtms[i] = dist_dtm(gen);
+    }
+
+    const std::vector<int> K = PriceToYield::find_k(inputs.dtms);
+    const std::vector<int> d = PriceToYield::find_d(inputs.dtms);
+
+    for (size_t i = 0; i < n; i++) {
+        inputs.prices[i] =
+            PriceToYield::round_to(PriceToYield::px(inputs.coupons[i], dist_r(gen), K[i], d[i]), 6);
+    }
+
+    return inputs;
+}
+
+}  // namespace
+
+int main(int argc, char** argv) {
+    using namespace std::chrono;
+
+    bool json = false;
+    std::vector<size_t> sizes;
+    std::vector<std::string> variants;
+
+    for (int i = 1; i < argc; i++) {
+        const std::string arg = argv[i];
+        if (arg == "--json") {
+            json = true;
+        } else if (arg == "--variant" && i + 1 < argc) {
+            variants.push_back(argv[++i]);
+        } else {
+            sizes.push_back(std::strtoul(argv[i], nullptr, 10));
+        }
+    }
+    if (sizes.empty()) {
+        sizes = {10, 10000, 1000000};
+    }
+    if (variants.empty()) {
+        variants = Dispatch::supported_names();
+    }
+
+    if (!json) {
+        std::cout << "\n"
+                  << "price_to_yield microbenchmark" << "\n"
+                  << "==========================================" << "\n";
+    }
+
+    for (const std::string& variant : variants) {
+        Dispatch::set_active(variant);
+
+        for (const size_t n : sizes) {
+            const Inputs inputs = generate_inputs(n, 42);
+            const int reps = std::max(1, static_cast<int>(MIN_TOTAL_BONDS / n));
+
+            std::vector<double> times_ms(reps);
+            int invalid = 0;
+
+            for (int r = 0; r < reps; r++) {
+                const auto start = high_resolution_clock::now();
+                const std::vector<double> yields =
+                    PriceToYield::price_to_yield(inputs.prices, inputs.dtms, inputs.coupons);
+                const auto end = high_resolution_clock::now();
+
+                times_ms[r] = duration_cast<nanoseconds>(end - start).count() / 1e6;
+                invalid = static_cast<int>(std::count(yields.begin(), yields.end(), -1.0));
+            }
+
+            std::sort(times_ms.begin(), times_ms.end());
+            const double min_ms = times_ms.front();
+            const double median_ms = times_ms[reps / 2];
+            const double ns_per_bond = median_ms * 1e6 / n;
+
+            if (json) {
+                std::cout << "{\"variant\": \"" << variant << "\", \"n_bonds\": " << n
+                          << ", \"reps\": " << reps << ", \"min_ms\": " << min_ms
+                          << ", \"median_ms\": " << median_ms
+                          << ", \"ns_per_bond\": " << ns_per_bond << ", \"invalid\": " << invalid
+                          << "}" << "\n";
+            } else {
+                std::cout << " | Variant: " << variant << " | Bonds: " << n << " | Reps: " << reps
+                          << "\n"
+                          << " | Min: " << min_ms << " ms | Median: " << median_ms << " ms" << "\n"
+                          << " | Per bond: " << ns_per_bond << " ns | Invalid: " << invalid << "\n"
+                          << "==========================================" << "\n";
+            }
+        }
+    }
+
+    return 0;
+}
@@ -1,13 +1,57 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include "bondes_f.h"
+#include "dispatch.h"
 #include "price_to_yield.h"
+#include "udibono.h"
 
 namespace py = pybind11;
 
 PYBIND11_MODULE(_cpp_engine, m) {
     m.doc() = "Pybind11 high-performance code for financial models.";
 
+    // inputs are converted while holding the GIL, the solves themselves run
+    // without it so other Python threads keep serving requests
+
     m.def("price_to_yield", &PriceToYield::price_to_yield,
-          "Runs the price-to-yield calculation in C++.");
+          "Runs the price-to-yield calculation in C++.", py::call_guard<py::gil_scoped_release>());
+
+    m.def("price_to_yield_iterations", &PriceToYield::price_to_yield_iterations,
+          "Runs the price-to-yield calculation in C++, also returning the Newton "
+          "iterations used for each bond.",
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("udibono_price_to_yield", &Udibono::price_to_yield,
+          "Runs the Udibono price-to-real-yield calculation in C++. Prices are "
+          "converted from pesos at udis (one value, or one per bond; 1 for "
+          "prices already in UDIs).",
+          py::arg("prices"), py::arg("dtms"), py::arg("coupons"),
+          py::arg("udis") = std::vector<double>{1.0}, py::call_guard<py::gil_scoped_release>());
+
+    m.def("udibono_price_to_yield_iterations", &Udibono::price_to_yield_iterations,
+          "Runs the Udibono price-to-real-yield calculation in C++, also "
+          "returning the Newton iterations used for each bond.",
+          py::arg("prices"), py::arg("dtms"), py::arg("coupons"),
+          py::arg("udis") = std::vector<double>{1.0}, py::call_guard<py::gil_scoped_release>());
+
+    m.def("bondes_discount_margin", &BondesF::discount_margin,
+          "Runs the Bondes F price-to-discount-margin calculation in C++, "
+          "returning margins in bp over the current coupon rate.",
+          py::call_guard<py::gil_scoped_release>());
+
+    // batched kernels are compiled per instruction set, the best one the CPU
+    // supports is selected when the module is loaded
+
+    m.def("kernel_variant", &Dispatch::active_name,
+          "Returns the instruction set variant the batched kernels run "
+          "(baseline, avx2 or avx512).");
+
+    m.def("kernel_variants", &Dispatch::supported_names,
+          "Returns the kernel variants this build and CPU can run.");
+
+    m.def("set_kernel_variant", &Dispatch::set_active,
+          "Forces a kernel variant by name, raising ValueError if it is not "
+          "supported.",
+          py::arg("name"));
 }
@@ -0,0 +1,169 @@
+#include "bondes_f.h"
+
+#include <cmath>
+#include <limits>
+#include <vector>
+
+#include "dispatch.h"
+#include "price_to_yield.h"
+
+namespace BondesF {
+
+const double VN = 100;           // par value in pesos
+const int DPP = 28;              // days per coupon period
+const int YB = 360;              // year base (in days)
+const double PRECISION = 1e-12;  // Newton tolerance of the batched solve
+
+// Bondes F pay the overnight funding rate compounded over each 28 day period.
+// Future coupons are projected at the current coupon rate TC and every cash
+// flow is discounted at TC plus the discount margin dm (in bp).
+
+namespace {
+
+// bodies of the scalar math, inlined into the public functions below and into
+// every kernel variant
+
+CPP_ENGINE_KERNEL_INLINE double px_at_rate_kernel(double C, double R, int K, int d) {
+    // clean price of coupons C discounted at the per period rate R
+    const double price = (C + C * (1 / R - 1 / (R * pow(1 + R, K - 1))) + VN / pow(1 + R, K - 1)) /
+                             pow(1 + R, 1 - 1.0 * d / DPP) -
+                         C * 1.0 * d / DPP;
+    return price;
+}
+
+CPP_ENGINE_KERNEL_INLINE double find_margin_kernel(double TC, int K, int d, double P,
+                                                   int* iterations, double precision) {
+    const double C = VN * (0.01 * TC * DPP) / YB;
+    const double step = 1e-8;  // per period rate bump of the numerical derivative
+
+    // start at the coupon rate, i.e. a zero margin
+    double R_current = C / VN;
+
+    constexpr int MAX_ITERS = 100;
+
+    int i = 0;
+
+    for (; i < MAX_ITERS; i++) {
+        const double f = px_at_rate_kernel(C, R_current, K, d) - P;
+        const double f_prime = (px_at_rate_kernel(C, R_current + step, K, d) -
+                                px_at_rate_kernel(C, R_current - step, K, d)) /
+                               (2 * step);
+        const double R_next = R_current - f / f_prime;
+        const double diff = std::abs(R_next - R_current);
+        R_current = R_next;
+        if (diff < precision) {
+            break;
+        }
+    }
+
+    if (iterations) {
+        *iterations = i + 1;
+    }
+
+    // per period rate back to an annual margin over the coupon rate, in bp
+    return 100 * (100 * R_current * YB / DPP - TC);
+}
+
+CPP_ENGINE_KERNEL_INLINE double px_kernel(double TC, double dm, int K, int d) {
+    const double C = VN * (DPP * 0.01 * TC) / YB;
+    const double R = 0.01 * (TC + 0.01 * dm) * DPP / YB;
+    return px_at_rate_kernel(C, R, K, d);
+}
+
+}  // namespace
+
+double find_margin(double TC, int K, int d, double P, int* iterations, double precision) {
+    return find_margin_kernel(TC, K, d, P, iterations, precision);
+}
+
+std::vector<int> find_k(std::vector<int> dtms) {
+    // this function finds the number of coupon payments left until maturity
+    std::vector<int> k(dtms.size());
+    for (size_t i = 0; i < dtms.size(); i++) {
+        k[i] = (dtms[i] - 1) / DPP + 1;
+    }
+    return k;
+}
+
+std::vector<int> find_d(std::vector<int> dtms) {
+    // this function finds the days accrued in the current period
+    std::vector<int> d(dtms.size());
+    for (size_t i = 0; i < dtms.size(); i++) {
+        d[i] = dtms[i] % DPP == 0 ? 0 : DPP - dtms[i] % DPP;
+    }
+    return d;
+}
+
+double px_at_rate(double C, double R, int K, int d) { return px_at_rate_kernel(C, R, K, d); }
+
+double px(double TC, double dm, int K, int d) { return px_kernel(TC, dm, K, d); }
+
+namespace {
+
+// margins of n bonds, the loop every kernel variant is compiled from, with the
+// Newton solve and repricing inlined into it
+CPP_ENGINE_KERNEL_INLINE void solve(const double* P, const double* TC, const int* K, const int* d,
+                                    double* margins, size_t n) {
+    for (size_t i = 0; i < n; i++) {
+        const double dm = find_margin_kernel(TC[i], K[i], d[i], P[i], nullptr, PRECISION);
+
+        // verify by repricing
+        const double p_check = PriceToYield::round_to_kernel(px_kernel(TC[i], dm, K[i], d[i]), 6);
+        const double diff = std::abs(p_check - P[i]);
+
+        // any margin is a valid quote, so failures are flagged as NaN
+        if (diff >= 2e-6 || std::isnan(dm) || std::isinf(dm)) {
+            margins[i] = std::numeric_limits<double>::quiet_NaN();
+        } else {
+            margins[i] = dm;
+        }
+    }
+}
+
+void solve_baseline(const double* P, const double* TC, const int* K, const int* d, double* margins,
+                    size_t n) {
+    solve(P, TC, K, d, margins, n);
+}
+
+#if CPP_ENGINE_MULTIVERSION
+CPP_ENGINE_TARGET_AVX2 void solve_avx2(const double* P, const double* TC, const int* K,
+                                       const int* d, double* margins, size_t n) {
+    solve(P, TC, K, d, margins, n);
+}
+
+CPP_ENGINE_TARGET_AVX512 void solve_avx512(const double* P, const double* TC, const int* K,
+                                           const int* d, double* margins, size_t n) {
+    solve(P, TC, K, d, margins, n);
+}
+#endif
+
+}  // namespace
+
+std::vector<double> discount_margin(const std::vector<double>& prices, const std::vector<int>& dtms,
+                                    const std::vector<double>& coupons) {
+    std::vector<double> P = PriceToYield::round_to_vec(prices, 6);
+    std::vector<double> TC = PriceToYield::round_to_vec(coupons, 4);
+    std::vector<int> K = find_k(dtms);
+    std::vector<int> d = find_d(dtms);
+
+    std::vector<double> margins(prices.size());
+
+    // compute the margins with the kernel variant of this CPU
+    const size_t n = margins.size();
+    switch (Dispatch::active()) {
+#if CPP_ENGINE_MULTIVERSION
+        case Dispatch::Variant::AVX512:
+            solve_avx512(P.data(), TC.data(), K.data(), d.data(), margins.data(), n);
+            break;
+        case Dispatch::Variant::AVX2:
+            solve_avx2(P.data(), TC.data(), K.data(), d.data(), margins.data(), n);
+            break;
+#endif
+        default:
+            solve_baseline(P.data(), TC.data(), K.data(), d.data(), margins.data(), n);
+    }
+
+    return margins;
+}
+
+}  // namespace BondesF
@@ -0,0 +1,15 @@
+#pragma once
+
+#include <vector>
+
+namespace BondesF {
+double find_margin(double TC, int K, int d, double P, int* iterations = nullptr,
+                   double precision = 1e-12);
+std::vector<int> find_k(std::vector<int> dtms);
+std::vector<int> find_d(std::vector<int> dtms);
+double px_at_rate(double C, double R, int K, int d);
+double px(double TC, double dm, int K, int d);
+std::vector<double> discount_margin(const std::vector<double>& prices, const std::vector<int>& dtms,
+                                    const std::vector<double>& coupons);
+
+}  // namespace BondesF
@@ -0,0 +1,77 @@
+#include "dispatch.h"
+
+#include <atomic>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace Dispatch {
+
+namespace {
+
+Variant detect() {
+    // best variant the CPU supports
+#if CPP_ENGINE_MULTIVERSION
+    __builtin_cpu_init();
+    if (__builtin_cpu_supports("avx512f") && __builtin_cpu_supports("avx512dq") &&
+        __builtin_cpu_supports("avx512vl")) {
+        return Variant::AVX512;
+    }
+    if (__builtin_cpu_supports("avx2") && __builtin_cpu_supports("fma")) {
+        return Variant::AVX2;
+    }
+#endif
+    return Variant::Baseline;
+}
+
+// set once at load, read by every batched call
+std::atomic<Variant> active_variant{detect()};
+
+}  // namespace
+
+std::string name(Variant variant) {
+    switch (variant) {
+        case Variant::AVX2:
+            return "avx2";
+        case Variant::AVX512:
+            return "avx512";
+        default:
+            return "baseline";
+    }
+}
+
+std::vector<Variant> supported() {
+    std::vector<Variant> variants = {Variant::Baseline};
+    const Variant best = detect();
+    if (best == Variant::AVX2 || best == Variant::AVX512) {
+        variants.push_back(Variant::AVX2);
+    }
+    if (best == Variant::AVX512) {
+        variants.push_back(Variant::AVX512);
+    }
+    return variants;
+}
+
+std::vector<std::string> supported_names() {
+    std::vector<std::string> names;
+    for (const Variant variant : supported()) {
+        names.push_back(name(variant));
+    }
+    return names;
+}
+
+Variant active() { return active_variant.load(std::memory_order_relaxed); }
+
+std::string active_name() { return name(active()); }
+
+void set_active(const std::string& variant_name) {
+    for (const Variant variant : supported()) {
+        if (name(variant) == variant_name) {
+            active_variant.store(variant, std::memory_order_relaxed);
+            return;
+        }
+    }
+    throw std::invalid_argument("Unsupported kernel variant: " + variant_name);
+}
+
+}  // namespace Dispatch
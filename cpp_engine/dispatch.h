@@ -0,0 +1,45 @@
+#pragma once
+
+#include <string>
+#include <vector>
+
+// Batched kernels are compiled once per instruction set, and the best one the
+// CPU supports is picked when the module is loaded. Variants other than the
+// baseline are only built with GCC or Clang on x86-64.
+#if (defined(__GNUC__) || defined(__clang__)) && defined(__x86_64__)
+#define CPP_ENGINE_MULTIVERSION 1
+#define CPP_ENGINE_TARGET_AVX2 __attribute__((target("avx2,fma")))
+#define CPP_ENGINE_TARGET_AVX512 __attribute__((target("avx512f,avx512dq,avx512vl,avx2,fma")))
+#else
+#define CPP_ENGINE_MULTIVERSION 0
+#endif
+
+// Math the kernels run is forced inline into each variant, so it is compiled
+// for that variant's instruction set rather than called at baseline.
+#if defined(__GNUC__) || defined(__clang__)
+#define CPP_ENGINE_KERNEL_INLINE inline __attribute__((always_inline))
+#elif defined(_MSC_VER)
+#define CPP_ENGINE_KERNEL_INLINE __forceinline
+#else
+#define CPP_ENGINE_KERNEL_INLINE inline
+#endif
+
+namespace Dispatch {
+
+enum class Variant { Baseline, AVX2, AVX512 };
+
+// variants this build and CPU can run, baseline first
+std::vector<Variant> supported();
+std::vector<std::string> supported_names();
+
+// variant the batched kernels currently run
+Variant active();
+std::string active_name();
+
+// forces a variant by name, throws std::invalid_argument if it is unknown or
+// not supported
+void set_active(const std::string& name);
+
+std::string name(Variant variant);
+
+}  // namespace Dispatch
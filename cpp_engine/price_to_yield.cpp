@@ -3,15 +3,48 @@
 #include <cmath>
 #include <iomanip>
 #include <iostream>
+#include <utility>
 #include <vector>
 
+#include "dispatch.h"
+
 namespace PriceToYield {
 
-const double VN = 100;  // par value in pesos
-const int DPP = 182;    // days per coupon period
-const int YB = 360;     // year base (in days)
+const double VN = 100;           // par value in pesos
+const int DPP = 182;             // days per coupon period
+const int YB = 360;              // year base (in days)
+const double PRECISION = 6e-11;  // Newton tolerance of the batched solve
 
-double find_root(double C, int K, int d, double P, int* iterations, double precision) {
+namespace {
+
+// bodies of the scalar math, inlined into the public functions below and into
+// every kernel variant
+
+CPP_ENGINE_KERNEL_INLINE double f_kernel(double r, double C, int K, int d, double P) {
+    const double R = 0.01 * r * DPP / YB;
+    const double alpha = C / pow((1 + R), 1 - 1.0 * d / DPP);
+    const double beta = C / (R * pow((1 + R), 1 - 1.0 * d / DPP));
+    const double gamma = C / (R * pow((1 + R), K - 1.0 * d / DPP));
+    const double sigma = VN / (pow((1 + R), K - 1.0 * d / DPP));
+
+    return alpha + beta - gamma + sigma - C * d / DPP - P;
+}
+
+CPP_ENGINE_KERNEL_INLINE double f_prime_kernel(double r, double C, int K, int d) {
+    const double R = 0.01 * r * DPP / YB;
+    const double alpha = C * (1.0 * d / DPP - 1) * pow(1 + R, 1.0 * d / DPP - 2);
+    const double beta = C * ((1 / R) * (1.0 * d / DPP - 1) * pow(1 + R, 1.0 * d / DPP - 2) -
+                             (1 / (R * R)) * pow(1 + R, 1.0 * d / DPP - 1));
+    const double gamma = C * ((1 / R) * (1.0 * d / DPP - K) * pow(1 + R, 1.0 * d / DPP - K - 1) -
+                              (1 / (R * R)) * pow(1 + R, 1.0 * d / DPP - K));
+    const double sigma = VN * (1.0 * d / DPP - K) * pow(1 + R, 1.0 * d / DPP - K - 1);
+
+    // dR/dr, with r in percent
+    return (0.01 * DPP / YB) * (alpha + beta - gamma + sigma);
+}
+
+CPP_ENGINE_KERNEL_INLINE double find_root_kernel(double C, int K, int d, double P, int* iterations,
+                                                 double precision) {
     const double r_start =
         100 * ((C * (360.0 / 182.0)) / P);  // set the initial guess to current yield
     double r_current = r_start;
@@ -21,7 +54,8 @@ double find_root(double C, int K, int d, double P, int* iterations, double preci
     int i = 0;
 
     for (; i < MAX_ITERS; i++) {
-        const double r_next = r_current - f(r_current, C, K, d, P) / f_prime(r_current, C, K, d);
+        const double r_next =
+            r_current - f_kernel(r_current, C, K, d, P) / f_prime_kernel(r_current, C, K, d);
         const double diff = std::abs(r_next - r_current);
         if (diff < precision) {
             r_current = r_next;
@@ -37,11 +71,23 @@ double find_root(double C, int K, int d, double P, int* iterations, double preci
     return r_current;
 }
 
-double round_to(double num, int dp) {
-    const double factor = std::pow(10, dp);
-    return std::round(num * factor) / factor;
+CPP_ENGINE_KERNEL_INLINE double px_kernel(double TC, double r, int K, int d) {
+    const double R = 0.01 * r * DPP / YB;
+    const double C = VN * (DPP * 0.01 * TC) / YB;
+    const double price = (C + C * (1 / R - 1 / (R * pow(1 + R, K - 1))) + VN / pow(1 + R, K - 1)) /
+                             pow(1 + R, 1 - 1.0 * d / DPP) -
+                         C * 1.0 * d / DPP;
+    return price;
 }
 
+}  // namespace
+
+double find_root(double C, int K, int d, double P, int* iterations, double precision) {
+    return find_root_kernel(C, K, d, P, iterations, precision);
+}
+
+double round_to(double num, int dp) { return round_to_kernel(num, dp); }
+
 std::vector<double> round_to_vec(std::vector<double> vect, int dp) {
     std::vector<double> rounded_vect(vect.size());
     const double factor = std::pow(10, dp);
@@ -71,39 +117,64 @@ std::vector<int> find_d(std::vector<int> dtms) {
     return d;
 }
 
-double f(double r, double C, int K, int d, double P) {
-    const double R = 0.01 * r * DPP / YB;
-    const double alpha = C / pow((1 + R), 1 - 1.0 * d / DPP);
-    const double beta = C / (R * pow((1 + R), 1 - 1.0 * d / DPP));
-    const double gamma = C / (R * pow((1 + R), K - 1.0 * d / DPP));
-    const double sigma = VN / (pow((1 + R), K - 1.0 * d / DPP));
+double f(double r, double C, int K, int d, double P) { return f_kernel(r, C, K, d, P); }
 
-    return alpha + beta - gamma + sigma - C * d / DPP - P;
+double f_prime(double r, double C, int K, int d) { return f_prime_kernel(r, C, K, d); }
+
+double px(double TC, double r, int K, int d) { return px_kernel(TC, r, K, d); }
+
+namespace {
+
+// yields of n bonds, the loop every kernel variant is compiled from, with the
+// Newton solve and repricing inlined into it
+CPP_ENGINE_KERNEL_INLINE void solve(const double* P, const double* TC, const double* C,
+                                    const int* K, const int* d, double* yields, int* iterations,
+                                    size_t n) {
+    for (size_t i = 0; i < n; i++) {
+        const double yld = find_root_kernel(C[i], K[i], d[i], P[i], &iterations[i], PRECISION);
+
+        // verify by repricing
+        const double p_check = round_to_kernel(px_kernel(TC[i], yld, K[i], d[i]), 6);
+        const double diff = std::abs(p_check - P[i]);
+
+        // if mismatch greater than 2e-6, flag as invalid
+        if (diff >= 2e-6 || std::isnan(yld) || std::isinf(yld)) {
+            yields[i] = -1.0;
+        } else {
+            yields[i] = yld;
+        }
+    }
 }
 
-double f_prime(double r, double C, int K, int d) {
-    const double R = 0.01 * r * DPP / YB;
-    const double alpha = C * (1.0 * d / DPP - 1) * pow(1 + R, 1.0 * d / DPP - 2);
-    const double beta = C * ((1 / R) * (1.0 * d / DPP - 1) * pow(1 + R, 1.0 * d / DPP - 2) -
-                             (1 / (R * R)) * pow(1 + R, 1.0 * d / DPP - 1));
-    const double gamma = C * ((1 / R) * (1.0 * d / DPP - K) * pow(1 + R, 1.0 * d / DPP - K - 1) -
-                              (1 / (R * R)) * pow(1 + R, 1.0 * d / DPP - K));
-    const double sigma = VN * (1.0 * d / DPP - K) * pow(1 + R, 1.0 * d / DPP - K - 1);
+void solve_baseline(const double* P, const double* TC, const double* C, const int* K, const int* d,
+                    double* yields, int* iterations, size_t n) {
+    solve(P, TC, C, K, d, yields, iterations, n);
+}
 
-    return (1.0 * DPP / YB) * (alpha + beta - gamma + sigma);
+#if CPP_ENGINE_MULTIVERSION
+CPP_ENGINE_TARGET_AVX2 void solve_avx2(const double* P, const double* TC, const double* C,
+                                       const int* K, const int* d, double* yields, int* iterations,
+                                       size_t n) {
+    solve(P, TC, C, K, d, yields, iterations, n);
 }
 
-double px(double TC, double r, int K, int d) {
-    const double R = 0.01 * r * DPP / YB;
-    const double C = VN * (DPP * 0.01 * TC) / YB;
-    const double price = (C + C * (1 / R - 1 / (R * pow(1 + R, K - 1))) + VN / pow(1 + R, K - 1)) /
-                             pow(1 + R, 1 - 1.0 * d / DPP) -
-                         C * 1.0 * d / DPP;
-    return price;
+CPP_ENGINE_TARGET_AVX512 void solve_avx512(const double* P, const double* TC, const double* C,
+                                           const int* K, const int* d, double* yields,
+                                           int* iterations, size_t n) {
+    solve(P, TC, C, K, d, yields, iterations, n);
 }
+#endif
+
+}  // namespace
 
 std::vector<double> price_to_yield(const std::vector<double>& prices, const std::vector<int>& dtms,
                                    const std::vector<double>& coupons) {
+    return price_to_yield_iterations(prices, dtms, coupons).first;
+}
+
+std::pair<std::vector<double>, std::vector<int>> price_to_yield_iterations(
+    const std::vector<double>& prices, const std::vector<int>& dtms,
+    const std::vector<double>& coupons) {
     std::vector<double> P = round_to_vec(prices, 6);
     std::vector<double> TC = round_to_vec(coupons, 2);
     std::vector<int> K = find_k(dtms);
@@ -116,23 +187,26 @@ std::vector<double> price_to_yield(const std::vector<double>& prices, const std:
     }
 
     std::vector<double> yields(prices.size());
-
-    // compute the yields
-    for (size_t i = 0; i < yields.size(); i++) {
-        const double yld = find_root(C[i], K[i], d[i], P[i]);
-
-        // verify by repricing
-        const double p_check = round_to(px(TC[i], yld, K[i], d[i]), 6);
-        const double diff = std::abs(p_check - P[i]);
-
-        // if mismatch greater than 2e-6, flag as invalid
-        if (diff >= 2e-6 || std::isnan(yld) || std::isinf(yld)) {
-            yields[i] = -1.0;
-        } else {
-            yields[i] = yld;
-        }
+    std::vector<int> iterations(prices.size());
+
+    // compute the yields with the kernel variant of this CPU
+    const size_t n = yields.size();
+    switch (Dispatch::active()) {
+#if CPP_ENGINE_MULTIVERSION
+        case Dispatch::Variant::AVX512:
+            solve_avx512(P.data(), TC.data(), C.data(), K.data(), d.data(), yields.data(),
+                         iterations.data(), n);
+            break;
+        case Dispatch::Variant::AVX2:
+            solve_avx2(P.data(), TC.data(), C.data(), K.data(), d.data(), yields.data(),
+                       iterations.data(), n);
+            break;
+#endif
+        default:
+            solve_baseline(P.data(), TC.data(), C.data(), K.data(), d.data(), yields.data(),
+                           iterations.data(), n);
     }
 
-    return yields;
+    return {yields, iterations};
 }
 }  // namespace PriceToYield
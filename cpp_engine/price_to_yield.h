@@ -1,8 +1,12 @@
 #pragma once
 
+#include <cmath>
 #include <string>
+#include <utility>
 #include <vector>
 
+#include "dispatch.h"
+
 namespace PriceToYield {
 double find_root(double C, int K, int d, double P, int* iterations = nullptr,
                  double precision = 6e-11);
@@ -14,6 +18,15 @@ double f(double r, double C, int K, int d, double P);
 double f_prime(double r, double C, int K, int d);
 std::vector<double> price_to_yield(const std::vector<double>& prices, const std::vector<int>& dtms,
                                    const std::vector<double>& coupons);
+std::pair<std::vector<double>, std::vector<int>> price_to_yield_iterations(
+    const std::vector<double>& prices, const std::vector<int>& dtms,
+    const std::vector<double>& coupons);
 double px(double TC, double r, int K, int d);
 
+// round_to, inlined into the kernel variants of every instrument
+CPP_ENGINE_KERNEL_INLINE double round_to_kernel(double num, int dp) {
+    const double factor = std::pow(10, dp);
+    return std::round(num * factor) / factor;
+}
+
 }  // namespace PriceToYield
\ No newline at end of file
@@ -3,9 +3,15 @@
 #include <chrono>
 #include <cmath>
 #include <random>
+#include <stdexcept>
+#include <string>
+#include <tuple>
 #include <vector>
 
+#include "../bondes_f.h"
+#include "../dispatch.h"
 #include "../price_to_yield.h"
+#include "../udibono.h"
 
 constexpr int DPP = 182;
 constexpr double VN = 100;
@@ -65,8 +71,8 @@ TEST(f_primeTest, BasicCase) {
     const int K = 15;
     const int d = 22;
     const double result = PriceToYield::f_prime(r, C, K, d);
-    const double expected_output = -662.8384541;
-    EXPECT_NEAR(result, expected_output, 1e-8);
+    const double expected_output = -6.628384541;
+    EXPECT_NEAR(result, expected_output, 1e-10);
 }
 
 TEST(f_primeTest, BasicCase2) {
@@ -75,8 +81,8 @@ TEST(f_primeTest, BasicCase2) {
     const int K = 34;
     const int d = 156;
     const double result = PriceToYield::f_prime(r, C, K, d);
-    const double expected_output = -725.451976;
-    EXPECT_NEAR(result, expected_output, 1e-7);
+    const double expected_output = -7.25451976;
+    EXPECT_NEAR(result, expected_output, 1e-9);
 }
 
 TEST(f_primeTest, NonZero) {
@@ -120,6 +126,27 @@ TEST(f_primeTest, NonZero) {
     }
 }
 
+TEST(f_primeTest, MatchesFiniteDifference) {
+    // f_prime is the slope of f against the yield in percent
+    const double h = 1e-6;
+    for (const auto& [r, TC, K, d] : std::vector<std::tuple<double, double, int, int>>{
+             {6.012846, 9.0, 15, 22}, {9.234159, 7.0, 34, 156}, {2.5, 0.5, 1, 181}}) {
+        const double C = VN * ((0.01 * TC * DPP) / YB);
+        const double slope =
+            (PriceToYield::f(r + h, C, K, d, 0) - PriceToYield::f(r - h, C, K, d, 0)) / (2 * h);
+        EXPECT_NEAR(PriceToYield::f_prime(r, C, K, d), slope, 1e-6 * std::abs(slope));
+    }
+}
+
+TEST(find_rootTest, FewIterations) {
+    // Newton steps on the exact slope converge quadratically
+    int iterations = 0;
+    const double r =
+        PriceToYield::find_root(VN * ((0.01 * 8.5 * DPP) / YB), 5, 36, 102.643974, &iterations);
+    EXPECT_NEAR(px(8.5, r, 5, 36), 102.643974, 1e-6);
+    EXPECT_LT(iterations, 10);
+}
+
 TEST(find_rootTest, BasicCase) {
     // std::mt19937 gen(rd());
     std::mt19937 gen(42);
@@ -416,6 +443,141 @@ TEST(price_to_yieldTest, BasicCase) {
               << "\n";
 }
 
+TEST(price_to_yield_iterationsTest, MatchesPriceToYield) {
+    const std::vector<double> P = {102.643974, 98.317412, 95.871326, 93.412547, 91.256839};
+    const std::vector<int> dtms = {874, 1602, 2785, 6243, 10156};
+    const std::vector<double> TC = {8.50, 8.50, 7.50, 7.75, 8.00};
+
+    const auto [yields, iterations] = PriceToYield::price_to_yield_iterations(P, dtms, TC);
+
+    EXPECT_EQ(yields, PriceToYield::price_to_yield(P, dtms, TC));
+    ASSERT_EQ(iterations.size(), P.size());
+    for (const int n : iterations) {
+        EXPECT_GE(n, 1);
+        EXPECT_LE(n, 10000);
+    }
+}
+
+TEST(udibono_price_to_yieldTest, MatchesNominalInUdis) {
+    const std::vector<double> P = {104.812736, 101.095341, 98.744615, 96.204988};
+    const std::vector<int> dtms = {512, 1784, 4093, 10372};
+    const std::vector<double> TC = {4.00, 4.50, 4.00, 4.25};
+    const double udi = 8.537924;
+
+    // prices in UDIs solve exactly like Mbono prices
+    const std::vector<double> in_udis = Udibono::price_to_yield(P, dtms, TC, {1.0});
+    EXPECT_EQ(in_udis, PriceToYield::price_to_yield(P, dtms, TC));
+
+    // peso prices are converted at the UDI value, one for all or one per bond
+    std::vector<double> P_mxn(P.size());
+    for (size_t i = 0; i < P.size(); i++) P_mxn[i] = P[i] * udi;
+
+    const std::vector<double> in_pesos = Udibono::price_to_yield(P_mxn, dtms, TC, {udi});
+    const std::vector<double> per_bond =
+        Udibono::price_to_yield(P_mxn, dtms, TC, std::vector<double>(P.size(), udi));
+    for (size_t i = 0; i < P.size(); i++) {
+        EXPECT_NEAR(in_pesos[i], in_udis[i], 1e-8);
+        EXPECT_EQ(per_bond[i], in_pesos[i]);
+    }
+
+    EXPECT_THROW(Udibono::price_to_yield(P, dtms, TC, {udi, udi}), std::invalid_argument);
+}
+
+TEST(bondes_discount_marginTest, RoundTrip) {
+    std::mt19937 gen(42);
+
+    std::uniform_real_distribution<> dist_dm(-50, 50);
+    std::uniform_real_distribution<> dist_TC(2, 12);
+    std::uniform_int_distribution<> dist_dtm(1, 5 * 364);
+
+    const int num_test = 10000;
+
+    std::vector<double> dm(num_test);
+    std::vector<double> TC(num_test);
+    std::vector<int> dtms(num_test);
+
+    for (int i = 0; i < num_test; i++) {
+        dm[i] = dist_dm(gen);
+        TC[i] = round_to(dist_TC(gen), 4);
+        dtms[i] = dist_dtm(gen);
+    }
+
+    const std::vector<int> K = BondesF::find_k(dtms);
+    const std::vector<int> d = BondesF::find_d(dtms);
+
+    std::vector<double> P(num_test);
+    for (int i = 0; i < num_test; i++) P[i] = round_to(BondesF::px(TC[i], dm[i], K[i], d[i]), 6);
+
+    const std::vector<double> margins = BondesF::discount_margin(P, dtms, TC);
+
+    int failures = 0;
+    for (int i = 0; i < num_test; i++) {
+        // the margin found reprices the bond to the quoted 6dp
+        const double P_result = round_to(BondesF::px(TC[i], margins[i], K[i], d[i]), 6);
+        if (P_result != P[i]) failures++;
+        EXPECT_EQ(P_result, P[i]) << "Failed case " << i << " | TC=" << TC[i] << " dtm=" << dtms[i]
+                                  << " dm_true=" << dm[i] << " dm_found=" << margins[i];
+    }
+
+    std::cout << "\n"
+              << "SUMMARY | Bondes F | Tests: " << num_test << " | Fail count: " << failures
+              << "\n\n";
+}
+
+TEST(bondes_discount_marginTest, ParIsZeroMargin) {
+    // on a coupon date a bond priced at par pays exactly its discount rate
+    const std::vector<double> margins =
+        BondesF::discount_margin({100.0, 100.0}, {28, 1092}, {7.25, 9.1});
+
+    EXPECT_NEAR(margins[0], 0.0, 1e-6);
+    EXPECT_NEAR(margins[1], 0.0, 1e-6);
+    EXPECT_EQ(BondesF::find_k({28, 29, 1}), (std::vector<int>{1, 2, 1}));
+    EXPECT_EQ(BondesF::find_d({28, 29, 1}), (std::vector<int>{0, 27, 27}));
+}
+
+TEST(dispatchTest, VariantsAgree) {
+    // every kernel variant the CPU supports solves the same yields and margins
+    std::mt19937 gen(42);
+    std::uniform_int_distribution<> dist_dtm(1, 10950);
+
+    const int num_test = 10000;
+    std::vector<double> P(num_test);
+    std::vector<int> dtms(num_test);
+    std::vector<double> TC(num_test);
+
+    for (int i = 0; i < num_test; i++) {
+        TC[i] = (dist_TC(gen) + 1) / 2.0;
+        dtms[i] = dist_dtm(gen);
+        P[i] = 60 + 80.0 * i / num_test;
+    }
+
+    const std::string active = Dispatch::active_name();
+    ASSERT_EQ(Dispatch::supported_names().front(), "baseline");
+
+    Dispatch::set_active("baseline");
+    const auto [yields, iterations] = PriceToYield::price_to_yield_iterations(P, dtms, TC);
+    const std::vector<double> margins = BondesF::discount_margin(P, dtms, TC);
+
+    for (const std::string& variant : Dispatch::supported_names()) {
+        Dispatch::set_active(variant);
+        EXPECT_EQ(Dispatch::active_name(), variant);
+
+        const auto [v_yields, v_iterations] = PriceToYield::price_to_yield_iterations(P, dtms, TC);
+        const std::vector<double> v_margins = BondesF::discount_margin(P, dtms, TC);
+
+        for (int i = 0; i < num_test; i++) {
+            EXPECT_NEAR(v_yields[i], yields[i], 1e-9) << variant << " case " << i;
+            EXPECT_EQ(std::isnan(v_margins[i]), std::isnan(margins[i])) << variant << " case " << i;
+            if (!std::isnan(margins[i])) {
+                EXPECT_NEAR(v_margins[i], margins[i], 1e-6) << variant << " case " << i;
+            }
+        }
+    }
+
+    EXPECT_THROW(Dispatch::set_active("sse9"), std::invalid_argument);
+    Dispatch::set_active(active);
+}
+
 double px(double TC, double r, int K, int d) {
     const double R = 0.01 * r * DPP / YB;
     const double C = VN * (DPP * 0.01 * TC) / YB;
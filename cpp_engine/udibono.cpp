@@ -0,0 +1,44 @@
+#include "udibono.h"
+
+#include <cmath>
+#include <stdexcept>
+#include <utility>
+#include <vector>
+
+#include "price_to_yield.h"
+
+namespace Udibono {
+
+// Udibonos pay semiannual (182 day) coupons on 100 UDIs of par value, so once
+// a price is expressed in UDIs the real yield solves the same equation as a
+// Mbono's nominal yield.
+
+std::vector<double> to_udis(const std::vector<double>& prices, const std::vector<double>& udis) {
+    // this function converts peso prices into UDIs, a single UDI value applies to
+    // every bond and a UDI value of 1 means the prices are already in UDIs
+    if (udis.size() != 1 && udis.size() != prices.size()) {
+        throw std::invalid_argument("udis must hold one value or one per price");
+    }
+
+    std::vector<double> udi_prices(prices.size());
+    for (size_t i = 0; i < prices.size(); i++) {
+        const double udi = udis.size() == 1 ? udis[0] : udis[i];
+        udi_prices[i] = udi > 0 ? prices[i] / udi : NAN;
+    }
+    return udi_prices;
+}
+
+std::vector<double> price_to_yield(const std::vector<double>& prices, const std::vector<int>& dtms,
+                                   const std::vector<double>& coupons,
+                                   const std::vector<double>& udis) {
+    return price_to_yield_iterations(prices, dtms, coupons, udis).first;
+}
+
+std::pair<std::vector<double>, std::vector<int>> price_to_yield_iterations(
+    const std::vector<double>& prices, const std::vector<int>& dtms,
+    const std::vector<double>& coupons, const std::vector<double>& udis) {
+    // real yields, -1.0 where the repricing check fails as for Mbonos
+    return PriceToYield::price_to_yield_iterations(to_udis(prices, udis), dtms, coupons);
+}
+
+}  // namespace Udibono
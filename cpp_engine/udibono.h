@@ -0,0 +1,15 @@
+#pragma once
+
+#include <utility>
+#include <vector>
+
+namespace Udibono {
+std::vector<double> to_udis(const std::vector<double>& prices, const std::vector<double>& udis);
+std::vector<double> price_to_yield(const std::vector<double>& prices, const std::vector<int>& dtms,
+                                   const std::vector<double>& coupons,
+                                   const std::vector<double>& udis);
+std::pair<std::vector<double>, std::vector<int>> price_to_yield_iterations(
+    const std::vector<double>& prices, const std::vector<int>& dtms,
+    const std::vector<double>& coupons, const std::vector<double>& udis);
+
+}  // namespace Udibono
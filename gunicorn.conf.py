@@ -0,0 +1,53 @@
+# gunicorn production configuration
+#
+# usage: gunicorn -c gunicorn.conf.py src.wsgi:app
+
+import multiprocessing
+import os
+import tempfile
+
+# serve a fetched Banxico snapshot for 15 minutes unless configured otherwise,
+# must be set before the app is preloaded
+os.environ.setdefault("BANXICO_SNAPSHOT_TTL", "900")
+
+# exchange snapshots between workers through shared memory, so only one worker
+# at a time refreshes from Banxico
+os.environ.setdefault(
+    "BANXICO_SNAPSHOT_PATH",
+    os.path.join(
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+        "banxico_snapshot",
+    ),
+)
+
+# structured INFO logs written off the request path by a background thread,
+# must be set before the app is preloaded
+os.environ.setdefault("LOG_LEVEL", "INFO")
+os.environ.setdefault("LOG_FORMAT", "json")
+os.environ.setdefault("LOG_ASYNC", "1")
+
+# --- server socket ---
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+backlog = 2048
+
+# --- worker processes ---
+
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+# threads per worker, the data fetcher is safe to share between them
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# import the app, the C++ extension and the warm snapshot once in the master
+# and share them copy-on-write with the forked workers
+preload_app = True
+
+# --- logging ---
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
@@ -1,3 +1,5 @@
+import os
+
 import setuptools
 from setuptools import Extension
 from setuptools.command.build_ext import build_ext as _build_ext
@@ -15,25 +17,50 @@ class build_ext(_build_ext):
         self.include_dirs.append(pybind11.get_include(user=True))
 
     def build_extensions(self):
-        if self.compiler.compiler_type == "msvc":
-            cxx_std_flag = ["/std=c++17", "/Zi"]
-        else:
-            cxx_std_flag = ["-std=c++17", "-g"]
+        # CPP_ENGINE_BUILD=debug builds without optimisation, for debugging
+        profile = os.getenv("CPP_ENGINE_BUILD", "release").lower()
+        if profile not in BUILD_PROFILES:
+            raise ValueError(f"Unknown CPP_ENGINE_BUILD: {profile}")
+
+        compiler = "msvc" if self.compiler.compiler_type == "msvc" else "gcc"
+        compile_args, link_args = BUILD_PROFILES[profile][compiler]
 
         for ext in self.extensions:
-            # add the appropriate C++17 flag
-            ext.extra_compile_args.extend(cxx_std_flag)
+            # add the appropriate C++17 and optimisation flags
+            ext.extra_compile_args.extend(compile_args)
+            ext.extra_link_args.extend(link_args)
 
         super().build_extensions()
 
 
+# (compile, link) flags of each build profile, by compiler family. Release
+# builds target the baseline ISA, AVX2 and AVX-512 variants of the batched
+# kernels are compiled alongside it and picked at import (cpp_engine/dispatch.h)
+BUILD_PROFILES = {
+    "release": {
+        "gcc": (["-std=c++17", "-O3", "-DNDEBUG", "-flto=auto"], ["-flto=auto"]),
+        "msvc": (["/std:c++17", "/O2", "/DNDEBUG", "/GL"], ["/LTCG"]),
+    },
+    "debug": {
+        "gcc": (["-std=c++17", "-g", "-O0"], []),
+        "msvc": (["/std:c++17", "/Zi", "/Od"], ["/DEBUG"]),
+    },
+}
+
+
 # define the extension module
 ext_modules = [
     Extension(
         # the final installed module name will be 'cpp_engine.cpp_engine'
         name="cpp_engine._cpp_engine",
         # list ALL C++ source files that contain logic or bindings
-        sources=["cpp_engine/binding.cpp", "cpp_engine/price_to_yield.cpp"],
+        sources=[
+            "cpp_engine/binding.cpp",
+            "cpp_engine/price_to_yield.cpp",
+            "cpp_engine/udibono.cpp",
+            "cpp_engine/bondes_f.cpp",
+            "cpp_engine/dispatch.cpp",
+        ],
         # use C++17 standard for modern features
         language="c++",
     ),
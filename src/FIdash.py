@@ -2,9 +2,27 @@ from dotenv import load_dotenv
 import os
 import requests
 import logging
+import numpy as np
 import cpp_engine
 import copy
-
+import threading
+import time
+import weakref
+from collections import namedtuple
+from .banxico_parsing import parse_ints, parse_values
+from .banxico_stream import BanxicoStreamParser
+from .registry import InstrumentRegistry
+from .metrics import (
+    CONNECTION_POOL,
+    CONNECTION_REUSE_RATIO,
+    SNAPSHOT_LOOKUPS,
+    STAGE_SECONDS,
+    UPSTREAM_SECONDS,
+)
+from .resilience import CircuitBreaker, ResilientSession, TokenBucket
+from .snapshot_channel import SnapshotChannel
+from .transport import PooledHTTPAdapter
+from .yield_memo import YieldMemo
 
 # load environment variables from .env file
 load_dotenv()
@@ -13,6 +31,40 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+# connection settings of a fetcher, read from the environment once
+FetcherConfig = namedtuple(
+    "FetcherConfig",
+    [
+        "api_key",
+        "api_url",
+        "api_urls_oportuno",
+        "timeout",
+        "max_retries",
+        "backoff_base",
+        "retry_budget",
+        "snapshot_ttl",
+    ],
+)
+
+# curve data with the monotonic time it was fetched, once published to or
+# adopted from the snapshot channel its version there (0 otherwise), and the
+# solved groups kept off the nominal curve, by group name
+Snapshot = namedtuple("Snapshot", ["data", "fetched_at", "version", "off_curve"])
+
+
+def register_after_fork(method):
+
+    # calls a bound method in forked children for as long as its object lives
+    ref = weakref.WeakMethod(method)
+
+    def after_in_child():
+        method = ref()
+        if method is not None:
+            method()
+
+    os.register_at_fork(after_in_child=after_in_child)
+
+
 class BanxicoDataFetcher:
     """
     Fetches data from Banxico SIE API.
@@ -20,76 +72,35 @@ class BanxicoDataFetcher:
     See https://www.banxico.org.mx/SieAPIRest/service/v1/
     """
 
-    # --- cetes data Banxico API series ids ---
+    # --- Banxico API series ids, from the instrument registry ---
 
-    # cetes yields
-    CETES_MATURITY_MAP_YLD = {
-        "SF45470": "28 Days",
-        "SF45471": "91 Days",
-        "SF45472": "182 Days",
-        "SF45473": "364 Days",
-        "SF349889": "2 Years",
-    }
-
-    # cetes days to maturity
-    CETES_MATURITY_MAP_DTM = {
-        "SF45422": "28 Days",
-        "SF45423": "91 Days",
-        "SF45424": "182 Days",
-        "SF45425": "364 Days",
-        "SF349886": "2 Years",
-    }
-
-    # --- mbono data Banxico API series ids ---
+    REGISTRY = InstrumentRegistry.load()
 
-    # mbono dirty prices
-    MBONOS_MATURITY_MAP_PX = {
-        "SF45448": "3 Years",
-        "SF45450": "5 Years",
-        "SF45454": "10 Years",
-        "SF45456": "20 Years",
-        "SF60721": "30 Years",
-    }
-
-    # mbono days to maturity
-    MBONOS_MATURITY_MAP_DTM = {
-        "SF45427": "3 Years",
-        "SF45428": "5 Years",
-        "SF45430": "10 Years",
-        "SF45431": "20 Years",
-        "SF60720": "30 Years",
-    }
+    # cetes yields and days to maturity
+    CETES_MATURITY_MAP_YLD = REGISTRY.series_map("cetes", "yld")
+    CETES_MATURITY_MAP_DTM = REGISTRY.series_map("cetes", "dtm")
 
-    # mbono current coupons
-    MBONOS_MATURITY_MAP_COUP = {
-        "SF45475": "3 Years",
-        "SF45476": "5 Years",
-        "SF45478": "10 Years",
-        "SF45479": "20 Years",
-        "SF60723": "30 Years",
-    }
+    # mbono dirty prices, days to maturity and current coupons
+    MBONOS_MATURITY_MAP_PX = REGISTRY.series_map("mbonos", "px")
+    MBONOS_MATURITY_MAP_DTM = REGISTRY.series_map("mbonos", "dtm")
+    MBONOS_MATURITY_MAP_COUP = REGISTRY.series_map("mbonos", "coup")
 
-    # --- summary data Banxico API series ids ---
+    # summary data
+    SUMMARY_MAP = REGISTRY.summary
 
-    SUMMARY_MAP = {
-        "SF331451": "TIIEF",
-        "SF43783": "TIIE28",
-        "SF61745": "TargetRate",
-        "SP30578": "Inflation",
-        "SP68257": "UDI_MXN",
-        "SF343410": "USD_MXN",
-    }
+    # series per request, as allowed by the Banxico SIE API
+    MAX_SERIES_PER_REQUEST = 20
 
-    api_url = "https://www.banxico.org.mx/SieAPIRest/service/v1/series/"
+    DEFAULT_API_URL = "https://www.banxico.org.mx/SieAPIRest/service/v1/series/"
 
     def __init__(self):
 
         logger.debug("Initialising BanxicoDataFetcher.")
 
-        self.api_key = os.getenv("BANXICO_API_KEY").strip()
+        api_key = os.getenv("BANXICO_API_KEY").strip()
 
         # check if Banxico API key in environment variables
-        if not self.api_key:
+        if not api_key:
             logger.critical(
                 "BANXICO_API_KEY is missing. Cannot proceed with API calls."
             )
@@ -97,335 +108,535 @@ class BanxicoDataFetcher:
 
         logger.debug("Successfuly read Banxico API key.")
 
-        self.session = requests.Session()
-        self.session.headers = {"Bmx-Token": self.api_key, "Accept": "application/json"}
-
-        # --- define class variable series ids ---
-
-        # cetes
-        self.cetes_yld_ids = ",".join(self.CETES_MATURITY_MAP_YLD.keys())
-        self.cetes_dtm_ids = ",".join(self.CETES_MATURITY_MAP_DTM.keys())
-
-        # mbonos
-        self.mbonos_px_ids = ",".join(self.MBONOS_MATURITY_MAP_PX.keys())
-        self.mbonos_dtm_ids = ",".join(self.MBONOS_MATURITY_MAP_DTM.keys())
-        self.mbonos_coup_ids = ",".join(self.MBONOS_MATURITY_MAP_COUP.keys())
-
-        # summary data
-        self.summary_ids = ",".join(self.SUMMARY_MAP.keys())
-
-        # --- define class variable API query URLs ---
-
-        # cetes
-        self.api_url_cetes_yld = (
-            self.api_url + f"{self.cetes_yld_ids}/datos/oportuno?decimales=sinCeros"
-        )
-        self.api_url_cetes_dtm = (
-            self.api_url + f"{self.cetes_dtm_ids}/datos/oportuno?decimales=sinCeros"
+        # --- connection settings, fixed for the life of the fetcher ---
+
+        # base URL can point to a stand-in server for testing
+        api_url = os.getenv("BANXICO_API_URL", self.DEFAULT_API_URL)
+
+        # every registered series in as few requests as the API allows
+        self.registry = self.REGISTRY
+        series_ids = self.registry.series_ids()
+
+        self.config = FetcherConfig(
+            api_key=api_key,
+            api_url=api_url,
+            api_urls_oportuno=tuple(
+                api_url
+                + ",".join(series_ids[i : i + self.MAX_SERIES_PER_REQUEST])
+                + "/datos/oportuno?decimales=sinCeros"
+                for i in range(0, len(series_ids), self.MAX_SERIES_PER_REQUEST)
+            ),
+            # (connect, read) timeouts in seconds
+            timeout=(
+                float(os.getenv("BANXICO_CONNECT_TIMEOUT", "3.05")),
+                float(os.getenv("BANXICO_READ_TIMEOUT", "10")),
+            ),
+            max_retries=int(os.getenv("BANXICO_MAX_RETRIES", "2")),
+            backoff_base=float(os.getenv("BANXICO_BACKOFF_BASE", "0.25")),
+            # seconds all the requests of one fetch may take, retries included,
+            # kept under the gunicorn worker timeout
+            retry_budget=float(os.getenv("BANXICO_RETRY_BUDGET", "20")),
+            # seconds a fetched snapshot is served before refetching (0 disables
+            # caching)
+            snapshot_ttl=float(os.getenv("BANXICO_SNAPSHOT_TTL", "0")),
         )
 
-        # mbonos
-        self.api_url_m_px = (
-            self.api_url + f"{self.mbonos_px_ids}/datos/oportuno?decimales=sinCeros"
-        )
-        self.api_url_m_dtm = (
-            self.api_url + f"{self.mbonos_dtm_ids}/datos/oportuno?decimales=sinCeros"
+        # --- state shared by every thread's session ---
+
+        # one rate limit and circuit for the whole fetcher
+        self.rate_limiter = TokenBucket(
+            rate=float(os.getenv("BANXICO_RATE_LIMIT", "2")),
+            capacity=int(os.getenv("BANXICO_RATE_BURST", "30")),
         )
-        self.api_url_m_coup = (
-            self.api_url + f"{self.mbonos_coup_ids}/datos/oportuno?decimales=sinCeros"
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("BANXICO_BREAKER_FAILURES", "5")),
+            recovery_timeout=float(os.getenv("BANXICO_BREAKER_RESET", "30")),
         )
 
-        # summary data
-        self.api_url_summary = (
-            self.api_url + f"{self.summary_ids}/datos/oportuno?decimales=sinCeros"
+        # pooled keep-alive transport shared by every Banxico call
+        self.adapter = PooledHTTPAdapter(
+            pool_connections=int(os.getenv("BANXICO_POOL_CONNECTIONS", "4")),
+            pool_maxsize=int(os.getenv("BANXICO_POOL_SIZE", "10")),
         )
 
-    def get_data(self):
-
-        logger.debug("BanxicoDataFetcher: fetching data.")
+        # sessions are not thread safe, each thread gets its own on first use
+        self.local = threading.local()
 
-        # call the Banxico API
-        banxico_data = self.call_api()
+        # --- latest data snapshot ---
 
-        # --- clean returned data ---
+        # replaced whole, never mutated, so readers need no lock
+        self.latest = None
 
-        # cetes
-        cleaned_cetes_ylds, cleaned_cetes_dtms = self.clean_returned_data(
-            banxico_data["cetes_yld"], banxico_data["cetes_dtm"]
-        )
+        # one thread per process refreshes an expired snapshot
+        self.refresh_lock = threading.Lock()
 
-        # mbonos
-        cleaned_mbonos_pxs, cleaned_mbonos_dtms, cleaned_mbonos_coups = (
-            self.clean_returned_data(
-                banxico_data["mbonos_px"],
-                banxico_data["mbonos_dtm"],
-                banxico_data["mbonos_coup"],
-            )
+        # optional snapshot channel shared by all worker processes
+        snapshot_path = os.getenv("BANXICO_SNAPSHOT_PATH")
+        self.snapshot_channel = (
+            SnapshotChannel(snapshot_path) if snapshot_path else None
         )
 
-        # --- reorder returned data ---
-
-        # cetes
-        reordered_cetes_ylds, reordered_cetes_dtms = self.reorder_data(
-            cleaned_cetes_ylds, cleaned_cetes_dtms
+        # mbono yields already solved, so unchanged prices are not re-solved
+        self.yield_memo = YieldMemo()
+
+        # a forked child, e.g. a gunicorn worker of the preloaded app, must not
+        # reuse the keep-alive sockets the parent opened while warming up
+        register_after_fork(self.after_fork)
+
+    # --- read-only views of the config and the latest snapshot ---
+
+    api_key = property(lambda self: self.config.api_key)
+    api_url = property(lambda self: self.config.api_url)
+    api_urls_oportuno = property(lambda self: self.config.api_urls_oportuno)
+    timeout = property(lambda self: self.config.timeout)
+    snapshot_ttl = property(lambda self: self.config.snapshot_ttl)
+
+    @property
+    def snapshot(self):
+        latest = self.latest
+        return latest.data if latest is not None else None
+
+    @property
+    def off_curve(self):
+        latest = self.latest
+        return latest.off_curve if latest is not None else {}
+
+    @property
+    def shared_version(self):
+        latest = self.latest
+        return latest.version if latest is not None else 0
+
+    @property
+    def session(self):
+
+        # this thread's session, built on first use
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = self.new_session()
+        return session
+
+    def new_session(self):
+
+        # rate limited, circuit broken session with jittered retries, over the
+        # shared limiter, breaker and connection pool
+        session = ResilientSession(
+            rate_limiter=self.rate_limiter,
+            circuit_breaker=self.circuit_breaker,
+            max_retries=self.config.max_retries,
+            backoff_base=self.config.backoff_base,
         )
-
-        # mbonos
-        reordered_bonos_pxs, reordered_bonos_dtms, reordered_bonos_coups = (
-            self.reorder_data(
-                cleaned_mbonos_pxs, cleaned_mbonos_dtms, cleaned_mbonos_coups
-            )
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+
+        # extend rather than replace the default session headers
+        session.headers.update(
+            {
+                "Bmx-Token": self.config.api_key,
+                "Accept": "application/json",
+                "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive",
+            }
         )
 
-        # --- convert mbono prices into yields ---
+        return session
 
-        reordered_bonos_ylds = self.prc_to_yld(
-            reordered_bonos_pxs, reordered_bonos_dtms, reordered_bonos_coups
-        )
+    def after_fork(self):
 
-        # --- parse summary data ---
-
-        parsed_summary_data = self.parse_summary_data(banxico_data["summary"])
+        # fresh connection pool and sessions, and a refresh lock that no
+        # thread of the parent can be holding
+        self.adapter = self.adapter.clone()
+        self.local = threading.local()
+        self.refresh_lock = threading.Lock()
 
-        # --- final yield curve data ---
+    def is_fresh(self, latest):
+        return (
+            latest is not None
+            and time.monotonic() - latest.fetched_at < self.snapshot_ttl
+        )
 
-        yield_curve_data = {
-            "cetes": {"ylds": reordered_cetes_ylds, "dtms": reordered_cetes_dtms},
-            "mbonos": {"ylds": reordered_bonos_ylds, "dtms": reordered_bonos_dtms},
-        }
+    def get_data(self):
 
-        curve_labels, curve_dates, curve_yields, curve_dtms = (
-            self.get_labels_dates_yields(yield_curve_data)
+        # serve the latest snapshot while it is still fresh
+        latest = self.latest
+        if self.is_fresh(latest):
+            logger.debug("BanxicoDataFetcher: serving cached snapshot.")
+            SNAPSHOT_LOOKUPS.inc(result="hit")
+            return latest.data
+
+        # without caching every call fetches, concurrently
+        if self.snapshot_ttl <= 0:
+            return self.refresh(latest)
+
+        # one thread refreshes while the others keep serving the expired
+        # snapshot, or wait for the first one if there is none yet
+        if not self.refresh_lock.acquire(blocking=latest is None):
+            logger.debug("BanxicoDataFetcher: refresh in progress, serving stale.")
+            SNAPSHOT_LOOKUPS.inc(result="stale")
+            return latest.data
+
+        try:
+            # another thread may have refreshed while this one waited
+            latest = self.latest
+            if self.is_fresh(latest):
+                SNAPSHOT_LOOKUPS.inc(result="hit")
+                return latest.data
+            return self.refresh(latest)
+        finally:
+            self.refresh_lock.release()
+
+    def refresh(self, latest):
+
+        try:
+            if self.snapshot_channel is not None and self.snapshot_ttl > 0:
+                return self.get_shared_data()
+
+            return self.fetch_data()
+        except requests.exceptions.RequestException:
+            # fall back to the last good snapshot rather than failing the request
+            if latest is None:
+                raise
+            logger.warning(
+                "BanxicoDataFetcher: upstream failed, serving stale snapshot."
+            )
+            SNAPSHOT_LOOKUPS.inc(result="stale")
+            return latest.data
+
+    # seconds between reads of the channel while waiting for a first publish
+    SNAPSHOT_POLL_INTERVAL = 0.05
+
+    def get_shared_data(self):
+
+        # adopt the snapshot published by another process if it is fresh
+        shared = self.snapshot_channel.read()
+        if shared is not None and time.time() - shared.published_at < self.snapshot_ttl:
+            return self.adopt_shared_snapshot(shared)
+
+        # the refresher's fetch is bounded by the retry budget, so is the wait
+        # for its first publish
+        deadline = time.monotonic() + self.config.retry_budget
+
+        while True:
+            # only the process holding the refresh lock calls Banxico, which
+            # includes a process taking over from a refresher that failed
+            with self.snapshot_channel.refresh_lock() as is_refresher:
+                if is_refresher:
+                    # another process may have published since the last read
+                    shared = self.snapshot_channel.read()
+                    if (
+                        shared is not None
+                        and time.time() - shared.published_at < self.snapshot_ttl
+                    ):
+                        return self.adopt_shared_snapshot(shared)
+
+                    return self.publish_snapshot(self.fetch_snapshot())
+
+            if shared is not None:
+                logger.debug("BanxicoDataFetcher: serving shared snapshot.")
+                return self.adopt_shared_snapshot(shared)
+
+            # nothing published yet and another process is refreshing, wait
+            # for its publish rather than calling Banxico as well
+            if time.monotonic() >= deadline:
+                raise requests.exceptions.Timeout(
+                    "Timed out waiting for the first shared snapshot."
+                )
+            time.sleep(self.SNAPSHOT_POLL_INTERVAL)
+            shared = self.snapshot_channel.read()
+
+    def adopt_shared_snapshot(self, shared):
+
+        SNAPSHOT_LOOKUPS.inc(result="shared")
+
+        # decode the shared columns once per published version
+        latest = self.latest
+        if latest is not None and latest.version == shared.version:
+            data, off_curve = latest.data, latest.off_curve
+        else:
+            logger.debug(
+                "BanxicoDataFetcher: adopting shared snapshot version %s.",
+                shared.version,
+            )
+            data = (
+                shared.meta["labels"],
+                shared.meta["dates"],
+                shared.yields.tolist(),
+                shared.dtms.tolist(),
+                shared.meta["summary"],
+            )
+            off_curve = shared.meta.get("off_curve", {})
+
+        # age the local copy by the age of the shared snapshot
+        self.latest = Snapshot(
+            data,
+            time.monotonic() - (time.time() - shared.published_at),
+            shared.version,
+            off_curve,
         )
 
-        return curve_labels, curve_dates, curve_yields, curve_dtms, parsed_summary_data
+        return data
 
-    def call_api(self):
+    def publish_snapshot(self, latest):
 
-        # --- make the API requests ---
+        curve_labels, curve_dates, curve_yields, curve_dtms, summary_data = latest.data
 
-        # cetes
-        logger.debug("Fetching cetes yield data.")
-        cetes_response_yld = self.session.get(
-            self.api_url_cetes_yld, headers=self.session.headers, timeout=10
+        version = self.snapshot_channel.publish(
+            curve_yields,
+            curve_dtms,
+            {
+                "labels": curve_labels,
+                "dates": curve_dates,
+                "summary": summary_data,
+                "off_curve": latest.off_curve,
+            },
+            time.time(),
         )
-        if cetes_response_yld.status_code != 200:
-            logger.critical(
-                f"Error acquiring cetes yield data: {cetes_response_yld.status_code}"
-            )
-        cetes_response_yld.raise_for_status()
+        self.latest = latest._replace(fetched_at=time.monotonic(), version=version)
 
-        logger.debug("Fetching cetes days do maturity data.")
-        cetes_response_dtm = self.session.get(
-            self.api_url_cetes_dtm, headers=self.session.headers, timeout=10
-        )
-        if cetes_response_dtm.status_code != 200:
-            logger.critical(
-                f"Error acquiring cetes dtm data: {cetes_response_dtm.status_code}"
-            )
-        cetes_response_dtm.raise_for_status()
+        return latest.data
 
-        # mbonos
-        logger.debug("Fetching mbonos price data.")
-        mbonos_response_px = self.session.get(
-            self.api_url_m_px, headers=self.session.headers, timeout=10
-        )
-        if mbonos_response_px.status_code != 200:
-            logger.critical(
-                f"Error acquiring mbono price data: {mbonos_response_px.status_code}"
-            )
-        mbonos_response_px.raise_for_status()
+    def fetch_data(self):
+        return self.fetch_snapshot().data
 
-        logger.debug("Fetching mbonos dtm data.")
-        mbonos_response_dtm = self.session.get(
-            self.api_url_m_dtm, headers=self.session.headers, timeout=10
-        )
-        if mbonos_response_dtm.status_code != 200:
-            logger.critical(
-                f"Error acquiring mbono dtm data: {mbonos_response_dtm.status_code}"
-            )
-        mbonos_response_dtm.raise_for_status()
+    def fetch_snapshot(self):
 
-        logger.debug("Fetching mbonos current coupon data.")
-        mbonos_response_coup = self.session.get(
-            self.api_url_m_coup, headers=self.session.headers, timeout=10
-        )
-        if mbonos_response_coup.status_code != 200:
-            logger.critical(
-                f"Error acquiring mbono current coupon data: {mbonos_response_coup.status_code}"
-            )
-        mbonos_response_coup.raise_for_status()
+        logger.debug("BanxicoDataFetcher: fetching data.")
+        SNAPSHOT_LOOKUPS.inc(result="miss")
 
-        # summary data
-        logger.debug("Fetching summary data.")
-        summary_response = self.session.get(
-            self.api_url_summary, headers=self.session.headers, timeout=10
-        )
-        if summary_response.status_code != 200:
-            logger.critical(
-                f"Error acquiring summary data: {summary_response.status_code}"
-            )
-        summary_response.raise_for_status()
+        # call the Banxico API
+        with STAGE_SECONDS.time(stage="call_api"):
+            banxico_data = self.call_api()
 
-        # --- parse responses ---
+        groups = self.registry.groups
 
-        # cetes
-        cetes_yld_response_json = cetes_response_yld.json()["bmx"]["series"]
-        cetes_dtm_response_json = cetes_response_dtm.json()["bmx"]["series"]
+        # --- clean returned data ---
 
-        # mbonos
-        m_px_response_json = mbonos_response_px.json()["bmx"]["series"]
-        m_dtm_response_json = mbonos_response_dtm.json()["bmx"]["series"]
-        m_coup_response_json = mbonos_response_coup.json()["bmx"]["series"]
+        with STAGE_SECONDS.time(stage="clean"):
+            cleaned = {
+                g.name: self.clean_returned_data(
+                    *(banxico_data[f"{g.name}_{role}"] for role in g.roles)
+                )
+                for g in groups
+            }
 
-        # summary data
-        summary_response_json = summary_response.json()["bmx"]["series"]
+        # --- reorder returned data ---
 
-        returned_data = {
-            "cetes_yld": cetes_yld_response_json,
-            "cetes_dtm": cetes_dtm_response_json,
-            "mbonos_px": m_px_response_json,
-            "mbonos_dtm": m_dtm_response_json,
-            "mbonos_coup": m_coup_response_json,
-            "summary": summary_response_json,
-        }
+        with STAGE_SECONDS.time(stage="reorder"):
+            reordered = {g.name: self.reorder_data(*cleaned[g.name]) for g in groups}
 
-        return returned_data
+        # --- parse summary data ---
 
-    def clean_returned_data(self, px_ylds, dtms, coups=None):
+        with STAGE_SECONDS.time(stage="summary"):
+            parsed_summary_data = self.parse_summary_data(banxico_data["summary"])
 
-        # covert to float returned prices, yields, and coupon rates
-        # convert to int days to maturity
+        # --- convert prices into yields ---
 
-        clean_px_ylds = copy.deepcopy(px_ylds)
-        clean_dtms = copy.deepcopy(dtms)
+        with STAGE_SECONDS.time(stage="price_to_yield"):
+            ylds = self.solve_yields(groups, reordered, parsed_summary_data)
 
-        if coups is None:
-            logger.debug("Cleaning returned cetes data.")
-        else:
-            logger.debug("Cleaning returned mbonos data.")
+        # --- final yield curve data ---
 
-        for px_yld in clean_px_ylds:
-            px_yld["datos"][0]["dato"] = round(float(px_yld["datos"][0]["dato"]), 6)
-        for dtm in clean_dtms:
-            dtm["datos"][0]["dato"] = int(
-                float(dtm["datos"][0]["dato"].replace(",", ""))
+        with STAGE_SECONDS.time(stage="assemble"):
+            yield_curve_data = {
+                g.name: {
+                    "ylds": ylds[g.name],
+                    "dtms": reordered[g.name][g.roles.index("dtm")],
+                }
+                for g in groups
+                if g.curve
+            }
+
+            curve_labels, curve_dates, curve_yields, curve_dtms = (
+                self.get_labels_dates_yields(yield_curve_data)
             )
 
-        if coups is None:
-            return clean_px_ylds, clean_dtms
-        else:
-            clean_coups = copy.deepcopy(coups)
-            for coup in clean_coups:
-                coup["datos"][0]["dato"] = round(float(coup["datos"][0]["dato"]), 2)
-            return clean_px_ylds, clean_dtms, clean_coups
+            # off-curve groups, e.g. Udibono real yields and Bondes F margins
+            off_curve = self.get_off_curve_data(
+                groups, reordered, ylds, curve_dtms, curve_yields
+            )
 
-    def reorder_data(
-        self, yld_px_response_data, dtm_response_data, coup_response_data=None
-    ):
+        snapshot = (
+            curve_labels,
+            curve_dates,
+            curve_yields,
+            curve_dtms,
+            parsed_summary_data,
+        )
+        # curve and off-curve data are swapped in together
+        latest = self.latest = Snapshot(snapshot, time.monotonic(), 0, off_curve)
 
-        # ensure returned data is in order of increasing term to maturity
-
-        def convert_to_days(maturity_str):
-            parts = maturity_str.split(" ")
-            if parts[1].lower() == "days":
-                return int(parts[0])
-            elif parts[1].lower() == "years":
-                return int(parts[0]) * 364
-            else:
-                raise ValueError(f"Unknown maturity format: {maturity_str}")
-
-        def reorder_cetes(yld_response_data, dtm_response_data):
-            returned_yld_maturities = [
-                self.CETES_MATURITY_MAP_YLD.get(y.get("idSerie"))
-                for y in yld_response_data
-            ]
+        return latest
 
-            returned_dtm_maturities = [
-                self.CETES_MATURITY_MAP_DTM.get(y.get("idSerie"))
-                for y in dtm_response_data
-            ]
+    def warm(self):
 
-            # define the desired order
-            mat_in_days_yld = [convert_to_days(mat) for mat in returned_yld_maturities]
-            mat_in_days_dtm = [convert_to_days(mat) for mat in returned_dtm_maturities]
+        # fetch a snapshot ahead of the first request, e.g. in a server master
+        # process before it forks its workers
+        logger.debug("BanxicoDataFetcher: warming data snapshot.")
 
-            # get ranks of returned data
-            maturity_ranks_yld = [
-                x[0]
-                for x in sorted(list(enumerate(mat_in_days_yld)), key=lambda x: x[1])
-            ]
-            maturity_ranks_dtm = [
-                x[0]
-                for x in sorted(list(enumerate(mat_in_days_dtm)), key=lambda x: x[1])
-            ]
+        if self.snapshot_channel is None:
+            return self.fetch_data()
 
-            # reorder data
-            ordered_cetes_data_yld = [yld_response_data[x] for x in maturity_ranks_yld]
-            ordered_cetes_data_dtm = [dtm_response_data[x] for x in maturity_ranks_dtm]
+        with self.snapshot_channel.refresh_lock() as is_refresher:
+            latest = self.fetch_snapshot()
+            return self.publish_snapshot(latest) if is_refresher else latest.data
 
-            return ordered_cetes_data_yld, ordered_cetes_data_dtm
+    def call_api(self):
 
-        def reorder_bonos(px_response_data, dtm_response_data, coup_response_data):
+        # --- make the API requests ---
 
-            returned_px_maturities = [
-                self.MBONOS_MATURITY_MAP_PX.get(y.get("idSerie"))
-                for y in px_response_data
-            ]
+        returned_data = {key: [] for key in self.registry.response_keys()}
 
-            returned_dtm_maturities = [
-                self.MBONOS_MATURITY_MAP_DTM.get(y.get("idSerie"))
-                for y in dtm_response_data
-            ]
+        # one retry budget for every batch
+        deadline = time.monotonic() + self.config.retry_budget
 
-            returned_coup_maturities = [
-                self.MBONOS_MATURITY_MAP_COUP.get(y.get("idSerie"))
-                for y in coup_response_data
-            ]
+        for i, url in enumerate(self.api_urls_oportuno):
+            logger.debug(
+                "Fetching latest data, batch %s of %s.",
+                i + 1,
+                len(self.api_urls_oportuno),
+            )
+            response = self.timed_get("oportuno", url, deadline=deadline)
+            if response.status_code != 200:
+                logger.critical("Error acquiring latest data: %s", response.status_code)
+            response.raise_for_status()
+
+            # --- split the response by instrument group and role ---
+
+            for series in response.json()["bmx"]["series"]:
+                series_id = series.get("idSerie")
+                if series_id not in self.registry.index:
+                    logger.warning("Ignoring unrequested series %s.", series_id)
+                    continue
+                returned_data[self.registry.response_key(series_id)].append(series)
+
+        # connection reuse, exported on /metrics and logged
+        stats = self.adapter.connection_stats()
+        for stat in ("hosts", "requests", "connections", "reused"):
+            CONNECTION_POOL.set(stats[stat], stat=stat)
+        CONNECTION_REUSE_RATIO.set(stats["reuse_ratio"])
+        logger.debug("Banxico connection stats: %s", stats)
 
-            # define the desired order
-            mat_in_days_px = [convert_to_days(mat) for mat in returned_px_maturities]
-            mat_in_days_dtm = [convert_to_days(mat) for mat in returned_dtm_maturities]
-            mat_in_days_coup = [
-                convert_to_days(mat) for mat in returned_coup_maturities
-            ]
+        return returned_data
 
-            # get ranks of returned data
-            maturity_ranks_px = [
-                x[0]
-                for x in sorted(list(enumerate(mat_in_days_px)), key=lambda x: x[1])
-            ]
-            maturity_ranks_dtm = [
-                x[0]
-                for x in sorted(list(enumerate(mat_in_days_dtm)), key=lambda x: x[1])
-            ]
-            maturity_ranks_coup = [
-                x[0]
-                for x in sorted(list(enumerate(mat_in_days_coup)), key=lambda x: x[1])
-            ]
+    def timed_get(self, endpoint, url, **kwargs):
+
+        # GET with the request duration recorded per endpoint and status
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = self.session.get(url, timeout=self.timeout, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            UPSTREAM_SECONDS.observe(
+                time.perf_counter() - start, endpoint=endpoint, status=status
+            )
 
-            # reorder data
-            ordered_bonos_data_px = [px_response_data[x] for x in maturity_ranks_px]
-            ordered_bonos_data_dtm = [dtm_response_data[x] for x in maturity_ranks_dtm]
-            ordered_bonos_data_coup = [
-                coup_response_data[x] for x in maturity_ranks_coup
-            ]
+    def fetch_history(
+        self, series_ids, start, end, chunk_size=64 * 1024, rate_limit_wait=None
+    ):
 
-            return (
-                ordered_bonos_data_px,
-                ordered_bonos_data_dtm,
-                ordered_bonos_data_coup,
-            )
+        # stream a date range response straight into typed arrays, start and
+        # end are dates or "YYYY-MM-DD" strings; rate_limit_wait overrides the
+        # seconds the session waits for a rate limit token
+        url = (
+            self.api_url
+            + f"{','.join(series_ids)}/datos/{start}/{end}?decimales=sinCeros"
+        )
 
-        if not coup_response_data:
-            logger.debug("Reordering cetes data.")
-            return reorder_cetes(yld_px_response_data, dtm_response_data)
+        logger.debug("Fetching history for %s from %s to %s.", series_ids, start, end)
+        deadline = time.monotonic() + self.config.retry_budget
+        with self.timed_get(
+            "history",
+            url,
+            stream=True,
+            deadline=deadline,
+            rate_limit_wait=rate_limit_wait,
+        ) as response:
+            if response.status_code != 200:
+                logger.critical(
+                    "Error acquiring history data: %s", response.status_code
+                )
+            response.raise_for_status()
+
+            parser = BanxicoStreamParser()
+            for chunk in response.iter_content(chunk_size):
+                parser.feed(chunk)
+
+        return parser.close()
+
+    # parser of each series role, and the decimals its values are rounded to
+    ROLE_PARSERS = {
+        "yld": (parse_values, 6),
+        "px": (parse_values, 6),
+        "dtm": (parse_ints, None),
+        "coup": (parse_values, 2),
+    }
 
-        else:
-            logger.debug("Reordering bonos data.")
-            return reorder_bonos(
-                yld_px_response_data, dtm_response_data, coup_response_data
-            )
+    def clean_returned_data(self, *role_data):
+
+        # covert to float returned prices, yields, and coupon rates
+        # convert to int days to maturity
+        # each argument is the list of series of one role, e.g. (pxs, dtms, coups)
+        # series without a value (e.g. "N/E") are dropped, reorder_data then
+        # drops their instrument from the other roles
+
+        logger.debug("Cleaning returned data.")
+
+        cleaned = []
+        for series_list in role_data:
+            clean_series = copy.deepcopy(series_list)
+
+            # one vectorised parse per role
+            by_role = {}
+            for series in clean_series:
+                role = self.registry.index[series["idSerie"]][1]
+                by_role.setdefault(role, []).append(series)
+
+            missing = set()
+            for role, role_series in by_role.items():
+                parser, decimals = self.ROLE_PARSERS[role]
+                values, masked = parser([x["datos"][0]["dato"] for x in role_series])
+                if decimals is not None:
+                    values = np.round(values, decimals)
+                for series, value, is_missing in zip(
+                    role_series, values.tolist(), masked
+                ):
+                    series["datos"][0]["dato"] = value
+                    if is_missing:
+                        missing.add(series["idSerie"])
+
+            if missing:
+                logger.warning("Dropping %s series without a value.", len(missing))
+            cleaned.append([x for x in clean_series if x["idSerie"] not in missing])
+
+        return tuple(cleaned)
+
+    def reorder_data(self, *role_data):
+
+        # ensure returned data is in order of increasing term to maturity,
+        # keeping only instruments returned in every role so the lists align
+
+        logger.debug("Reordering data.")
+
+        by_issue = [
+            {self.registry.issue(s["idSerie"]): s for s in x} for x in role_data
+        ]
+        issues = set.intersection(*(set(x) for x in by_issue))
+
+        dropped = set.union(*(set(x) for x in by_issue)) - issues
+        if dropped:
+            logger.warning("Dropping %s incomplete instruments.", len(dropped))
+
+        # by the days to maturity returned (every role set includes them), so
+        # issues sharing a tenor label sort by maturity, ties by tenor label
+        order = {}
+        for s in (s for x in role_data for s in x):
+            instrument, role, rank = self.registry.index[s["idSerie"]]
+            if role == "dtm":
+                order[instrument.issue] = (s["datos"][0]["dato"], rank)
+        ranked = sorted(issues, key=order.get)
+
+        return tuple([x[issue] for issue in ranked] for x in by_issue)
 
     def parse_summary_data(self, summary_response_data):
 
@@ -453,7 +664,7 @@ class BanxicoDataFetcher:
         dtms_ = [x["datos"][0]["dato"] for x in dtms]
         coups_ = [x["datos"][0]["dato"] for x in coups]
 
-        reordered_bonos_yields = cpp_engine.price_to_yield(pxs_, dtms_, coups_)
+        reordered_bonos_yields = self.yield_memo.price_to_yield(pxs_, dtms_, coups_)
 
         for i, px in enumerate(pxs):
             px["datos"][0]["dato"] = reordered_bonos_yields[i]
@@ -462,6 +673,81 @@ class BanxicoDataFetcher:
 
         return yields
 
+    def prc_to_real_yld(self, prices, dtms, coups, udis=(1.0,)):
+
+        logger.debug("Converting udibono clean prices into real yields.")
+
+        # peso prices are converted at `udis` (one value, or one per bond)
+        return self.solve_prices(
+            cpp_engine.udibono_price_to_yield, prices, dtms, coups, list(udis)
+        )
+
+    def prc_to_margin(self, prices, dtms, coups):
+
+        logger.debug("Converting bondes F clean prices into discount margins.")
+
+        return self.solve_prices(cpp_engine.bondes_discount_margin, prices, dtms, coups)
+
+    def solve_prices(self, solver, prices, dtms, coups, *args):
+
+        # replace each price with the solver's value for its bond
+        solved = copy.deepcopy(prices)
+        values = solver(
+            *([x["datos"][0]["dato"] for x in role] for role in (prices, dtms, coups)),
+            *args,
+        )
+        for i, px in enumerate(solved):
+            px["datos"][0]["dato"] = values[i]
+
+        return solved
+
+    # price solver of each priced instrument type
+    PRICE_SOLVERS = {
+        "fixed_coupon": "prc_to_yld",
+        "real_coupon": "prc_to_real_yld",
+        "floating": "prc_to_margin",
+    }
+
+    def solve_yields(self, groups, reordered, summary=None):
+
+        # yields (margins for floaters) of every group, with the prices of all
+        # groups of one instrument type solved in a single batch
+        ylds = {}
+
+        for group_type, solver in self.PRICE_SOLVERS.items():
+            priced = [g for g in groups if g.type == group_type]
+            if not priced:
+                continue
+
+            args = [
+                [s for g in priced for s in reordered[g.name][g.roles.index(role)]]
+                for role in ("px", "dtm", "coup")
+            ]
+            if group_type == "real_coupon":
+                # groups quoted in pesos are converted at the day's UDI value,
+                # a missing one (0) fails their bonds rather than mispricing them
+                udi = (summary or {}).get("UDI_MXN", {}).get("value", 0.0)
+                args.append(
+                    [
+                        udi if g.units == "pesos" else 1.0
+                        for g in priced
+                        for _ in reordered[g.name][0]
+                    ]
+                )
+
+            solved = getattr(self, solver)(*args)
+            start = 0
+            for g in priced:
+                n = len(reordered[g.name][0])
+                ylds[g.name] = solved[start : start + n]
+                start += n
+
+        for g in groups:
+            if g.type == "discount":
+                ylds[g.name] = reordered[g.name][g.roles.index("yld")]
+
+        return ylds
+
     def get_labels_dates_yields(self, curve_dict):
 
         # get labels, dates, and yields to parse in html
@@ -472,26 +758,59 @@ class BanxicoDataFetcher:
         curve_yields = []
         curve_dtms = []
 
-        # cetes
-        for i, tenor in enumerate(curve_dict.get("cetes").get("ylds")):
-            curve_labels.append(self.CETES_MATURITY_MAP_YLD.get(tenor.get("idSerie")))
-            curve_dates.append(tenor.get("datos")[0].get("fecha"))
-            curve_yields.append(tenor.get("datos")[0].get("dato"))
-            curve_dtms.append(
-                curve_dict.get("cetes").get("dtms")[i].get("datos")[0].get("dato")
-            )
-
-        # mbonos
-        for i, tenor in enumerate(curve_dict.get("mbonos").get("ylds")):
-            curve_labels.append(self.MBONOS_MATURITY_MAP_PX.get(tenor.get("idSerie")))
-            curve_dates.append(tenor.get("datos")[0].get("fecha"))
-            curve_yields.append(tenor.get("datos")[0].get("dato"))
-            curve_dtms.append(
-                curve_dict.get("mbonos").get("dtms")[i].get("datos")[0].get("dato")
-            )
+        # groups in curve order, each in order of maturity
+        for group in curve_dict.values():
+            for i, tenor in enumerate(group.get("ylds")):
+                curve_labels.append(self.registry.tenor(tenor.get("idSerie")))
+                curve_dates.append(tenor.get("datos")[0].get("fecha"))
+                curve_yields.append(tenor.get("datos")[0].get("dato"))
+                curve_dtms.append(group.get("dtms")[i].get("datos")[0].get("dato"))
 
         return curve_labels, curve_dates, curve_yields, curve_dtms
 
+    def get_off_curve_data(self, groups, reordered, ylds, curve_dtms, curve_yields):
+
+        # labels, dtms and solved values of groups not on the nominal curve,
+        # with breakeven inflation against the nominal curve for real yields
+        curve_dtms = np.asarray(curve_dtms, dtype=float)
+        curve_yields = np.asarray(curve_yields, dtype=float)
+
+        # nominal points the solver flagged invalid (-1.0) are not interpolated
+        valid = curve_yields != -1.0
+        curve_dtms, curve_yields = curve_dtms[valid], curve_yields[valid]
+
+        off_curve = {}
+        for g in groups:
+            if g.curve:
+                continue
+
+            dtms = [
+                x["datos"][0]["dato"] for x in reordered[g.name][g.roles.index("dtm")]
+            ]
+            # failed margins are NaN, which JSON cannot carry
+            values = [x["datos"][0]["dato"] for x in ylds[g.name]]
+            values = [None if v != v else v for v in values]
+            data = {
+                "type": g.type,
+                "labels": [self.registry.tenor(x["idSerie"]) for x in ylds[g.name]],
+                "dtms": dtms,
+                "values": values,
+            }
+
+            if g.type == "real_coupon" and curve_dtms.size:
+                # nominal yield interpolated at each real tenor, less its real yield
+                nominal = np.interp(dtms, curve_dtms, curve_yields)
+                data["breakeven"] = [
+                    None if real == -1.0 else round(float(n - real), 6)
+                    for n, real in zip(nominal, values)
+                ]
+
+            off_curve[g.name] = data
+
+        return off_curve
+
     def __repr__(self):
-        return f"<BanxicoData({len(self.CETES_MATURITY_MAP_YLD.keys())} cetes, \
-{len(self.MBONOS_MATURITY_MAP_PX.keys())} mbonos , {len(self.SUMMARY_MAP.keys())} summary stats)>"
+        groups = ", ".join(
+            f"{len(g.instruments)} {g.name}" for g in self.registry.groups
+        )
+        return f"<BanxicoData({groups}, {len(self.SUMMARY_MAP)} summary stats)>"
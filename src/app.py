@@ -1,19 +1,27 @@
-from flask import Flask, render_template
-from . import FIdash
+from flask import (
+    Flask,
+    Response,
+    before_render_template,
+    g,
+    jsonify,
+    render_template,
+    request,
+    stream_with_context,
+    template_rendered,
+)
+from .logging_config import configure_logging
+from .metrics import REGISTRY, REQUEST_SECONDS, TEMPLATE_RENDER_SECONDS
+from .profiling import RequestProfiler
 import os
-import sys
+import threading
+import time
 
 import logging
-import requests
 
 # --- Preliminary Tasks ---
 
-# set up the logger
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    stream=sys.stderr,
-)
+# set up the logger, level, format and async mode are read from the environment
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # declare project root and template path
@@ -23,36 +31,159 @@ template_path = os.path.join(project_root, "templates")
 
 # --- Initialisations ---
 
-# instantiate the data fetcher object only once when the application starts
-try:
-    banxico_data_fetcher = FIdash.BanxicoDataFetcher()
-    logger.info("BanxicoDataFetcher: intialised successfuly.")
-except ValueError as e:
-    # handle the error if the API key is missing during initialisation
-    logger.exception(e)
-    banxico_data_fetcher = None
-except Exception as e:
-    # handle unexpected intialisation error
-    logger.critical("BanxicoDataFetcher: unexpected error.")
-    logger.exception(e)
-    banxico_data_fetcher = None
+# the data fetcher (and with it requests, numpy and the C++ engine) is only
+# built on first use, so the app imports fast and pages that need no Banxico
+# data are served straight away
+NOT_INITIALISED = object()
+banxico_data_fetcher = NOT_INITIALISED
+fetcher_lock = threading.Lock()
+
+
+def init_banxico_data_fetcher():
+
+    from . import FIdash
+
+    # instantiate the data fetcher object only once
+    try:
+        fetcher = FIdash.BanxicoDataFetcher()
+        logger.info("BanxicoDataFetcher: intialised successfuly.")
+        return fetcher
+    except ValueError as e:
+        # handle the error if the API key is missing during initialisation
+        logger.exception(e)
+        return None
+    except Exception as e:
+        # handle unexpected intialisation error
+        logger.critical("BanxicoDataFetcher: unexpected error.")
+        logger.exception(e)
+        return None
+
+
+def get_banxico_data_fetcher():
+    global banxico_data_fetcher
+
+    if banxico_data_fetcher is NOT_INITIALISED:
+        with fetcher_lock:
+            if banxico_data_fetcher is NOT_INITIALISED:
+                banxico_data_fetcher = init_banxico_data_fetcher()
+
+    return banxico_data_fetcher
+
+
+# historical store, loaded on first use and reloaded when the file changes
+history_path = os.getenv(
+    "BANXICO_HISTORY_PATH", os.path.join(project_root, "data", "banxico_history.npz")
+)
+history_cache = None
+
+
+def get_history_store():
+    global history_cache
+
+    if history_cache is None:
+        from .history import HistoryStoreCache
+
+        history_cache = HistoryStoreCache(history_path)
+
+    return history_cache.get()
+
+
+# derived series engine, brought up to date with the store on each use
+derived_engine = None
+derived_lock = threading.Lock()
+
+
+def get_derived_engine(store):
+    global derived_engine
+
+    with derived_lock:
+        if derived_engine is None:
+            from .derived import DerivedSeriesEngine
+
+            derived_engine = DerivedSeriesEngine()
+
+        return derived_engine.update(store)
+
+
+# rolling tenor statistics, cached per (series, window) between requests
+rolling_analytics = None
+rolling_lock = threading.Lock()
+
+
+def get_rolling_analytics(store):
+    global rolling_analytics
+
+    with rolling_lock:
+        if rolling_analytics is None:
+            from .rolling import RollingAnalytics
+
+            rolling_analytics = RollingAnalytics()
+
+        return rolling_analytics.update(store)
+
+
+# rows kept by chart downsampling, per (route, series, range, width)
+downsample_cache = None
+
+
+def get_downsample_cache():
+    global downsample_cache
+
+    if downsample_cache is None:
+        from .downsample import DownsampleCache
+
+        downsample_cache = DownsampleCache()
+
+    return downsample_cache
+
+
+# --- Instrumentation ---
+
+
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+def record_request_time(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            endpoint=request.endpoint or "unknown",
+            status=response.status_code,
+        )
+    return response
+
+
+def start_render_timer(sender, template, context, **extra):
+    g.render_start = time.perf_counter()
+
+
+def record_render_time(sender, template, context, **extra):
+    start = g.pop("render_start", None)
+    if start is not None:
+        TEMPLATE_RENDER_SECONDS.observe(
+            time.perf_counter() - start, template=template.name
+        )
 
-# declare flask app
-app = Flask(__name__, template_folder=template_path)
 
 # --- Routes ---
 
 
 # home page route
-@app.route("/")
 def home():
     logger.debug("Rendering home page.")
     return render_template("index.html")
 
 
 # fixed income dashboard route
-@app.route("/fi_dashboard")
 def fi_dashboard():
+    # the data subsystem is only loaded by the routes that need it
+    import requests
+    from .resilience import UpstreamUnavailableError
+
+    banxico_data_fetcher = get_banxico_data_fetcher()
+
     # check proper api setup
     if banxico_data_fetcher is None:
         error_data = {
@@ -67,7 +198,18 @@ def fi_dashboard():
         curve_labels, curve_dates, curve_yields, curve_dtms, summary_data = (
             banxico_data_fetcher.get_data()
         )
+        off_curve = banxico_data_fetcher.off_curve
         logger.info("Retrieved data from Banxico API successfully.")
+    except UpstreamUnavailableError as e:
+        # circuit open or rate limited, failed fast without calling Banxico
+        logger.error("Banxico API temporarily unavailable: %s", e)
+        error_data = {
+            "message": "Banxico API temporarily unavailable, please try again later.",
+            "code": 503,
+            "reason": "Service Unavailable",
+        }
+        return handle_error(error_data)
+
     except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
         # connection errors
         logger.error("Network or timeout error fetching data from Banxico API.")
@@ -119,20 +261,263 @@ def fi_dashboard():
         curve_yields=curve_yields,
         curve_dtms=curve_dtms,
         summary_data=summary_data,
+        off_curve=off_curve,
     )
 
 
 # options pricer route
-@app.route("/options_pricing")
 def options_pricer():
     logger.debug("Rendering options pricing.")
     return render_template("options_pricing.html")
 
 
+# --- Bulk data routes ---
+
+
+def negotiate_format():
+
+    # JSON by default, a binary columnar format when the Accept header asks
+    from .wire import negotiate
+
+    return negotiate(request.accept_mimetypes)
+
+
+def columnar_response(columns, meta, media_type):
+
+    # arrays serialised straight from their buffers
+    from .wire import encode
+
+    response = Response(encode(columns, meta, media_type), content_type=media_type)
+    response.vary.add("Accept")
+    return response
+
+
+def not_acceptable():
+    from .wire import available_formats
+
+    return (
+        jsonify({"error": f"Acceptable formats: {', '.join(available_formats())}."}),
+        406,
+    )
+
+
+# multi-date curve comparison route, e.g. /api/curves?dates=latest,1W,1M,1Y
+MAX_CURVE_DATES = 64
+
+
+def api_curves():
+    from .history import resolve_date
+    from .wire import JSON
+
+    media_type = negotiate_format()
+    if media_type is None:
+        return not_acceptable()
+
+    store = get_history_store()
+    if store is None or len(store) == 0:
+        logger.error("Historical store not available at %s.", history_path)
+        return jsonify({"error": "Historical data not available."}), 503
+
+    specs = request.args.get("dates", "latest,1W,1M,1Y").split(",")
+    if len(specs) > MAX_CURVE_DATES:
+        return jsonify({"error": f"At most {MAX_CURVE_DATES} dates."}), 400
+
+    try:
+        dates = [resolve_date(spec, store.latest) for spec in specs]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    logger.debug("Building curves for %s dates.", len(dates))
+    if media_type != JSON:
+        labels, columns = store.curve_columns(dates)
+        return columnar_response(
+            columns, {"latest": str(store.latest), "labels": labels}, media_type
+        )
+
+    return jsonify({"latest": str(store.latest), "curves": store.curves(dates)})
+
+
+# derived series route, e.g. /api/derived?series=2s10s,10s30s&start=1Y&width=800
+def api_derived():
+    import numpy as np
+
+    from .downsample import chart_points
+    from .history import resolve_date
+    from .wire import JSON
+
+    media_type = negotiate_format()
+    if media_type is None:
+        return not_acceptable()
+
+    store = get_history_store()
+    if store is None or len(store) == 0:
+        logger.error("Historical store not available at %s.", history_path)
+        return jsonify({"error": "Historical data not available."}), 503
+
+    names = request.args.get("series")
+    try:
+        start = resolve_date(request.args.get("start", "1Y"), store.latest)
+        end = resolve_date(request.args.get("end", "latest"), store.latest)
+        engine = get_derived_engine(store)
+
+        # another request may update the engine in place, so its arrays are
+        # read together under the lock
+        with derived_lock:
+            dates, values = engine.series(
+                names.split(",") if names else None, start=start, end=end
+            )
+            source = engine.values
+        points = chart_points(request.args.get("width"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # about one point per pixel of the chart, whatever the range
+    if points is not None:
+        rows = get_downsample_cache().rows(
+            ("derived", tuple(values), start, end, points),
+            source,
+            list(values.values()),
+            points,
+        )
+        dates, values = dates[rows], {k: v[rows] for k, v in values.items()}
+
+    definitions = {d.name: d for d in engine.definitions}
+    if media_type != JSON:
+        meta = {
+            "latest": str(store.latest),
+            "units": {name: definitions[name].units for name in values},
+        }
+        return columnar_response({"dates": dates, **values}, meta, media_type)
+
+    return jsonify(
+        {
+            "latest": str(store.latest),
+            "dates": [str(d) for d in dates],
+            "series": {
+                name: {
+                    "description": definitions[name].description,
+                    "units": definitions[name].units,
+                    "values": [None if np.isnan(v) else round(v, 4) for v in series],
+                }
+                for name, series in values.items()
+            },
+        }
+    )
+
+
+# rolling statistics route, e.g. /api/rolling?series=10 Years&window=1Y&start=5Y
+def api_rolling():
+    import numpy as np
+
+    from .downsample import chart_points
+    from .history import resolve_date
+    from .rolling import window_days
+    from .wire import JSON
+
+    media_type = negotiate_format()
+    if media_type is None:
+        return not_acceptable()
+
+    store = get_history_store()
+    if store is None or len(store) == 0:
+        logger.error("Historical store not available at %s.", history_path)
+        return jsonify({"error": "Historical data not available."}), 503
+
+    name = request.args.get("series", "10 Years")
+    try:
+        window = window_days(request.args.get("window", "3M"))
+        start = resolve_date(request.args.get("start", "1Y"), store.latest)
+        end = resolve_date(request.args.get("end", "latest"), store.latest)
+        analytics = get_rolling_analytics(store)
+        with rolling_lock:
+            dates, yields, stats = analytics.window(name, window, start, end)
+            source = analytics.engine.values
+        points = chart_points(request.args.get("width"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # the yield's shape decides the rows kept, its statistics are smooth
+    if points is not None:
+        rows = get_downsample_cache().rows(
+            ("rolling", name, window, start, end, points), source, [yields], points
+        )
+        dates, yields = dates[rows], yields[rows]
+        stats = {k: v[rows] for k, v in stats.items()}
+
+    if media_type != JSON:
+        meta = {"latest": str(store.latest), "series": name, "window": window}
+        return columnar_response(
+            {"dates": dates, "yields": yields, **stats}, meta, media_type
+        )
+
+    def to_list(values):
+        return [None if np.isnan(v) else round(v, 4) for v in values]
+
+    payload = {k: to_list(v) for k, v in stats.items()}
+    payload.update(
+        {
+            "latest": str(store.latest),
+            "series": name,
+            "window": window,
+            "dates": [str(d) for d in dates],
+            "yields": to_list(yields),
+        }
+    )
+    return jsonify(payload)
+
+
+# streamed export route, e.g. /api/export?data=curves&format=csv&start=5Y
+def api_export():
+    from .export import EXPORT_FORMATS, EXPORT_KINDS, csv_stream, parquet_stream
+    from .history import resolve_date
+
+    store = get_history_store()
+    if store is None or len(store) == 0:
+        logger.error("Historical store not available at %s.", history_path)
+        return jsonify({"error": "Historical data not available."}), 503
+
+    kind = request.args.get("data", "curves")
+    file_format = request.args.get("format", "csv")
+    if kind not in EXPORT_KINDS:
+        return jsonify({"error": f"Unknown export: {kind}"}), 400
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unknown format: {file_format}"}), 400
+
+    try:
+        start = resolve_date(
+            request.args.get("start", str(store.dates[0])), store.latest
+        )
+        end = resolve_date(request.args.get("end", "latest"), store.latest)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if file_format == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            return jsonify({"error": "Parquet export needs pyarrow."}), 406
+        stream = parquet_stream(kind, store, start, end)
+    else:
+        stream = csv_stream(kind, store, start, end)
+
+    # generated a chunk of dates at a time as the client reads
+    logger.debug("Exporting %s from %s to %s as %s.", kind, start, end, file_format)
+    filename = f"banxico_{kind}_{start}_{end}.{file_format}"
+    return Response(
+        stream_with_context(stream),
+        content_type=EXPORT_FORMATS[file_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+# prometheus metrics route
+def metrics():
+    return Response(REGISTRY.render(), content_type=REGISTRY.CONTENT_TYPE)
+
+
 # --- Error Handling ---
 
 
-@app.errorhandler(404)
 def not_found_error(e):
     # log the not found error
     logger.warning("Page not found")
@@ -141,7 +526,6 @@ def not_found_error(e):
     return handle_error(error_data)
 
 
-@app.errorhandler(500)
 def internal_server_error(e):
     # log the unhandled error
     logger.error("Unexpected error occured.")
@@ -166,5 +550,41 @@ def handle_error(error_data):
     return render_template("error.html", error_data=error_data), status_code
 
 
+# --- App Factory ---
+
+
+def create_app():
+
+    # declare flask app
+    app = Flask(__name__, template_folder=template_path)
+
+    # instrumentation
+    app.before_request(start_request_timer)
+    app.after_request(record_request_time)
+    before_render_template.connect(start_render_timer, app)
+    template_rendered.connect(record_render_time, app)
+
+    # opt-in request profiling, no hooks are installed unless PROFILE_ENABLED is set
+    app.extensions["request_profiler"] = RequestProfiler.from_env(app)
+
+    # routes
+    app.add_url_rule("/", "home", home)
+    app.add_url_rule("/fi_dashboard", "fi_dashboard", fi_dashboard)
+    app.add_url_rule("/options_pricing", "options_pricer", options_pricer)
+    app.add_url_rule("/api/curves", "api_curves", api_curves)
+    app.add_url_rule("/api/derived", "api_derived", api_derived)
+    app.add_url_rule("/api/rolling", "api_rolling", api_rolling)
+    app.add_url_rule("/api/export", "api_export", api_export)
+    app.add_url_rule("/metrics", "metrics", metrics)
+
+    # error handling
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, internal_server_error)
+
+    return app
+
+
+app = create_app()
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,252 @@
+"""
+Backfills the history store from the Banxico SIE API.
+
+usage: python -m src.backfill --start 2005-01-01 [--end 2025-10-27]
+       [--chunk-days 365] [--workers 4] [--save-every 8]
+       [--path data/banxico_history.npz]
+
+The date range is split into chunks fetched on a pool of threads sharing one
+BanxicoDataFetcher, whose token bucket the workers queue on, so the whole run
+stays within the API rate limit. Every few chunks (and at the end) the store
+is saved and the chunks merged since are recorded in a checkpoint file, so an
+interrupted run picks up where it stopped when started again with the same
+arguments.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from .FIdash import BanxicoDataFetcher
+from .history import MAX_SERIES_PER_REQUEST, HistoryStore, history_series_ids
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.getenv(
+    "BANXICO_HISTORY_PATH", os.path.join(PROJECT_ROOT, "data", "banxico_history.npz")
+)
+
+BackfillReport = namedtuple(
+    "BackfillReport",
+    [
+        "chunks",
+        "skipped",
+        "failed",
+        "points",
+        "fetch_seconds",
+    ],
+)
+
+
+def date_chunks(start, end, chunk_days):
+
+    # consecutive (start, end) ranges of at most chunk_days days, both ends
+    # inclusive, as "YYYY-MM-DD" strings
+    if chunk_days < 1:
+        raise ValueError("Chunks must be at least one day long.")
+
+    first = np.datetime64(start, "D")
+    last = np.datetime64(end, "D")
+    if last < first:
+        raise ValueError(f"Backfill end {end} is before its start {start}.")
+
+    starts = np.arange(first, last + 1, chunk_days)
+    ends = np.minimum(starts + chunk_days - 1, last)
+    return [(str(s), str(e)) for s, e in zip(starts, ends)]
+
+
+class Checkpoint:
+    """
+    Chunks of a backfill already merged into the saved store, kept as a JSON
+    file next to it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done = {tuple(chunk) for chunk in json.load(f)["done"]}
+            logger.info("Resuming backfill: %s chunks already done.", len(self.done))
+
+    def mark(self, *chunks):
+
+        # write then rename, so an interruption never leaves a partial file
+        self.done.update(tuple(chunk) for chunk in chunks)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+    def __contains__(self, chunk):
+        return tuple(chunk) in self.done
+
+
+def fetch_chunk(fetcher, chunk, series_ids):
+
+    # every series over one date range, in as few requests as the API allows,
+    # queueing for the rate limit shared with the other workers
+    history = {}
+    for i in range(0, len(series_ids), MAX_SERIES_PER_REQUEST):
+        history.update(
+            fetcher.fetch_history(
+                series_ids[i : i + MAX_SERIES_PER_REQUEST],
+                *chunk,
+                rate_limit_wait=math.inf,
+            )
+        )
+    return history
+
+
+def count_points(history):
+    return sum(int(np.count_nonzero(~np.isnan(s.values))) for s in history.values())
+
+
+def backfill(
+    fetcher,
+    start,
+    end,
+    path,
+    chunk_days=365,
+    workers=4,
+    save_every=8,
+    checkpoint_path=None,
+    series_ids=None,
+):
+    """
+    Fetches `start` to `end` into the store at `path` (created if missing),
+    skipping chunks the checkpoint records as done and saving every
+    `save_every` merged chunks. Chunks that fail are logged and left for the
+    next run. Returns a BackfillReport.
+    """
+
+    series_ids = list(series_ids or history_series_ids())
+    checkpoint = Checkpoint(checkpoint_path or path + ".checkpoint.json")
+    store = HistoryStore.load(path) if os.path.exists(path) else HistoryStore()
+
+    chunks = date_chunks(start, end, chunk_days)
+    pending = [chunk for chunk in chunks if chunk not in checkpoint]
+    logger.info(
+        "Backfilling %s to %s: %s of %s chunks to fetch on %s workers.",
+        start,
+        end,
+        len(pending),
+        len(chunks),
+        workers,
+    )
+
+    failed = []
+    unsaved = []
+    points = 0
+
+    def save():
+
+        # the store is saved before its chunks are marked done, so the
+        # checkpoint never records a chunk the saved store lacks
+        if unsaved:
+            store.save(path)
+            checkpoint.mark(*unsaved)
+            unsaved.clear()
+
+    fetch_start = time.perf_counter()
+
+    # chunks are fetched concurrently, merged and saved on this thread only
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_chunk, fetcher, chunk, series_ids): chunk
+            for chunk in pending
+        }
+        try:
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    history = future.result()
+                except Exception as e:
+                    logger.error("Chunk %s to %s failed: %s", *chunk, e)
+                    failed.append(chunk)
+                    continue
+
+                store.merge(history)
+                unsaved.append(chunk)
+                points += count_points(history)
+                logger.info("Chunk %s to %s done.", *chunk)
+
+                if len(unsaved) >= save_every:
+                    save()
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            save()
+            raise
+
+    save()
+
+    fetch_seconds = time.perf_counter() - fetch_start
+    logger.info(
+        "Fetched %s points in %.1fs (%.0f points/sec).",
+        points,
+        fetch_seconds,
+        points / fetch_seconds if fetch_seconds else 0.0,
+    )
+
+    return BackfillReport(
+        chunks=len(pending) - len(failed),
+        skipped=len(chunks) - len(pending),
+        failed=failed,
+        points=points,
+        fetch_seconds=fetch_seconds,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", default=str(np.datetime64("today", "D")))
+    parser.add_argument("--chunk-days", type=int, default=365)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--save-every", type=int, default=8)
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--checkpoint", default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    report = backfill(
+        BanxicoDataFetcher(),
+        args.start,
+        args.end,
+        args.path,
+        chunk_days=args.chunk_days,
+        workers=args.workers,
+        save_every=args.save_every,
+        checkpoint_path=args.checkpoint,
+    )
+
+    print(
+        f"{report.chunks} chunks fetched ({report.skipped} already done), "
+        f"{report.points} points at "
+        f"{report.points / report.fetch_seconds if report.fetch_seconds else 0:.0f}"
+        " points/sec."
+    )
+    if report.failed:
+        print(
+            f"{len(report.failed)} chunks failed, run again to resume.",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
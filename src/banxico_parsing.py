@@ -0,0 +1,117 @@
+import logging
+
+import numpy as np
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+# placeholders Banxico returns instead of a number
+MISSING_DATOS = ("N/E", "", "-")
+
+
+def as_string_column(column):
+
+    # fixed width bytes or unicode array, without per-element conversion
+    column = np.asarray(column)
+    if column.dtype.kind not in "SU":
+        column = column.astype("U")
+    return column
+
+
+def parse_values(datos):
+    """
+    Converts a column of Banxico `dato` strings into float64 in one pass.
+
+    Thousand separators are removed and placeholders such as "N/E" become NaN.
+    Returns the values and a boolean mask of the missing entries.
+    """
+
+    datos = as_string_column(datos)
+    if len(datos) == 0:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=bool)
+
+    # match the column's string kind (bytes or unicode) for the literals
+    lit = (lambda x: x.encode("ascii")) if datos.dtype.kind == "S" else str
+
+    datos = np.char.replace(np.char.strip(datos), lit(","), lit(""))
+    missing = np.isin(datos, [lit(x) for x in MISSING_DATOS])
+
+    try:
+        values = np.where(missing, lit("nan"), datos).astype(np.float64)
+    except ValueError:
+        # unexpected placeholder somewhere in the column, mask it as missing
+        values = np.full(len(datos), np.nan)
+        for i, dato in enumerate(datos):
+            if missing[i]:
+                continue
+            try:
+                values[i] = float(dato)
+            except ValueError:
+                logger.warning("Unparseable Banxico value %r treated as missing.", dato)
+
+    missing |= np.isnan(values)
+
+    return values, missing
+
+
+def parse_ints(datos, fill_value=0):
+    """
+    Converts a column of integer-like `dato` strings (e.g. days to maturity,
+    possibly formatted as "1,092.000000") into int32, truncating like int().
+
+    Missing entries are set to `fill_value` and flagged in the returned mask.
+    """
+
+    values, missing = parse_values(datos)
+    ints = np.where(missing, fill_value, np.trunc(values)).astype(np.int32)
+    return ints, missing
+
+
+def parse_dates(fechas):
+    """
+    Converts a column of Banxico `fecha` strings ("dd/mm/yyyy") into
+    datetime64[D]. Unparseable dates become NaT.
+    """
+
+    fechas = np.char.strip(as_string_column(fechas))
+    n = len(fechas)
+
+    if n == 0:
+        return np.empty(0, dtype="datetime64[D]")
+
+    # match the column's string kind (bytes or unicode) for the literals
+    kind = fechas.dtype.kind
+    lit = (lambda x: x.encode("ascii")) if kind == "S" else str
+
+    # fast path, every date zero padded: reorder the characters to yyyy-mm-dd
+    iso = None
+    if fechas.dtype.itemsize == 10 * (1 if kind == "S" else 4):
+        raw = fechas.view(np.uint8 if kind == "S" else np.uint32).reshape(n, 10)
+        if (raw[:, 2] == ord("/")).all() and (raw[:, 5] == ord("/")).all():
+            iso = raw[:, [6, 7, 8, 9, 5, 3, 4, 2, 0, 1]].copy()
+            iso[:, [4, 7]] = ord("-")
+            iso = iso.view(f"{kind}10").ravel()
+
+    # general path, pad day and month before reordering
+    if iso is None:
+        day, _, rest = np.char.partition(fechas, lit("/")).T
+        month, _, year = np.char.partition(rest, lit("/")).T
+        iso = np.char.add(
+            np.char.add(np.char.add(year, lit("-")), np.char.zfill(month, 2)),
+            np.char.add(lit("-"), np.char.zfill(day, 2)),
+        )
+
+    # well formed but invalid dates, e.g. "32/13/2020", fail the whole column
+    # and are masked one by one
+    try:
+        return iso.astype("datetime64[D]")
+    except ValueError:
+        dates = np.empty(n, dtype="datetime64[D]")
+        for i, date in enumerate(iso):
+            try:
+                dates[i] = np.datetime64(str(date, "ascii") if kind == "S" else date)
+            except ValueError:
+                logger.warning("Unparseable Banxico date %r treated as missing.", date)
+                dates[i] = np.datetime64("NaT")
+        return dates
@@ -0,0 +1,99 @@
+import logging
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from .banxico_parsing import parse_dates, parse_values
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+SeriesData = namedtuple("SeriesData", ["dates", "values"])
+
+
+class BanxicoStreamParser:
+    """
+    Incremental parser for Banxico SIE `/datos` responses.
+
+    Bytes are fed as they arrive from the network. Only the raw `fecha` and
+    `dato` strings of each data point are picked out of the stream, and every
+    `batch_size` points they are converted in one vectorized pass into typed
+    arrays (datetime64[D] dates, float64 values), so the JSON tree is never
+    materialised and peak memory stays proportional to the parsed arrays.
+    Missing values ("N/E") are stored as NaN.
+    """
+
+    # series header or a single data point, the only parts of the payload used
+    TOKEN = re.compile(
+        rb'"idSerie"\s*:\s*"(?P<id>[^"]*)"'
+        rb'|\{\s*"fecha"\s*:\s*"(?P<fecha>[^"]*)"'
+        rb'\s*,\s*"dato"\s*:\s*"(?P<dato>[^"]*)"\s*\}'
+    )
+
+    # longest incomplete token that may straddle two chunks
+    MAX_TOKEN = 256
+
+    def __init__(self, batch_size=8192):
+        self.batch_size = batch_size
+        self.buffer = b""
+        self.series = {}
+        self.current = None
+
+    def feed(self, chunk):
+
+        buffer = self.buffer + chunk
+        consumed = 0
+
+        for match in self.TOKEN.finditer(buffer):
+            series_id = match.group("id")
+            if series_id is not None:
+                self.current = self.series.setdefault(
+                    series_id.decode("ascii"),
+                    {"fechas": [], "datos": [], "dates": [], "values": []},
+                )
+            elif self.current is not None:
+                self.current["fechas"].append(match.group("fecha"))
+                self.current["datos"].append(match.group("dato"))
+                if len(self.current["datos"]) >= self.batch_size:
+                    self.flush(self.current)
+            consumed = match.end()
+
+        # keep only the tail that may hold the start of an incomplete token
+        self.buffer = buffer[max(consumed, len(buffer) - self.MAX_TOKEN) :]
+
+    @staticmethod
+    def flush(pending):
+
+        # convert the pending raw strings into typed arrays
+        if pending["datos"]:
+            pending["dates"].append(parse_dates(pending["fechas"]))
+            pending["values"].append(parse_values(pending["datos"])[0])
+            pending["fechas"] = []
+            pending["datos"] = []
+
+    def close(self):
+
+        parsed = {}
+        for series_id, pending in self.series.items():
+            self.flush(pending)
+            parsed[series_id] = SeriesData(
+                dates=np.concatenate(
+                    pending["dates"] or [np.empty(0, dtype="datetime64[D]")]
+                ),
+                values=np.concatenate(
+                    pending["values"] or [np.empty(0, dtype=np.float64)]
+                ),
+            )
+
+        logger.debug(
+            "Parsed %s series with %s data points.",
+            len(parsed),
+            sum(len(s.values) for s in parsed.values()),
+        )
+
+        self.buffer = b""
+        self.series = {}
+        self.current = None
+        return parsed
@@ -0,0 +1,227 @@
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from .FIdash import BanxicoDataFetcher
+from .history import curve_layout, solve_mbonos
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+# a derived series is a weighted sum of legs, each leg a curve tenor label or
+# a SUMMARY_MAP name, with the weights already scaled to the series units
+DerivedSeries = namedtuple("DerivedSeries", ["name", "description", "units", "legs"])
+
+DERIVED_SERIES = (
+    DerivedSeries(
+        "2s10s",
+        "10 year minus 2 year yield",
+        "bp",
+        {"10 Years": 100.0, "2 Years": -100.0},
+    ),
+    DerivedSeries(
+        "10s30s",
+        "30 year minus 10 year yield",
+        "bp",
+        {"30 Years": 100.0, "10 Years": -100.0},
+    ),
+    DerivedSeries(
+        "2s5s10s",
+        "Butterfly, twice the 5 year less the 2 and 10 year yields",
+        "bp",
+        {"5 Years": 200.0, "2 Years": -100.0, "10 Years": -100.0},
+    ),
+    DerivedSeries(
+        "TIIE28-Target",
+        "TIIE 28 days minus the Banxico target rate",
+        "bp",
+        {"TIIE28": 100.0, "TargetRate": -100.0},
+    ),
+    DerivedSeries(
+        "Real10Y",
+        "10 year yield minus annual inflation",
+        "%",
+        {"10 Years": 1.0, "Inflation": -1.0},
+    ),
+)
+
+
+class DerivedSeriesEngine:
+    """
+    Fixed income indicators (slopes, butterflies, spreads) computed over the
+    whole HistoryStore as array operations.
+
+    The engine keeps the raw inputs it was computed from, so `update` only
+    recomputes the rows from the first one that changed: appending a day
+    solves and combines that day alone.
+    """
+
+    def __init__(self, definitions=DERIVED_SERIES):
+        self.definitions = tuple(definitions)
+        self.names = [d.name for d in self.definitions]
+
+        # legs shared between definitions are only computed once
+        self.legs = list(dict.fromkeys(leg for d in self.definitions for leg in d.legs))
+
+        layout = curve_layout()
+        summary = {name: s for s, name in BanxicoDataFetcher.SUMMARY_MAP.items()}
+        direct = {label: yld_id for label, yld_id, _ in layout["cetes"]}
+        direct.update(summary)
+        mbonos = {label: ids for label, *ids in layout["mbonos"]}
+
+        self.direct = [
+            (i, direct[leg]) for i, leg in enumerate(self.legs) if leg in direct
+        ]
+        self.mbonos = [
+            (i, mbonos[leg]) for i, leg in enumerate(self.legs) if leg in mbonos
+        ]
+
+        unknown = set(self.legs) - set(direct) - set(mbonos)
+        if unknown:
+            raise ValueError(f"Unknown derived series legs: {sorted(unknown)}")
+
+        # series whose publication makes a new observation of each leg
+        self.quote_ids = {
+            leg: direct[leg] if leg in direct else mbonos[leg][0] for leg in self.legs
+        }
+
+        # raw store series every leg is computed from
+        self.input_ids = [s for _, s in self.direct] + [
+            s for _, ids in self.mbonos for s in ids
+        ]
+
+        # (legs x definitions) weights, so a day is one row of a product
+        self.weights = np.zeros((len(self.legs), len(self.definitions)))
+        for j, definition in enumerate(self.definitions):
+            for leg, weight in definition.legs.items():
+                self.weights[self.legs.index(leg), j] = weight
+
+        self.source = None
+        self.dates = np.empty(0, dtype="datetime64[D]")
+        self.inputs = np.empty((0, len(self.input_ids)))
+        self.values = np.empty((0, len(self.definitions)))
+        self.rows_computed = 0
+
+    # --- computation ---
+
+    def leg_values(self, store, rows):
+
+        # (rows x legs) forward filled leg values, Mbono yields solved in one batch
+        legs = np.full((len(rows), len(self.legs)), np.nan)
+
+        if self.direct:
+            columns, series_ids = zip(*self.direct)
+            legs[:, list(columns)] = store.take(rows, series_ids)
+
+        if self.mbonos:
+            columns, ids = zip(*self.mbonos)
+            px_ids, dtm_ids, coup_ids = zip(*ids)
+            legs[:, list(columns)] = solve_mbonos(
+                store.take(rows, px_ids),
+                store.take(rows, dtm_ids),
+                store.take(rows, coup_ids),
+            )
+
+        return legs
+
+    def combine(self, legs):
+
+        # a series is missing on a day only if one of its own legs is
+        values = legs.copy()
+        values[np.isnan(values)] = 0.0
+        combined = values @ self.weights
+        missing = np.isnan(legs).astype(np.float64) @ (self.weights != 0)
+        combined[missing > 0] = np.nan
+        return combined
+
+    def raw_inputs(self, store):
+        inputs = np.full((len(store.dates), len(self.input_ids)), np.nan)
+        for i, series_id in enumerate(self.input_ids):
+            column = store.columns.get(series_id)
+            if column is not None:
+                inputs[:, i] = store.values[:, column]
+        return inputs
+
+    def first_changed_row(self, dates, inputs):
+
+        # forward filled values only depend on earlier rows, so everything
+        # before the first changed row is still valid
+        n = min(len(self.dates), len(dates))
+        changed = (self.dates[:n] != dates[:n]) | (
+            (self.inputs[:n] != inputs[:n])
+            & ~(np.isnan(self.inputs[:n]) & np.isnan(inputs[:n]))
+        ).any(axis=1)
+
+        rows = np.flatnonzero(changed)
+        return int(rows[0]) if len(rows) else n
+
+    def update(self, store):
+        """
+        Brings the derived series in line with `store`, recomputing only the
+        rows that are new or follow a changed observation.
+        """
+
+        # stores replace their arrays on every merge, so an unchanged array
+        # means there is nothing to do
+        if store.values is self.source:
+            return self
+
+        inputs = self.raw_inputs(store)
+        start = self.first_changed_row(store.dates, inputs)
+        rows = np.arange(start, len(store.dates))
+
+        values = self.combine(self.leg_values(store, rows))
+        self.values = np.vstack([self.values[:start], values])
+        self.dates = store.dates
+        self.inputs = inputs
+        self.source = store.values
+        self.rows_computed += len(rows)
+
+        logger.debug(
+            "Derived series recomputed from row %s (%s rows).", start, len(rows)
+        )
+        return self
+
+    # --- queries ---
+
+    def series(self, names=None, start=None, end=None):
+        """
+        Dates and {name: values} of the derived series between `start` and
+        `end` (inclusive, numpy datetime64 or None for unbounded).
+        """
+
+        names = self.names if names is None else list(names)
+        unknown = set(names) - set(self.names)
+        if unknown:
+            raise ValueError(f"Unknown derived series: {sorted(unknown)}")
+
+        lo = 0 if start is None else np.searchsorted(self.dates, start, side="left")
+        hi = (
+            len(self.dates)
+            if end is None
+            else np.searchsorted(self.dates, end, side="right")
+        )
+
+        return self.dates[lo:hi], {
+            name: self.values[lo:hi, self.names.index(name)] for name in names
+        }
+
+    def observed(self, name):
+        """
+        Boolean mask of the rows on which a leg of `name` was published, as
+        opposed to carried forward over a date only other series have.
+        """
+
+        if name not in self.names:
+            raise ValueError(f"Unknown derived series: {name}")
+
+        legs = self.definitions[self.names.index(name)].legs
+        columns = [self.input_ids.index(self.quote_ids[leg]) for leg in legs]
+        return ~np.isnan(self.inputs[:, columns]).all(axis=1)
+
+    def __repr__(self):
+        return (
+            f"<DerivedSeriesEngine({len(self.names)} series, {len(self.dates)} dates)>"
+        )
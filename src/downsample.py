@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+# most points a chart is sent per series, whatever the requested width
+MAX_POINTS = 4000
+
+
+def chart_points(width):
+    """
+    Points per series for a chart `width` pixels wide, one per pixel, from
+    a query string value. None means no downsampling.
+    """
+
+    if width is None:
+        return None
+    if not str(width).isdigit() or int(width) < 3:
+        raise ValueError(f"Width must be a whole number of at least 3: {width}")
+    return min(int(width), MAX_POINTS)
+
+
+def lttb(y, n_out):
+    """
+    Indices of the `n_out` points of `y` kept by Largest-Triangle-Three-Buckets
+    (Steinarsson, 2013), against the row number. Missing values are skipped;
+    the first and last valid points are always kept.
+    """
+
+    valid = np.flatnonzero(np.isfinite(y))
+    if len(valid) <= n_out:
+        return valid
+    if n_out < 3:
+        return valid[[0, -1]][:n_out]
+
+    x, y = valid.astype(float), np.asarray(y, dtype=float)[valid]
+
+    # interior points split into n_out - 2 buckets of near equal size
+    edges = np.linspace(1, len(valid) - 1, n_out - 1).astype(np.int64)
+
+    # each bucket's point forms the largest triangle with the point kept in
+    # the previous bucket and the mean of the next one
+    next_x = np.append(
+        [x[lo:hi].mean() for lo, hi in zip(edges[1:-1], edges[2:])], x[-1]
+    )
+    next_y = np.append(
+        [y[lo:hi].mean() for lo, hi in zip(edges[1:-1], edges[2:])], y[-1]
+    )
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, len(valid) - 1
+    a = 0
+    for i, (lo, hi) in enumerate(zip(edges[:-1], edges[1:])):
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+
+    return valid[kept]
+
+
+def downsample_rows(columns, n_out):
+
+    # rows kept for any of the columns, so every series keeps its shape on the
+    # shared dates axis
+    rows = [lttb(values, n_out) for values in columns]
+    return np.unique(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int64)
+
+
+class DownsampleCache:
+    """
+    Rows kept by the chart downsampling, by (route, series, range, width).
+
+    Each entry remembers the array it was computed from, so new or revised
+    history (which replaces that array) recomputes it on the next request.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = (
+            int(os.getenv("CHART_DOWNSAMPLE_CACHE_SIZE", "256"))
+            if maxsize is None
+            else maxsize
+        )
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def rows(self, key, source, columns, n_out):
+        """
+        Rows of `columns` (arrays aligned with the requested dates) to send for
+        `key`, computed from `source` if not cached.
+        """
+
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is not None and cached[0] is source:
+                self.entries.move_to_end(key)
+                return cached[1]
+
+        rows = downsample_rows(columns, n_out)
+        logger.debug(
+            "Downsampled %s to %s of %s rows.", key, len(rows), len(columns[0])
+        )
+
+        with self.lock:
+            self.entries[key] = (source, rows)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        return rows
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,181 @@
+import logging
+
+import numpy as np
+
+from .FIdash import BanxicoDataFetcher
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+# stored dates per generated chunk, bounds the memory an export holds
+EXPORT_CHUNK_ROWS = 256
+
+EXPORT_KINDS = ("curves", "summary")
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def row_chunks(store, start, end, chunk_rows=None):
+
+    # stored rows between start and end (inclusive), a chunk at a time
+    chunk_rows = chunk_rows or EXPORT_CHUNK_ROWS
+    lo = np.searchsorted(store.dates, start, side="left")
+    hi = np.searchsorted(store.dates, end, side="right")
+    for first in range(lo, hi, chunk_rows):
+        yield np.arange(first, min(first + chunk_rows, hi))
+
+
+def curve_chunks(store, start, end, chunk_rows=None):
+    """
+    Curves of each stored date with a curve quote, one (dates, labels, yields,
+    dtms) chunk at a time, with a chunk's Mbono prices solved in one batch.
+    """
+
+    for rows in row_chunks(store, start, end, chunk_rows):
+        rows = store.quoted(rows)
+        labels, ylds, dtms = store.curve_matrix(rows)
+        yield store.dates[rows], labels, ylds, dtms
+
+
+def summary_chunks(store, start, end, chunk_rows=None):
+    """
+    Observed values of each SUMMARY_MAP series, one (dates, names, values)
+    chunk at a time, NaN on dates without a publication.
+    """
+
+    summary = BanxicoDataFetcher.SUMMARY_MAP
+    columns = [store.columns.get(s, -1) for s in summary]
+
+    for rows in row_chunks(store, start, end, chunk_rows):
+        values = np.full((len(rows), len(columns)), np.nan)
+        for j, column in enumerate(columns):
+            if column >= 0:
+                values[:, j] = store.values[rows, column]
+        yield store.dates[rows], list(summary.values()), values
+
+
+def long_records(kind, chunk):
+
+    # one record per date and series, as columns
+    if kind == "curves":
+        dates, labels, ylds, dtms = chunk
+        records = {
+            "date": np.repeat(dates, len(labels)),
+            "tenor": np.tile(np.array(labels, dtype=object), len(dates)),
+            "dtm": dtms.ravel(),
+            "yield": ylds.ravel(),
+        }
+    else:
+        dates, names, values = chunk
+        records = {
+            "date": np.repeat(dates, len(names)),
+            "series": np.tile(np.array(names, dtype=object), len(dates)),
+            "value": values.ravel(),
+        }
+
+    # points never published are left out
+    last = list(records)[-1]
+    published = ~np.isnan(records[last])
+    return {k: v[published] for k, v in records.items()}
+
+
+def chunks(kind, store, start, end):
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown export: {kind}")
+    source = curve_chunks if kind == "curves" else summary_chunks
+    return source(store, start, end)
+
+
+def csv_stream(kind, store, start, end):
+    """
+    CSV text of an export, the header first and then one piece per chunk of
+    stored dates.
+    """
+
+    header = "date,tenor,dtm,yield" if kind == "curves" else "date,series,value"
+    yield header + "\n"
+
+    exported = 0
+    for chunk in chunks(kind, store, start, end):
+        records = long_records(kind, chunk)
+        if kind == "curves":
+            lines = [
+                f"{d},{t},{'' if np.isnan(m) else int(m)},{y:.6f}"
+                for d, t, m, y in zip(*records.values())
+            ]
+        else:
+            lines = [f"{d},{s},{v:.6f}" for d, s, v in zip(*records.values())]
+
+        exported += len(lines)
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    logger.debug("Exported %s %s records as CSV.", exported, kind)
+
+
+class ChunkSink:
+    """
+    Write-only file the Parquet writer writes into, drained by the generator
+    after each row group so only one row group is held at a time.
+    """
+
+    def __init__(self):
+        self.pieces = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.pieces.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.pieces)
+        self.pieces = []
+        return data
+
+
+def parquet_stream(kind, store, start, end):
+    """
+    Parquet file of an export, written one row group per chunk of stored
+    dates and yielded as each is written. Needs pyarrow.
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    label = "tenor" if kind == "curves" else "series"
+    fields = [("date", pa.date32()), (label, pa.string())]
+    if kind == "curves":
+        fields += [("dtm", pa.float64()), ("yield", pa.float64())]
+    else:
+        fields += [("value", pa.float64())]
+    schema = pa.schema(fields)
+
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in chunks(kind, store, start, end):
+            records = long_records(kind, chunk)
+            writer.write_table(
+                pa.table(
+                    {
+                        k: pa.array(v, type=schema.field(k).type)
+                        for k, v in records.items()
+                    },
+                    schema=schema,
+                )
+            )
+            data = sink.drain()
+            if data:
+                yield data
+
+    yield sink.drain()
@@ -0,0 +1,434 @@
+import logging
+import os
+import re
+from datetime import date, timedelta
+
+import numpy as np
+
+from .FIdash import BanxicoDataFetcher
+from .yield_memo import YieldMemo
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+def curve_layout():
+    """
+    Series ids of each curve tenor, in order of increasing maturity, from the
+    Cetes and Mbono groups of the instrument registry.
+    """
+
+    registry = BanxicoDataFetcher.REGISTRY
+
+    cetes = [
+        (i.tenor, i.series["yld"], i.series["dtm"])
+        for i in registry.group("cetes").instruments
+    ]
+    mbonos = [
+        (i.tenor, i.series["px"], i.series["dtm"], i.series["coup"])
+        for i in registry.group("mbonos").instruments
+    ]
+
+    return {"cetes": cetes, "mbonos": mbonos}
+
+
+def history_series_ids():
+
+    # every series kept in the historical store
+    return BanxicoDataFetcher.REGISTRY.series_ids()
+
+
+# mbono solves shared by every historical query
+yield_memo = YieldMemo()
+
+
+def solve_mbonos(pxs, dtms, coups):
+    """
+    Mbono yields for arrays of prices, days to maturity and coupons (any
+    shape) in a single batch call to the C++ engine, NaN where an input is
+    missing or the solver fails. Bonds already solved come from the memo.
+    """
+
+    ylds = np.full(np.shape(pxs), np.nan)
+    solvable = ~(np.isnan(pxs) | np.isnan(dtms) | np.isnan(coups))
+    if solvable.any():
+        solved = np.asarray(
+            yield_memo.price_to_yield(
+                pxs[solvable].tolist(),
+                np.trunc(dtms[solvable]).astype(np.int64).tolist(),
+                coups[solvable].tolist(),
+            )
+        )
+        ylds[solvable] = np.where(solved == -1.0, np.nan, solved)
+    return ylds
+
+
+# series per history request, as allowed by the Banxico SIE API
+MAX_SERIES_PER_REQUEST = BanxicoDataFetcher.MAX_SERIES_PER_REQUEST
+
+
+# relative dates such as 1D, 2W, 3M or 1Y
+RELATIVE_DATE = re.compile(r"^(?P<n>\d+)(?P<unit>[DWMY])$", re.IGNORECASE)
+
+
+def resolve_date(spec, latest):
+    """
+    Resolves "latest"/"today", a relative tenor ("1W", "1M", "1Y", counted
+    back from `latest`) or an ISO date into a numpy datetime64[D].
+    """
+
+    spec = spec.strip()
+    latest = np.datetime64(latest, "D")
+
+    if spec.lower() in ("latest", "today", ""):
+        return latest
+
+    match = RELATIVE_DATE.match(spec)
+    if match is None:
+        try:
+            return np.datetime64(spec, "D")
+        except ValueError:
+            raise ValueError(f"Unknown date: {spec}") from None
+
+    n, unit = int(match.group("n")), match.group("unit").upper()
+    if unit == "D":
+        return latest - n
+    if unit == "W":
+        return latest - 7 * n
+
+    # calendar months and years, clamping the day to the end of the month
+    months = n if unit == "M" else 12 * n
+    day = latest.astype(date)
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    next_month = date(year + (month + 1) // 12, (month + 1) % 12 + 1, 1)
+    last_day = (next_month - timedelta(days=1)).day
+    return np.datetime64(date(year, month + 1, min(day.day, last_day)), "D")
+
+
+class HistoryStore:
+    """
+    Local store of daily Banxico series on a common date index.
+
+    Values are kept as one float64 matrix (dates x series) with NaN for
+    missing observations, persisted as a single .npz file. A forward filled
+    copy is kept alongside, so an as-of query for any number of dates is a
+    single searchsorted and a fancy-indexed row lookup.
+    """
+
+    def __init__(self, dates=None, series_ids=(), values=None):
+        self.set_arrays(dates, series_ids, values)
+
+    def set_arrays(self, dates, series_ids, values):
+        self.dates = (
+            np.empty(0, dtype="datetime64[D]")
+            if dates is None
+            else np.asarray(dates, dtype="datetime64[D]")
+        )
+        self.series_ids = list(series_ids)
+        self.values = (
+            np.empty((len(self.dates), len(self.series_ids)))
+            if values is None
+            else np.asarray(values, dtype=np.float64)
+        )
+        self.columns = {s: i for i, s in enumerate(self.series_ids)}
+        self.filled, self.observed = self.forward_fill(self.values)
+
+    # --- persistence ---
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["dates"], data["series_ids"].tolist(), data["values"])
+
+    def save(self, path):
+
+        # write then rename, so readers never see a partial file
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            dates=self.dates,
+            series_ids=np.array(self.series_ids, dtype="U"),
+            values=self.values,
+        )
+        os.replace(tmp_path, path)
+
+    # --- updates ---
+
+    @staticmethod
+    def forward_fill(values):
+
+        # row of the last observation at or above each row, per column (-1 if
+        # there is none yet), and the values carried forward from it
+        rows = np.arange(values.shape[0])[:, None]
+        observed = np.where(np.isnan(values), -1, rows)
+        if values.size:
+            np.maximum.accumulate(observed, axis=0, out=observed)
+
+        filled = values[np.maximum(observed, 0), np.arange(values.shape[1])]
+        filled[observed < 0] = np.nan
+        return filled, observed
+
+    def merge(self, history):
+        """
+        Merges {idSerie: SeriesData(dates, values)} (as returned by
+        BanxicoDataFetcher.fetch_history) into the store. New non missing
+        observations replace stored ones.
+        """
+
+        series_ids = self.series_ids + [s for s in history if s not in self.columns]
+        new_dates = np.unique(
+            np.concatenate(
+                [np.empty(0, dtype="datetime64[D]")]
+                + [np.asarray(s.dates) for s in history.values()]
+            )
+        )
+        new_dates = new_dates[~np.isnat(new_dates)]
+
+        # appending days (the usual daily update) avoids rebuilding the store
+        if len(self.dates) and series_ids == self.series_ids:
+            inserted = new_dates[~np.isin(new_dates, self.dates)]
+            if (inserted > self.dates[-1]).all():
+                return self.merge_tail(new_dates, history)
+
+        dates = np.union1d(self.dates, new_dates)
+
+        values = np.full((len(dates), len(series_ids)), np.nan)
+        if len(self.dates):
+            values[np.searchsorted(dates, self.dates), : len(self.series_ids)] = (
+                self.values
+            )
+
+        columns = {s: i for i, s in enumerate(series_ids)}
+        for series_id, series in history.items():
+            keep = ~np.isnat(series.dates) & ~np.isnan(series.values)
+            rows = np.searchsorted(dates, series.dates[keep])
+            values[rows, columns[series_id]] = series.values[keep]
+
+        self.set_arrays(dates, series_ids, values)
+        return self
+
+    def merge_tail(self, dates, history):
+
+        # no row is inserted between stored ones: write the observations in
+        # place or after the last row, then forward fill again from the first
+        # touched row only
+        extra = dates[dates > self.dates[-1]]
+        dates = np.concatenate([self.dates, extra])
+        values = np.vstack(
+            [self.values, np.full((len(extra), len(self.series_ids)), np.nan)]
+        )
+
+        first = len(dates)
+        for series_id, series in history.items():
+            keep = ~np.isnat(series.dates) & ~np.isnan(series.values)
+            rows = np.searchsorted(dates, series.dates[keep])
+            values[rows, self.columns[series_id]] = series.values[keep]
+            if len(rows):
+                first = min(first, int(rows.min()))
+
+        if first == 0:
+            self.set_arrays(dates, self.series_ids, values)
+            return self
+
+        # seed the fill with the row above, carrying its observation rows
+        filled, observed = self.forward_fill(
+            np.vstack([self.filled[first - 1 : first], values[first:]])
+        )
+        observed = np.where(
+            observed > 0, observed + first - 1, self.observed[first - 1]
+        )
+
+        self.dates = dates
+        self.values = values
+        self.filled = np.vstack([self.filled[:first], filled[1:]])
+        self.observed = np.vstack([self.observed[:first], observed[1:]])
+        return self
+
+    def fetch(self, fetcher, start, end, series_ids=None):
+
+        # download a date range of every stored series and merge it
+        series_ids = list(series_ids or history_series_ids())
+        for i in range(0, len(series_ids), MAX_SERIES_PER_REQUEST):
+            chunk = series_ids[i : i + MAX_SERIES_PER_REQUEST]
+            self.merge(fetcher.fetch_history(chunk, start, end))
+
+        logger.info("History store now holds %s dates.", len(self.dates))
+        return self
+
+    # --- queries ---
+
+    @property
+    def latest(self):
+        return self.dates[-1] if len(self.dates) else None
+
+    def asof_rows(self, dates):
+
+        # last stored row on or before each date, -1 before the first one
+        return np.searchsorted(self.dates, dates, side="right") - 1
+
+    def asof(self, dates, series_ids):
+        """
+        Values of `series_ids` as of each date (last observation on or before
+        the date), as a (dates x series) array, NaN where there is none.
+        """
+
+        rows = self.asof_rows(np.asarray(dates, dtype="datetime64[D]"))
+        return self.take(rows, series_ids)
+
+    def take(self, rows, series_ids):
+        """
+        Forward filled values of `series_ids` at stored `rows`, as a
+        (rows x series) array, NaN for row -1 and unknown series.
+        """
+
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = [self.columns.get(s, -1) for s in series_ids]
+
+        out = np.full((len(rows), len(series_ids)), np.nan)
+        valid_rows = rows >= 0
+        valid_columns = np.array([c >= 0 for c in columns], dtype=bool)
+        if valid_rows.any() and valid_columns.any():
+            out[np.ix_(valid_rows, valid_columns)] = self.filled[
+                np.ix_(rows[valid_rows], np.array(columns)[valid_columns])
+            ]
+        return out
+
+    def observed_dates(self, dates, series_ids):
+        """
+        Date of the most recent observation of any of `series_ids` as of each
+        date, NaT where there is none.
+        """
+
+        rows = self.asof_rows(np.asarray(dates, dtype="datetime64[D]"))
+        columns = [self.columns[s] for s in series_ids if s in self.columns]
+
+        out = np.full(len(rows), np.datetime64("NaT"), dtype="datetime64[D]")
+        valid = rows >= 0
+        if valid.any() and columns:
+            latest = self.observed[np.ix_(rows[valid], columns)].max(axis=1)
+            out[valid] = np.where(
+                latest >= 0, self.dates[np.maximum(latest, 0)], np.datetime64("NaT")
+            )
+        return out
+
+    def quoted(self, rows):
+        """
+        The stored `rows` on which a curve instrument was quoted, leaving out
+        the dates only calendar daily or monthly series (the UDI on weekends,
+        inflation) were published on, where the curve is the previous one.
+        """
+
+        layout = curve_layout()
+        quotes = [x[1] for x in layout["cetes"]] + [x[1] for x in layout["mbonos"]]
+        columns = [self.columns[s] for s in quotes if s in self.columns]
+
+        rows = np.asarray(rows, dtype=np.int64)
+        return rows[(self.observed[np.ix_(rows, columns)] == rows[:, None]).any(axis=1)]
+
+    def curve_matrix(self, rows):
+        """
+        Tenor labels and the (rows x tenors) yield and days to maturity
+        arrays of the curve at stored `rows`, with every Mbono price converted
+        in one batch.
+        """
+
+        layout = curve_layout()
+        cetes, mbonos = layout["cetes"], layout["mbonos"]
+
+        cetes_ylds = self.take(rows, [x[1] for x in cetes])
+        cetes_dtms = self.take(rows, [x[2] for x in cetes])
+        mbonos_dtms = self.take(rows, [x[2] for x in mbonos])
+        mbonos_ylds = solve_mbonos(
+            self.take(rows, [x[1] for x in mbonos]),
+            mbonos_dtms,
+            self.take(rows, [x[3] for x in mbonos]),
+        )
+
+        labels = [x[0] for x in cetes] + [x[0] for x in mbonos]
+        ylds = np.hstack([cetes_ylds, mbonos_ylds])
+        dtms = np.hstack([cetes_dtms, mbonos_dtms])
+        return labels, ylds, dtms
+
+    def curves(self, dates):
+        """
+        Yield curves as of each date, with the Mbono prices of every date
+        converted to yields in a single batch call to the C++ engine.
+
+        Returns a list with one {"requested", "date", "labels", "yields",
+        "dtms"} dict per date, missing points as None.
+        """
+
+        labels, columns = self.curve_columns(dates)
+
+        curves = []
+        for i, requested in enumerate(columns["requested"]):
+            date, ylds, dtms = (columns[k][i] for k in ("date", "yields", "dtms"))
+            curves.append(
+                {
+                    "requested": str(requested),
+                    "date": None if np.isnat(date) else str(date),
+                    "labels": labels,
+                    "yields": [None if np.isnan(y) else round(y, 6) for y in ylds],
+                    "dtms": [None if np.isnan(d) else int(d) for d in dtms],
+                }
+            )
+
+        return curves
+
+    def curve_columns(self, dates):
+        """
+        Curve labels, and the requested dates, the date each curve is as of
+        and the yield and days to maturity matrices (one row per date) as
+        arrays, missing points as NaT or NaN.
+        """
+
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        labels, ylds, dtms = self.curve_matrix(self.asof_rows(dates))
+
+        layout = curve_layout()
+        cetes, mbonos = layout["cetes"], layout["mbonos"]
+
+        # the curve is as of its most recent quote
+        curve_dates = self.observed_dates(
+            dates, [x[1] for x in cetes] + [x[1] for x in mbonos]
+        )
+
+        return labels, {
+            "requested": dates,
+            "date": curve_dates,
+            "yields": ylds,
+            "dtms": dtms,
+        }
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __repr__(self):
+        return f"<HistoryStore({len(self.dates)} dates, {len(self.series_ids)} series)>"
+
+
+class HistoryStoreCache:
+    """
+    Holds the store loaded from `path`, reloading it only when the file
+    changes on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.store = None
+        self.mtime = None
+
+    def get(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        if mtime != self.mtime:
+            logger.debug("Loading history store from %s.", self.path)
+            self.store = HistoryStore.load(self.path)
+            self.mtime = mtime
+
+        return self.store
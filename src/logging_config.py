@@ -0,0 +1,166 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+# attributes every LogRecord has, anything else was passed through `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+
+# root handler and queue listener of the current configuration
+installed_handler = None
+active_async_logging = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, including any fields passed
+    through `extra` and the formatted traceback of logged exceptions.
+    """
+
+    def format(self, record):
+        payload = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith("_"):
+                payload[key] = value
+
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+
+        return json.dumps(payload, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that only merges the message arguments in the calling
+    thread, leaving the formatting to the listener's handler.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+
+        # tracebacks cannot be pickled or outlive the frame, keep their text
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+class AsyncLogging:
+    """
+    Queue based logging: the request thread only enqueues records, a listener
+    thread formats and writes them.
+
+    The listener is restarted in forked children (e.g. gunicorn workers of a
+    preloaded app), since threads do not survive a fork.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.queue_handler = None
+        self.listener = None
+        self.start()
+
+        os.register_at_fork(after_in_child=self.restart)
+        atexit.register(self.stop)
+
+    def start(self):
+        log_queue = queue.SimpleQueue()
+        if self.queue_handler is None:
+            self.queue_handler = StructuredQueueHandler(log_queue)
+        else:
+            self.queue_handler.queue = log_queue
+
+        self.listener = logging.handlers.QueueListener(
+            log_queue, self.handler, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def restart(self):
+
+        # the parent's listener thread does not exist in the child
+        if self.listener is not None:
+            self.start()
+
+    def stop(self):
+
+        # flush the queued records
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+def configure_logging(level=None, fmt=None, asynchronous=None, stream=None):
+    """
+    Configures the root logger from arguments or the environment.
+
+    LOG_LEVEL: level name (default DEBUG)
+    LOG_FORMAT: "text" (default) or "json"
+    LOG_ASYNC: "1" to write through a background queue listener
+
+    Returns the AsyncLogging instance when asynchronous, otherwise None.
+    """
+
+    global installed_handler, active_async_logging
+
+    level = (level or os.getenv("LOG_LEVEL", "DEBUG")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+    if asynchronous is None:
+        asynchronous = os.getenv("LOG_ASYNC", "0").lower() in ("1", "true", "yes")
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(
+        JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+    )
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    # replace a previous configuration, leaving other handlers in place
+    if installed_handler is not None:
+        root.removeHandler(installed_handler)
+    if active_async_logging is not None:
+        active_async_logging.stop()
+        active_async_logging = None
+
+    if asynchronous:
+        active_async_logging = AsyncLogging(handler)
+        installed_handler = active_async_logging.queue_handler
+    else:
+        installed_handler = handler
+    root.addHandler(installed_handler)
+
+    logger.debug(
+        "Logging configured: level=%s format=%s async=%s", level, fmt, asynchronous
+    )
+    return active_async_logging
@@ -0,0 +1,267 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+# default latency buckets in seconds, from sub-millisecond to upstream timeouts
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def format_labels(labelnames, values, extra=()):
+
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonically increasing count, optionally split by labels.
+    """
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def samples(self):
+        with self.lock:
+            values = sorted(self.values.items())
+        for key, value in values:
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {format_value(value)}"
+
+
+class Gauge:
+    """
+    Value that can go up and down, optionally split by labels.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = value
+
+    def value(self, **labels):
+        return self.values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def samples(self):
+        with self.lock:
+            values = sorted(self.values.items())
+        for key, value in values:
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {format_value(value)}"
+
+
+class Histogram:
+    """
+    Distribution of observed values in cumulative buckets, optionally split
+    by labels, in the Prometheus histogram layout.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+
+        # per bucket (not cumulative) counts, with a final +Inf bucket
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts[0][index] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    def observe_many(self, values, **labels):
+        for value in values:
+            self.observe(value, **labels)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        counts = self.values.get(tuple(str(labels[n]) for n in self.labelnames))
+        return 0 if counts is None else counts[2]
+
+    def samples(self):
+        with self.lock:
+            values = sorted(
+                (k, (list(v[0]), v[1], v[2])) for k, v in self.values.items()
+            )
+
+        for key, (buckets, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), buckets):
+                cumulative += bucket_count
+                labels = format_labels(
+                    self.labelnames, key, [("le", format_value(float(bound)))]
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered in the Prometheus text exposition format.
+
+    Metrics are kept per process, so under gunicorn each worker reports its
+    own series (scrape the workers individually or aggregate by instance).
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered.")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# --- application metrics ---
+
+REGISTRY = MetricsRegistry()
+
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "banxico_upstream_request_seconds",
+    "Duration of Banxico API requests.",
+    ["endpoint", "status"],
+)
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "banxico_pipeline_stage_seconds",
+    "Duration of each stage of the Banxico data pipeline.",
+    ["stage"],
+)
+
+NEWTON_ITERATIONS = REGISTRY.histogram(
+    "price_to_yield_newton_iterations",
+    "Newton-Raphson iterations per solved bond.",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 16, 32, 64, 128, 256, 512, 1024, 2048, 10000),
+)
+
+YIELD_MEMO_LOOKUPS = REGISTRY.counter(
+    "price_to_yield_memo_lookups_total",
+    "Price-to-yield memo lookups per bond by result (hit, miss).",
+    ["result"],
+)
+
+SNAPSHOT_LOOKUPS = REGISTRY.counter(
+    "banxico_snapshot_lookups_total",
+    "Snapshot cache lookups by result (hit, miss, shared, stale).",
+    ["result"],
+)
+
+CONNECTION_POOL = REGISTRY.gauge(
+    "banxico_connection_pool",
+    "Banxico connection pool totals by stat (hosts, requests, connections, "
+    "reused), as of the last fetch.",
+    ["stat"],
+)
+
+CONNECTION_REUSE_RATIO = REGISTRY.gauge(
+    "banxico_connection_reuse_ratio",
+    "Share of Banxico requests sent on a reused pooled connection, as of the "
+    "last fetch.",
+)
+
+TEMPLATE_RENDER_SECONDS = REGISTRY.histogram(
+    "flask_template_render_seconds",
+    "Duration of Jinja template renders.",
+    ["template"],
+)
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "flask_request_seconds",
+    "Duration of Flask requests by endpoint and status code.",
+    ["endpoint", "status"],
+)
@@ -0,0 +1,168 @@
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import random
+import time
+
+from flask import g, request
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+def function_label(func):
+
+    # file:line(name), or the builtin name for C functions such as cpp_engine
+    filename, line, name = func
+    if filename == "~" and line == 0:
+        return name.replace(";", ":")
+    return f"{os.path.basename(filename)}:{line}({name})".replace(";", ":")
+
+
+def collapsed_stacks(stats):
+    """
+    Converts cProfile stats into collapsed stack lines ("a;b weight") as read
+    by flamegraph.pl, speedscope and similar tools, with weights in
+    microseconds.
+
+    cProfile only records caller/callee pairs, so each line is one pair: a
+    function's own time under each of its callers, or alone for functions
+    with no recorded caller. That is one bounded pass over the stats, where
+    expanding every call path grows exponentially with the call graph.
+    """
+
+    weights = {}
+    for func, (_, _, tt, _, callers) in stats.stats.items():
+        label = function_label(func)
+        if not callers:
+            weights[label] = weights.get(label, 0.0) + tt
+        for caller, edge in callers.items():
+            key = f"{function_label(caller)};{label}"
+            weights[key] = weights.get(key, 0.0) + edge[2]
+
+    return [
+        f"{stack} {round(weight * 1e6)}"
+        for stack, weight in sorted(weights.items())
+        if round(weight * 1e6) > 0
+    ]
+
+
+class RequestProfiler:
+    """
+    Opt-in cProfile hook around Flask requests.
+
+    A request is profiled when it carries an `X-Profile` header equal to
+    `token` (never without a token) or is picked by the `sample_rate`
+    fraction. Each profile is written to `output_dir` as a .prof file (for
+    pstats or snakeviz) and a .collapsed file of flamegraph-compatible
+    stacks, named by the id returned in the `X-Profile-Id` response header.
+    Calls into cpp_engine appear as builtin functions.
+
+    Nothing is registered on the app unless the profiler is enabled.
+    """
+
+    HEADER = "X-Profile"
+
+    def __init__(self, app=None, output_dir="profiles", sample_rate=0.0, token=None):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.token = token
+        self.profiled = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    @classmethod
+    def from_env(cls, app):
+
+        # install the hooks only when profiling is switched on
+        if os.getenv("PROFILE_ENABLED", "0").lower() not in ("1", "true", "yes"):
+            return None
+
+        profiler = cls(
+            app,
+            output_dir=os.getenv("PROFILE_DIR", "profiles"),
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            token=os.getenv("PROFILE_TOKEN") or None,
+        )
+        logger.warning(
+            "Request profiling enabled, writing to %s (sample rate %s).",
+            profiler.output_dir,
+            profiler.sample_rate,
+        )
+        if profiler.token is None:
+            logger.warning(
+                "PROFILE_TOKEN is not set, %s headers are ignored.", cls.HEADER
+            )
+        return profiler
+
+    def init_app(self, app):
+        os.makedirs(self.output_dir, exist_ok=True)
+        app.before_request(self.start)
+        app.after_request(self.add_header)
+        app.teardown_request(self.stop)
+
+    def should_profile(self):
+        # anyone can send the header, so it only counts with the configured
+        # token, compared in constant time
+        header = request.headers.get(self.HEADER)
+        if header is not None:
+            return self.token is not None and hmac.compare_digest(
+                header.encode(), self.token.encode()
+            )
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        if not self.should_profile():
+            return
+
+        g.profile_start = time.perf_counter()
+        g.profile_path = self.output_path()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    def add_header(self, response):
+
+        # tell the caller which profile is theirs, not where the server keeps it
+        if "profiler" in g:
+            response.headers["X-Profile-Id"] = os.path.basename(g.profile_path)
+        return response
+
+    def stop(self, exc=None):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return
+
+        profiler.disable()
+        elapsed = time.perf_counter() - g.pop("profile_start")
+        path = g.pop("profile_path")
+
+        try:
+            self.write(profiler, path)
+        except OSError as e:
+            logger.error("Could not write request profile %s: %s", path, e)
+            return
+
+        self.profiled += 1
+        logger.info(
+            "Profiled %s %s in %.1f ms: %s.prof",
+            request.method,
+            request.path,
+            1000 * elapsed,
+            path,
+        )
+
+    def output_path(self):
+        endpoint = (request.endpoint or "unknown").replace(".", "_")
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name = f"{stamp}_{endpoint}_{os.getpid()}_{time.perf_counter_ns() % 10**9}"
+        return os.path.join(self.output_dir, name)
+
+    @staticmethod
+    def write(profiler, path):
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(path + ".prof")
+        with open(path + ".collapsed", "w", encoding="utf-8") as f:
+            f.write("\n".join(collapsed_stacks(stats)) + "\n")
@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+from collections import namedtuple
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+# default instrument configuration, BANXICO_INSTRUMENTS_PATH points elsewhere
+DEFAULT_INSTRUMENTS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instruments.json"
+)
+
+# series roles each instrument type needs, in the order the pipeline uses them
+INSTRUMENT_TYPES = {
+    # quoted as a yield, e.g. Cetes
+    "discount": ("yld", "dtm"),
+    # quoted as a price, solved into a yield, e.g. Mbonos
+    "fixed_coupon": ("px", "dtm", "coup"),
+    # quoted as a price in UDIs (or pesos), solved into a real yield, e.g. Udibonos
+    "real_coupon": ("px", "dtm", "coup"),
+    # quoted as a price, solved into a discount margin in bp, e.g. Bondes F
+    "floating": ("px", "dtm", "coup"),
+}
+
+# an issue id (the "issue" of its spec, by default the id of its quote series)
+# tells apart instruments sharing a tenor label, e.g. two 10 year Mbonos
+Instrument = namedtuple("Instrument", ["group", "type", "tenor", "series", "issue"])
+InstrumentGroup = namedtuple(
+    "InstrumentGroup", ["name", "type", "curve", "roles", "instruments", "units"]
+)
+
+# currencies a group's prices can be quoted in, UDIs only apply to real_coupon
+PRICE_UNITS = ("pesos", "udis")
+
+
+def tenor_days(tenor):
+
+    # approximate days to maturity of a tenor label such as "28 Days" or "2 Years",
+    # only used to order instruments before their actual days to maturity are
+    # known
+    days_per_unit = {"day": 1, "week": 7, "month": 30, "year": 364}
+
+    parts = tenor.split(" ")
+    unit = parts[-1].lower().rstrip("s") if len(parts) == 2 else None
+    if unit not in days_per_unit or not parts[0].isdigit():
+        raise ValueError(f"Unknown maturity format: {tenor}")
+    return int(parts[0]) * days_per_unit[unit]
+
+
+class InstrumentRegistry:
+    """
+    Banxico series ids of every tracked instrument, grouped by instrument
+    type, with the role each series plays (yield, price, days to maturity,
+    coupon) and the tenor it belongs to.
+
+    Instruments are keyed by issue id. They are kept in order of their tenor
+    label within each group (ties in configuration order), and groups in the
+    order they appear on the curve; fetched data is ordered by the days to
+    maturity Banxico returns instead.
+    """
+
+    def __init__(self, groups, summary):
+        self.groups = []
+        self.summary = dict(summary)
+        self.instruments = {}
+        self.index = {}
+
+        for group in groups:
+            group_type = group["type"]
+            if group_type not in INSTRUMENT_TYPES:
+                raise ValueError(f"Unknown instrument type: {group_type}")
+            roles = INSTRUMENT_TYPES[group_type]
+
+            units = group.get(
+                "units", "udis" if group_type == "real_coupon" else "pesos"
+            )
+            if units not in PRICE_UNITS or (
+                units == "udis" and group_type != "real_coupon"
+            ):
+                raise ValueError(f"{group['name']} cannot be quoted in {units}")
+
+            instruments = []
+            for spec in sorted(
+                group["instruments"], key=lambda x: tenor_days(x["tenor"])
+            ):
+                missing = [role for role in roles if role not in spec]
+                if missing:
+                    raise ValueError(
+                        f"{group['name']} {spec['tenor']} is missing series {missing}"
+                    )
+                instrument = Instrument(
+                    group["name"],
+                    group_type,
+                    spec["tenor"],
+                    {role: spec[role] for role in roles},
+                    spec.get("issue", spec[roles[0]]),
+                )
+                if instrument.issue in self.instruments:
+                    raise ValueError(f"Issue {instrument.issue} is registered twice.")
+                self.instruments[instrument.issue] = instrument
+                instruments.append(instrument)
+
+            self.groups.append(
+                InstrumentGroup(
+                    group["name"],
+                    group_type,
+                    group.get("curve", True),
+                    roles,
+                    instruments,
+                    units,
+                )
+            )
+
+        # series id -> (instrument, role, rank of its tenor label in its group)
+        for group in self.groups:
+            for rank, instrument in enumerate(group.instruments):
+                for role, series_id in instrument.series.items():
+                    self.add_series(series_id, (instrument, role, rank))
+        for series_id in self.summary:
+            self.add_series(series_id, (None, "summary", None))
+
+    def add_series(self, series_id, entry):
+        if series_id in self.index:
+            raise ValueError(f"Series {series_id} is registered twice.")
+        self.index[series_id] = entry
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or os.getenv("BANXICO_INSTRUMENTS_PATH", DEFAULT_INSTRUMENTS_PATH)
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+
+        registry = cls(config["groups"], config.get("summary", {}))
+        logger.debug("Loaded instrument registry from %s: %s", path, registry)
+        return registry
+
+    # --- lookups ---
+
+    def group(self, name):
+        for group in self.groups:
+            if group.name == name:
+                return group
+        raise KeyError(name)
+
+    def series_map(self, group, role):
+
+        # {idSerie: tenor} of one role of a group, in order of maturity
+        return {
+            i.series[role]: i.tenor
+            for i in self.group(group).instruments
+            if role in i.series
+        }
+
+    def series_ids(self):
+
+        # every registered series, instruments first then summary data
+        return list(self.index)
+
+    def response_key(self, series_id):
+
+        # key of a series in the call_api result, e.g. "cetes_yld" or "summary"
+        instrument, role, _ = self.index[series_id]
+        return "summary" if instrument is None else f"{instrument.group}_{role}"
+
+    def response_keys(self):
+        keys = [f"{g.name}_{role}" for g in self.groups for role in g.roles]
+        return keys + ["summary"]
+
+    def tenor(self, series_id):
+        instrument = self.index[series_id][0]
+        return self.summary[series_id] if instrument is None else instrument.tenor
+
+    def issue(self, series_id):
+        return self.index[series_id][0].issue
+
+    def rank(self, series_id):
+        return self.index[series_id][2]
+
+    def __len__(self):
+        return sum(len(g.instruments) for g in self.groups)
+
+    def __repr__(self):
+        groups = ", ".join(f"{len(g.instruments)} {g.name}" for g in self.groups)
+        return f"<InstrumentRegistry({groups}, {len(self.summary)} summary series)>"
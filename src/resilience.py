@@ -0,0 +1,297 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailableError(requests.exceptions.ConnectionError):
+    """Raised without contacting the upstream API when it is deemed unavailable."""
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """The circuit breaker is open after repeated upstream failures."""
+
+
+class RateLimitedError(UpstreamUnavailableError):
+    """No rate limiter token became available in time."""
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Holds up to `capacity` tokens, refilled continuously at `rate` tokens per
+    second. Each upstream request consumes one token.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+
+        if rate <= 0 or capacity < 1:
+            raise ValueError("Token bucket rate must be > 0 and capacity >= 1.")
+
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+
+        self.tokens = float(capacity)
+        self.last_refill = clock()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+
+        # returns 0 if a token was taken, otherwise the seconds until one is due
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.last_refill) * self.rate
+            )
+            self.last_refill = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, max_wait=0.0):
+
+        # wait at most max_wait seconds for a token
+        deadline = self.clock() + max_wait
+
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if self.clock() + wait > deadline:
+                return False
+            self.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for an upstream dependency.
+
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `recovery_timeout` seconds. It then half-opens, letting up to
+    `half_open_max_calls` probe calls through: a successful probe closes the
+    circuit again, a failed one reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold=5,
+        recovery_timeout=30.0,
+        half_open_max_calls=1,
+        clock=time.monotonic,
+    ):
+
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+
+        with self.lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.recovery_timeout:
+                    return False
+                logger.info("Circuit breaker half-open, probing upstream.")
+                self.state = self.HALF_OPEN
+                self.half_open_calls = 0
+
+            if self.state == self.HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    return False
+                self.half_open_calls += 1
+
+            return True
+
+    def release(self):
+
+        # gives back the probe slot of a call that never reached upstream, so
+        # a half-open circuit is not left with no probes and no outcome
+        with self.lock:
+            if self.state == self.HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+
+    def record_success(self):
+
+        with self.lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit breaker closed, upstream recovered.")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        "Circuit breaker opened after %s failures.", self.failures
+                    )
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class ResilientSession(requests.Session):
+    """
+    requests.Session guarded by a token bucket and a circuit breaker.
+
+    Requests fail fast with an UpstreamUnavailableError while the circuit is
+    open or no token is available. Connection errors, timeouts, 429 and 5xx
+    responses are retried with exponential backoff and full jitter, honouring
+    any Retry-After header.
+
+    A request may pass `deadline`, a time.monotonic() value shared by several
+    calls. Timeouts, token waits and backoff are cut to the time left, no
+    retry starts after it, and a call made once it has passed raises
+    requests.exceptions.Timeout. `rate_limit_wait` overrides the session's
+    token wait for one call, e.g. math.inf for a batch job that should queue
+    for the shared limit rather than fail.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        rate_limiter=None,
+        circuit_breaker=None,
+        max_retries=2,
+        backoff_base=0.25,
+        backoff_cap=4.0,
+        rate_limit_wait=1.0,
+        sleep=time.sleep,
+        clock=time.monotonic,
+    ):
+        super().__init__()
+
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.rate_limit_wait = rate_limit_wait
+        self.sleep = sleep
+        self.clock = clock
+
+    def backoff(self, attempt, response=None):
+
+        # seconds to wait before retry number `attempt` (starting at 0)
+        retry_after = (
+            response.headers.get("Retry-After") if response is not None else None
+        )
+        if retry_after is not None:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt))
+
+    def request(
+        self, method, url, *args, deadline=None, rate_limit_wait=None, **kwargs
+    ):
+
+        attempt = 0
+
+        while True:
+            remaining = None if deadline is None else deadline - self.clock()
+            if remaining is not None and remaining <= 0:
+                raise requests.exceptions.Timeout(
+                    f"Retry budget exhausted, not calling {url}."
+                )
+
+            if (
+                self.circuit_breaker is not None
+                and not self.circuit_breaker.allow_request()
+            ):
+                raise CircuitOpenError(f"Circuit open, not calling {url}.")
+
+            token_wait = (
+                self.rate_limit_wait if rate_limit_wait is None else rate_limit_wait
+            )
+            if remaining is not None:
+                token_wait = min(token_wait, remaining)
+                kwargs["timeout"] = cap_timeout(kwargs.get("timeout"), remaining)
+            if self.rate_limiter is not None and not self.rate_limiter.acquire(
+                token_wait
+            ):
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.release()
+                raise RateLimitedError(f"Rate limit reached, not calling {url}.")
+
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ):
+                self.record_failure()
+                delay = self.backoff(attempt)
+                if not self.can_retry(attempt, delay, deadline):
+                    raise
+                logger.warning("Upstream request failed, retrying in %.2fs.", delay)
+            except BaseException:
+                # anything else still ends a half-open probe
+                self.record_failure()
+                raise
+            else:
+                if response.status_code not in self.RETRY_STATUSES:
+                    self.record_success()
+                    return response
+
+                self.record_failure()
+                delay = self.backoff(attempt, response)
+                if not self.can_retry(attempt, delay, deadline):
+                    return response
+                logger.warning(
+                    "Upstream returned %s, retrying in %.2fs.",
+                    response.status_code,
+                    delay,
+                )
+                response.close()
+
+            attempt += 1
+            self.sleep(delay)
+
+    def can_retry(self, attempt, delay, deadline):
+
+        # retries left, and time for the backoff before the deadline
+        if attempt >= self.max_retries:
+            return False
+        return deadline is None or self.clock() + delay < deadline
+
+    def record_success(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+
+    def record_failure(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure()
+
+
+def cap_timeout(timeout, remaining):
+
+    # a requests timeout (seconds or a (connect, read) pair) cut to `remaining`
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
@@ -0,0 +1,289 @@
+import logging
+import os
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+
+import numpy as np
+
+from .derived import DerivedSeries, DerivedSeriesEngine
+from .history import curve_layout
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+# observations (business days) per window tenor
+WINDOW_DAYS = {"D": 1, "W": 5, "M": 21, "Y": 252}
+WINDOW = re.compile(r"^(?P<n>\d+)(?P<unit>[DWMY])?$", re.IGNORECASE)
+
+MAX_WINDOW = 20 * 252
+
+
+def window_days(spec):
+    """
+    Rolling window length in observations (business days) from "63", "3M"
+    or "1Y".
+    """
+
+    match = WINDOW.match(str(spec).strip())
+    if match is None:
+        raise ValueError(f"Unknown window: {spec}")
+
+    days = int(match.group("n")) * WINDOW_DAYS[(match.group("unit") or "D").upper()]
+    if not 2 <= days <= MAX_WINDOW:
+        raise ValueError(f"Window must be between 2 and {MAX_WINDOW} days: {spec}")
+    return days
+
+
+def tenor_series():
+
+    # every curve tenor's yield, in percent, as a single leg derived series
+    layout = curve_layout()
+    labels = [x[0] for x in layout["cetes"]] + [x[0] for x in layout["mbonos"]]
+    return [
+        DerivedSeries(label, f"{label} yield", "%", {label: 1.0}) for label in labels
+    ]
+
+
+class RunningSums:
+    """
+    Cumulative sums of a series, its squares and its daily changes, extended
+    as rows are appended. Any window's sums are then the difference of two
+    entries, so each row of a rolling statistic costs O(1).
+
+    Values are shifted by the first observation to keep the sums of squares
+    well conditioned over decades of data.
+    """
+
+    def __init__(self):
+        self.values = np.empty(0)
+        self.shift = None
+        self.count = np.zeros(1)
+        self.level = np.zeros(1)
+        self.level_sq = np.zeros(1)
+        self.change = np.zeros(1)
+        self.change_sq = np.zeros(1)
+        self.revisions = []
+
+    def sync(self, values):
+        """
+        Brings the sums in line with `values`, keeping the rows before the
+        first difference. Each change is logged in `revisions` as the first
+        row it touched, so caches built on earlier sums know what to drop.
+        """
+
+        n = min(len(self.values), len(values))
+        same = (self.values[:n] == values[:n]) | (
+            np.isnan(self.values[:n]) & np.isnan(values[:n])
+        )
+        changed = np.flatnonzero(~same)
+        valid = int(changed[0]) if len(changed) else n
+
+        if valid < len(self.values):
+            self.truncate(valid)
+        if valid < len(values):
+            self.extend(values[valid:])
+        if valid < max(n, len(values)):
+            self.revisions.append(valid)
+        return self
+
+    def truncate(self, n):
+        self.values = self.values[:n]
+        for name in ("count", "level", "level_sq", "change", "change_sq"):
+            setattr(self, name, getattr(self, name)[: n + 1])
+
+    def extend(self, values):
+        start = len(self.values)
+        self.values = np.concatenate([self.values, values])
+
+        if self.shift is None:
+            finite = self.values[np.isfinite(self.values)]
+            self.shift = finite[0] if len(finite) else None
+
+        # a row counts once it has both a level and a daily change
+        x = self.values[max(start - 1, 0) :] - (self.shift or 0.0)
+        dx = np.diff(x, prepend=np.nan)
+        if start:
+            x, dx = x[1:], dx[1:]
+        valid = np.isfinite(x) & np.isfinite(dx)
+        x, dx = np.where(valid, x, 0.0), np.where(valid, dx, 0.0)
+
+        def append(total, increments):
+            return np.concatenate([total, total[-1] + np.cumsum(increments)])
+
+        self.count = append(self.count, valid)
+        self.level = append(self.level, x)
+        self.level_sq = append(self.level_sq, x * x)
+        self.change = append(self.change, dx)
+        self.change_sq = append(self.change_sq, dx * dx)
+
+    def window(self, rows, window):
+
+        # sums over the `window` rows ending at each of `rows`
+        hi, lo = rows + 1, np.maximum(rows + 1 - window, 0)
+        full = (self.count[hi] - self.count[lo] == window) & (rows + 1 >= window)
+        return full, [
+            total[hi] - total[lo]
+            for total in (self.level, self.level_sq, self.change, self.change_sq)
+        ]
+
+
+class RollingAnalytics:
+    """
+    Rolling mean, standard deviation, volatility of daily changes, percentile
+    rank and z-score of each tenor's yield over the HistoryStore.
+
+    Tenor yields are kept by a DerivedSeriesEngine, so new days are solved
+    alone. Windows run over the days each tenor was quoted, not the store
+    index, which also holds the weekend UDI and monthly inflation dates.
+    Statistics are cached per (series, window) and only extended when days
+    are appended; a revised observation drops the cached rows from that day
+    onwards. The least recently used (series, window) pairs are evicted past
+    `maxsize` entries.
+    """
+
+    # trading days per year, to annualise the volatility of daily changes
+    ANNUALISATION = 252
+
+    def __init__(self, maxsize=None):
+        self.engine = DerivedSeriesEngine(tenor_series())
+        self.maxsize = (
+            int(os.getenv("ROLLING_CACHE_SIZE", "64")) if maxsize is None else maxsize
+        )
+        self.sums = {}
+        self.cache = OrderedDict()
+        self.rows_computed = 0
+
+    @property
+    def names(self):
+        return self.engine.names
+
+    @property
+    def dates(self):
+        return self.engine.dates
+
+    def update(self, store):
+        self.engine.update(store)
+        return self
+
+    def stats(self, name, window):
+        """
+        {"mean", "std", "vol", "percentile", "zscore"} arrays aligned with
+        `dates` for `name` over a `window` of its quoted days, NaN on the
+        dates it was not quoted. Mean and std are in percent, vol in
+        annualised bp of daily changes, percentile in 0-100.
+        """
+
+        if name not in self.engine.names:
+            raise ValueError(f"Unknown series: {name}")
+
+        observed = self.engine.observed(name)
+        cached = self.observed_stats(name, window, observed)
+
+        out = {key: np.full(len(observed), np.nan) for key in cached}
+        for key, values in cached.items():
+            out[key][observed] = values
+        return out
+
+    def observed_stats(self, name, window, observed):
+
+        # statistics over the quoted days only, cached as such
+        values = self.engine.values[observed, self.engine.names.index(name)]
+        sums = self.sums.setdefault(name, RunningSums()).sync(values)
+
+        # rows still valid since the cached statistics were computed
+        cached, revision = self.cache.get((name, window), (None, 0))
+        computed = min(
+            [0 if cached is None else len(cached["mean"])] + sums.revisions[revision:]
+        )
+
+        if cached is None or computed < len(sums.values):
+            rows = np.arange(computed, len(sums.values))
+            new = self.compute(sums, rows, window)
+            self.rows_computed += len(rows)
+            cached = {
+                key: np.concatenate(
+                    [cached[key][:computed] if cached else np.empty(0), new[key]]
+                )
+                for key in new
+            }
+            logger.debug(
+                "Rolling %s over %s days: computed %s rows.", name, window, len(rows)
+            )
+
+        self.cache[(name, window)] = (cached, len(sums.revisions))
+        self.cache.move_to_end((name, window))
+        while len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return cached
+
+    def compute(self, sums, rows, window):
+        full, (level, level_sq, change, change_sq) = sums.window(rows, window)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = level / window
+            std = np.sqrt(np.maximum(level_sq / window - mean * mean, 0.0))
+            change_mean = change / window
+            vol = np.sqrt(
+                np.maximum(change_sq / window - change_mean * change_mean, 0.0)
+                * self.ANNUALISATION
+            )
+            x = sums.values[rows]
+            zscore = np.where(std > 0, (x - mean - (sums.shift or 0.0)) / std, np.nan)
+
+        mean = mean + (sums.shift or 0.0)
+        out = {
+            "mean": mean,
+            "std": std,
+            "vol": 100 * vol,
+            "percentile": self.percentile_rank(sums.values, rows, window),
+            "zscore": zscore,
+        }
+        for values in out.values():
+            values[~full] = np.nan
+        return out
+
+    @staticmethod
+    def percentile_rank(values, rows, window):
+
+        # share of the window below each row's value (ties count half), from a
+        # sorted copy of the window that drops and inserts one value per row
+        out = np.full(len(rows), np.nan)
+        ranked = np.flatnonzero(rows + 1 >= window)
+        if not len(ranked):
+            return out
+
+        # a window holding a missing value is masked by the caller, NaN only
+        # has to sort consistently
+        x = np.where(np.isnan(values), np.inf, values).tolist()
+        first = rows[ranked[0]]
+        ordered = sorted(x[first + 1 - window : first + 1])
+        for i in ranked:
+            row = rows[i]
+            if row > first:
+                del ordered[bisect_left(ordered, x[row - window])]
+                insort(ordered, x[row])
+            lo, hi = bisect_left(ordered, x[row]), bisect_right(ordered, x[row])
+            out[i] = 100 * (lo + 0.5 * (hi - lo - 1)) / (window - 1)
+        return out
+
+    def window(self, name, window, start=None, end=None):
+        """
+        Dates, yields and rolling statistics of `name` on the days it was
+        quoted between `start` and `end` (inclusive, numpy datetime64 or None
+        for unbounded).
+        """
+
+        stats = self.stats(name, window)
+        lo = 0 if start is None else np.searchsorted(self.dates, start, side="left")
+        hi = (
+            len(self.dates)
+            if end is None
+            else np.searchsorted(self.dates, end, side="right")
+        )
+
+        # only the days the series was quoted
+        rows = np.flatnonzero(self.engine.observed(name)[lo:hi]) + lo
+        values = self.engine.values[rows, self.engine.names.index(name)]
+        return self.dates[rows], values, {k: v[rows] for k, v in stats.items()}
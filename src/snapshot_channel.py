@@ -0,0 +1,183 @@
+import contextlib
+import json
+import logging
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+SharedSnapshot = namedtuple(
+    "SharedSnapshot", ["version", "published_at", "yields", "dtms", "meta"]
+)
+
+
+class SnapshotChannel:
+    """
+    Exchanges the latest curve/summary snapshot between worker processes
+    through a memory-mapped file (ideally on /dev/shm).
+
+    The file holds a header with a version counter followed by two slots.
+    Each publish writes the slot not currently being read and then bumps the
+    version. Each slot also carries a sequence number, odd while the slot is
+    being written, which readers check before and after copying the slot out,
+    so a reader overtaken by two publishes retries instead of returning a torn
+    snapshot. Only the process holding the refresh lock fetches from Banxico
+    and publishes.
+    """
+
+    MAGIC = b"BMXSNAP2"
+
+    # magic, version
+    HEADER = struct.Struct("<8sQ")
+
+    # sequence number, number of curve points, metadata length, publish time
+    # (unix seconds)
+    SLOT_HEADER = struct.Struct("<QQQd")
+    SEQUENCE = struct.Struct("<Q")
+
+    DEFAULT_SLOT_SIZE = 256 * 1024
+
+    # reads retried while a publish keeps rewriting the slot being read
+    MAX_READ_ATTEMPTS = 100
+
+    def __init__(self, path, slot_size=DEFAULT_SLOT_SIZE):
+
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.slot_size = slot_size
+        self.size = self.HEADER.size + 2 * slot_size
+
+        # create (or grow) the backing file and map it shared
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            self.buffer = mmap.mmap(fd, self.size, mmap.MAP_SHARED)
+        finally:
+            os.close(fd)
+
+        magic, _ = self.HEADER.unpack_from(self.buffer, 0)
+        if magic != self.MAGIC:
+            logger.debug("Initialising snapshot channel at %s.", path)
+            self.HEADER.pack_into(self.buffer, 0, self.MAGIC, 0)
+
+    def version(self):
+
+        # 0 means nothing has been published yet
+        return self.HEADER.unpack_from(self.buffer, 0)[1]
+
+    def read(self):
+
+        for _ in range(self.MAX_READ_ATTEMPTS):
+            version = self.version()
+            if version == 0:
+                return None
+
+            # copy the slot out, then check no publish rewrote it meanwhile
+            offset = self.HEADER.size + (version % 2) * self.slot_size
+            seq, n, meta_len, _ = self.SLOT_HEADER.unpack_from(self.buffer, offset)
+            size = min(self.SLOT_HEADER.size + 16 * n + meta_len, self.slot_size)
+            slot = bytes(self.buffer[offset : offset + size])
+            if seq == 2 * version == self.SEQUENCE.unpack_from(self.buffer, offset)[0]:
+                return self.decode(version, slot)
+
+        logger.warning("Could not read a consistent snapshot, ignoring channel.")
+        return None
+
+    def decode(self, version, slot):
+
+        # columns and metadata of a copied slot, None if it does not hold a
+        # valid snapshot
+        _, n, meta_len, published_at = self.SLOT_HEADER.unpack_from(slot, 0)
+        offset = self.SLOT_HEADER.size
+        if offset + 16 * n + meta_len > len(slot):
+            logger.warning("Snapshot version %s is corrupt.", version)
+            return None
+
+        yields = np.frombuffer(slot, dtype=np.float64, count=n, offset=offset)
+        offset += 8 * n
+        dtms = np.frombuffer(slot, dtype=np.int64, count=n, offset=offset)
+        offset += 8 * n
+
+        try:
+            meta = json.loads(slot[offset : offset + meta_len])
+        except ValueError:
+            logger.warning("Snapshot version %s has corrupt metadata.", version)
+            return None
+
+        return SharedSnapshot(version, published_at, yields, dtms, meta)
+
+    def publish(self, yields, dtms, meta, published_at):
+
+        yields = np.ascontiguousarray(yields, dtype=np.float64)
+        dtms = np.ascontiguousarray(dtms, dtype=np.int64)
+        meta_bytes = json.dumps(meta).encode("utf-8")
+
+        n = len(yields)
+        if len(dtms) != n:
+            raise ValueError("Snapshot yields and dtms must have the same length.")
+
+        payload_size = self.SLOT_HEADER.size + 16 * n + len(meta_bytes)
+        if payload_size > self.slot_size:
+            raise ValueError(
+                f"Snapshot of {payload_size} bytes exceeds the channel slot size."
+            )
+
+        # write the slot readers are not currently pointed at
+        version = self.version() + 1
+        offset = self.HEADER.size + (version % 2) * self.slot_size
+
+        # odd sequence while the slot is being written
+        self.SLOT_HEADER.pack_into(
+            self.buffer, offset, 2 * version - 1, n, len(meta_bytes), published_at
+        )
+        slot_offset = offset
+        offset += self.SLOT_HEADER.size
+        self.buffer[offset : offset + 8 * n] = yields.tobytes()
+        offset += 8 * n
+        self.buffer[offset : offset + 8 * n] = dtms.tobytes()
+        offset += 8 * n
+        self.buffer[offset : offset + len(meta_bytes)] = meta_bytes
+        self.SEQUENCE.pack_into(self.buffer, slot_offset, 2 * version)
+
+        # make the new slot visible
+        self.HEADER.pack_into(self.buffer, 0, self.MAGIC, version)
+
+        logger.debug("Published snapshot version %s.", version)
+        return version
+
+    @contextlib.contextmanager
+    def refresh_lock(self):
+
+        # non-blocking, yields whether this process is the designated refresher
+        if fcntl is None:
+            yield True
+            return
+
+        # open a fresh file description every time, as flock locks are shared
+        # by descriptors inherited across fork
+        with open(self.lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        self.buffer.close()
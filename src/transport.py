@@ -0,0 +1,73 @@
+import logging
+import socket
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter with a tunable connection pool and TCP keep-alive.
+
+    Keeps up to `pool_maxsize` idle connections per host alive between
+    requests, so TLS handshakes are paid once per connection rather than once
+    per request, and reports how often pooled connections were reused.
+    """
+
+    def __init__(
+        self, pool_connections=4, pool_maxsize=10, pool_block=False, tcp_keepalive=True
+    ):
+
+        # must be set before the pool manager is initialised by HTTPAdapter
+        self.tcp_keepalive = tcp_keepalive
+
+        # retries are handled by the session, not the adapter
+        super().__init__(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0,
+        )
+
+    def clone(self):
+
+        # same settings, none of the pooled connections, e.g. for a forked child
+        # that must not share the parent's sockets
+        return PooledHTTPAdapter(
+            pool_connections=self._pool_connections,
+            pool_maxsize=self._pool_maxsize,
+            pool_block=self._pool_block,
+            tcp_keepalive=self.tcp_keepalive,
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+
+        # probe idle connections so dead ones are detected before reuse
+        if self.tcp_keepalive:
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            ]
+
+        super().init_poolmanager(*args, **kwargs)
+
+    def connection_stats(self):
+
+        # totals over the currently pooled hosts
+        stats = {"hosts": 0, "requests": 0, "connections": 0}
+
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            stats["hosts"] += 1
+            stats["requests"] += pool.num_requests
+            stats["connections"] += pool.num_connections
+
+        stats["reused"] = stats["requests"] - stats["connections"]
+        stats["reuse_ratio"] = (
+            stats["reused"] / stats["requests"] if stats["requests"] else 0.0
+        )
+
+        return stats
@@ -0,0 +1,138 @@
+import io
+import json
+import logging
+
+import numpy as np
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+# binary columnar formats, by media type
+NPZ = "application/x-npz"
+MSGPACK = "application/x-msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+JSON = "application/json"
+
+
+def available_formats():
+
+    # npz only needs numpy, msgpack and Arrow are used when installed
+    formats = [JSON, NPZ]
+    try:
+        import msgpack  # noqa: F401
+
+        formats.append(MSGPACK)
+    except ImportError:
+        pass
+    try:
+        import pyarrow  # noqa: F401
+
+        formats.append(ARROW)
+    except ImportError:
+        pass
+    return formats
+
+
+def negotiate(accept_mimetypes):
+    """
+    Media type to answer with from a request's Accept header (werkzeug
+    MIMEAccept), JSON unless a binary format is preferred. None when only
+    unavailable formats are acceptable.
+    """
+
+    if not accept_mimetypes:
+        return JSON
+    return accept_mimetypes.best_match(available_formats())
+
+
+def encode(columns, meta, media_type):
+    """
+    Serialises `columns` (equal length NumPy arrays, by name) and `meta` (JSON
+    serialisable) straight from the array buffers, without converting
+    elements to Python objects.
+    """
+
+    columns = {name: np.ascontiguousarray(values) for name, values in columns.items()}
+
+    if media_type == NPZ:
+        buffer = io.BytesIO()
+        np.savez(buffer, meta=np.array(json.dumps(meta)), **columns)
+        return buffer.getvalue()
+
+    if media_type == MSGPACK:
+        import msgpack
+
+        return msgpack.packb(
+            {
+                "meta": meta,
+                "columns": {
+                    name: {
+                        "dtype": values.dtype.str,
+                        "shape": list(values.shape),
+                        "data": values.tobytes(),
+                    }
+                    for name, values in columns.items()
+                },
+            }
+        )
+
+    if media_type == ARROW:
+        import pyarrow as pa
+
+        def to_arrow(values):
+
+            # matrices (one row per date) as fixed size lists
+            if values.ndim == 2:
+                return pa.FixedSizeListArray.from_arrays(
+                    pa.array(values.ravel()), values.shape[1]
+                )
+            return pa.array(values)
+
+        table = pa.table({name: to_arrow(values) for name, values in columns.items()})
+        table = table.replace_schema_metadata({"meta": json.dumps(meta)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    raise ValueError(f"Unsupported media type: {media_type}")
+
+
+def decode(payload, media_type):
+    """
+    Columns and meta back from an `encode` payload, for Python consumers.
+    """
+
+    if media_type == NPZ:
+        with np.load(io.BytesIO(payload)) as data:
+            meta = json.loads(str(data["meta"]))
+            return {k: data[k] for k in data.files if k != "meta"}, meta
+
+    if media_type == MSGPACK:
+        import msgpack
+
+        data = msgpack.unpackb(payload)
+        return {
+            name: np.frombuffer(c["data"], dtype=c["dtype"]).reshape(c["shape"])
+            for name, c in data["columns"].items()
+        }, data["meta"]
+
+    if media_type == ARROW:
+        import pyarrow as pa
+
+        table = pa.ipc.open_stream(payload).read_all()
+        meta = json.loads(table.schema.metadata[b"meta"])
+
+        def from_arrow(column):
+            column = column.combine_chunks()
+            if pa.types.is_fixed_size_list(column.type):
+                values = column.flatten().to_numpy(zero_copy_only=False)
+                return values.reshape(-1, column.type.list_size)
+            return column.to_numpy(zero_copy_only=False)
+
+        return {
+            name: from_arrow(table.column(name)) for name in table.column_names
+        }, meta
+
+    raise ValueError(f"Unsupported media type: {media_type}")
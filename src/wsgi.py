@@ -0,0 +1,51 @@
+"""
+Production WSGI entry point.
+
+Run with:
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+
+With ``preload_app`` enabled, gunicorn imports this module once in the master
+process, so the Flask app, the C++ extension and a warm Banxico data snapshot
+are built before the workers are forked and shared with them copy-on-write.
+"""
+
+import gc
+import logging
+
+import requests
+
+from .app import app, get_banxico_data_fetcher
+
+logger = logging.getLogger(__name__)
+
+
+def warm_snapshot():
+
+    # build the fetcher and fetch the first data snapshot, so no worker pays
+    # for a cold start
+    banxico_data_fetcher = get_banxico_data_fetcher()
+    if banxico_data_fetcher is None:
+        logger.warning("Skipping snapshot warm up: no BanxicoDataFetcher.")
+        return False
+
+    try:
+        banxico_data_fetcher.warm()
+    except requests.exceptions.RequestException as e:
+        # workers will fetch on their first request instead
+        logger.error("Snapshot warm up failed, continuing with a cold start.")
+        logger.exception(e)
+        return False
+
+    logger.info("Snapshot warm up complete.")
+    return True
+
+
+warm_snapshot()
+
+# move every object allocated so far to the permanent generation, so the
+# garbage collector never writes to (and thereby copies) the preloaded pages
+# in the forked workers
+gc.freeze()
+
+__all__ = ["app"]
@@ -0,0 +1,94 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import cpp_engine
+from cpp_engine._numpy_engine import round_to
+
+from .metrics import NEWTON_ITERATIONS, YIELD_MEMO_LOOKUPS
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+
+class YieldMemo:
+    """
+    Bounded LRU memo of Mbono price-to-yield solves, keyed on the inputs as
+    the C++ engine rounds them (prices to 6dp, coupons to 2dp, whole days to
+    maturity), so a bond already solved costs a dict lookup.
+
+    Only the misses of a batch are sent to the engine, in a single call.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = (
+            int(os.getenv("PRICE_TO_YIELD_MEMO_SIZE", "65536"))
+            if maxsize is None
+            else maxsize
+        )
+        self.yields = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self, prices, dtms, coups):
+        return list(
+            zip(
+                round_to(prices, 6).tolist(),
+                [int(x) for x in dtms],
+                round_to(coups, 2).tolist(),
+            )
+        )
+
+    def price_to_yield(self, prices, dtms, coups):
+        """
+        Yields of each bond, -1.0 where the solve fails, as
+        cpp_engine.price_to_yield.
+        """
+
+        keys = self.keys(prices, dtms, coups)
+        found = {}
+
+        with self.lock:
+            for key in keys:
+                if key in self.yields:
+                    self.yields.move_to_end(key)
+                    found[key] = self.yields[key]
+
+        # solve each distinct miss once
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        if missing:
+            ylds, iterations = cpp_engine.price_to_yield_iterations(
+                *(list(x) for x in zip(*missing))
+            )
+            NEWTON_ITERATIONS.observe_many(iterations)
+            found.update(zip(missing, ylds))
+
+            with self.lock:
+                for key in missing:
+                    self.yields[key] = found[key]
+                while len(self.yields) > self.maxsize:
+                    self.yields.popitem(last=False)
+
+        hits = len(keys) - len(missing)
+        with self.lock:
+            self.hits += hits
+            self.misses += len(missing)
+        YIELD_MEMO_LOOKUPS.inc(hits, result="hit")
+        YIELD_MEMO_LOOKUPS.inc(len(missing), result="miss")
+        logger.debug("Yield memo: %s hits, %s solved.", hits, len(missing))
+
+        return [found[key] for key in keys]
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        with self.lock:
+            self.yields.clear()
+
+    def __len__(self):
+        return len(self.yields)
@@ -0,0 +1,266 @@
+"""
+Local stand-in for the Banxico SIE API.
+
+Replays the recorded `/series/{ids}/datos/oportuno` responses in
+tests/fixtures/banxico/ and synthesises `/series/{ids}/datos/{start}/{end}`
+history (on each series' own publication calendar), with configurable latency, jitter, error rate, missing values and
+payload padding, so the fetcher can be tested and load tested offline and
+deterministically.
+
+usage: python -m tests.banxico_stub [--port 8001] [--latency 0.2] ...
+
+then point the app at it with
+BANXICO_API_URL=http://127.0.0.1:8001/SieAPIRest/service/v1/series/
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# set up the logger for this module
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "banxico")
+
+SERIES_PATH = "/SieAPIRest/service/v1/series/"
+
+
+class BanxicoStubServer:
+    """
+    Threaded HTTP server answering like the Banxico SIE API.
+
+    latency, jitter: seconds added to each response (uniform +/- jitter)
+    error_rate: fraction of requests answered with `error_status`
+    missing_rate: fraction of history data points returned as "N/E"
+    padding: bytes of whitespace appended to each JSON body
+    token: if set, requests without this Bmx-Token get a 401
+
+    Random draws are seeded per request number, so a given sequence of
+    requests always sees the same latencies and errors.
+    """
+
+    # publication calendar of the series that are not quoted on business
+    # days: the UDI is set for every calendar day, inflation once a month
+    CALENDAR_DAILY = {"SP68257"}
+    MONTHLY = {"SP30578"}
+
+    ROUTE = re.compile(
+        re.escape(SERIES_PATH)
+        + r"(?P<ids>[^/]+)/datos/(?:(?P<oportuno>oportuno)"
+        + r"|(?P<start>\d{4}-\d{2}-\d{2})/(?P<end>\d{4}-\d{2}-\d{2}))"
+    )
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=503,
+        missing_rate=0.0,
+        padding=0,
+        token=None,
+        seed=42,
+    ):
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.missing_rate = missing_rate
+        self.padding = padding
+        self.token = token
+        self.seed = seed
+
+        with open(os.path.join(FIXTURES_DIR, "oportuno.json"), encoding="utf-8") as f:
+            self.series = {s["idSerie"]: s for s in json.load(f)["bmx"]["series"]}
+
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), self.make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{SERIES_PATH}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info("Banxico stub listening at %s", self.url)
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    # --- responses ---
+
+    def next_rng(self):
+
+        # one deterministic random stream per request number
+        with self.lock:
+            self.requests += 1
+            number = self.requests
+        return random.Random(f"{self.seed}:{number}")
+
+    def oportuno(self, ids):
+        return [self.series[i] for i in ids if i in self.series]
+
+    def history(self, ids, start, end):
+
+        calendar = np.arange(
+            np.datetime64(start), np.datetime64(end) + 1, dtype="datetime64[D]"
+        )
+
+        series = []
+        for series_id in ids:
+            recorded = self.series.get(series_id)
+            if recorded is None:
+                continue
+
+            if series_id in self.CALENDAR_DAILY:
+                dates = calendar
+            elif series_id in self.MONTHLY:
+                dates = calendar[calendar == calendar.astype("datetime64[M]")]
+            else:
+                dates = calendar[np.is_busday(calendar)]
+            days = dates.astype(np.int64)
+            fechas = [d.strftime("%d/%m/%Y") for d in dates.astype(object)]
+
+            # smooth deterministic path around the recorded value, so
+            # overlapping ranges agree on every date
+            dato = recorded["datos"][0]["dato"]
+            base = float(dato.replace(",", ""))
+            phase = zlib.crc32(series_id.encode()) % 1000
+            values = base * (
+                1
+                + 0.1 * np.sin(2 * np.pi * (days + phase) / 1500)
+                + 0.02 * np.sin(2 * np.pi * (days + 3 * phase) / 90)
+            )
+
+            # missing points are chosen by (series, date) as well
+            noise = np.sin(days * 12.9898 + phase * 78.233) * 43758.5453
+            missing = (noise - np.floor(noise)) < self.missing_rate
+
+            is_integer = "." not in dato
+            datos = [
+                {
+                    "fecha": fecha,
+                    "dato": (
+                        "N/E"
+                        if miss
+                        else f"{round(v):,}" if is_integer else f"{v:,.6f}"
+                    ),
+                }
+                for fecha, v, miss in zip(fechas, values, missing)
+            ]
+            series.append(
+                {"idSerie": series_id, "titulo": recorded["titulo"], "datos": datos}
+            )
+
+        return series
+
+    def make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                rng = stub.next_rng()
+
+                delay = stub.latency + rng.uniform(-stub.jitter, stub.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+
+                if (
+                    stub.token is not None
+                    and self.headers.get("Bmx-Token") != stub.token
+                ):
+                    return self.reply(401, {"error": {"mensaje": "Token invalido"}})
+
+                if rng.random() < stub.error_rate:
+                    with stub.lock:
+                        stub.errors += 1
+                    return self.reply(stub.error_status, {"error": "Injected error"})
+
+                match = stub.ROUTE.match(self.path.split("?")[0])
+                if match is None:
+                    return self.reply(404, {"error": "Not found"})
+
+                ids = match.group("ids").split(",")
+                if match.group("oportuno"):
+                    series = stub.oportuno(ids)
+                else:
+                    series = stub.history(ids, match.group("start"), match.group("end"))
+
+                self.reply(200, {"bmx": {"series": series}})
+
+            def reply(self, status, payload):
+                body = json.dumps(payload).encode("utf-8") + b" " * stub.padding
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=1)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("stub: " + format, *args)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Banxico SIE stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--missing-rate", type=float, default=0.0)
+    parser.add_argument("--padding", type=int, default=0)
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    server = BanxicoStubServer(**vars(args))
+    print(f"Serving Banxico stub at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
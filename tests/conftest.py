@@ -0,0 +1,43 @@
+import pytest
+
+from src import FIdash
+from src.banxico_stream import SeriesData
+from src.history import HistoryStore
+from tests.banxico_stub import BanxicoStubServer
+
+
+@pytest.fixture(scope="session")
+def stub_history():
+
+    # 2024 and the first days of 2025 from the local stub, fetched separately
+    with BanxicoStubServer() as stub, pytest.MonkeyPatch.context() as mp:
+        mp.setenv("BANXICO_API_KEY", "dummy")
+        mp.setenv("BANXICO_API_URL", stub.url)
+        fetcher = FIdash.BanxicoDataFetcher()
+        return (
+            HistoryStore().fetch(fetcher, "2024-01-01", "2024-12-31"),
+            HistoryStore().fetch(fetcher, "2025-01-01", "2025-01-03"),
+        )
+
+
+@pytest.fixture
+def copy_of():
+
+    # a store with its own values, safe to merge into or revise
+    def copy(store):
+        return HistoryStore(store.dates, store.series_ids, store.values.copy())
+
+    return copy
+
+
+@pytest.fixture
+def first_days():
+
+    # the first n days of every series, as fetch_history would return them
+    def take(store, n):
+        return {
+            s: SeriesData(store.dates[:n], store.values[:n, i])
+            for i, s in enumerate(store.series_ids)
+        }
+
+    return take
@@ -129,6 +129,28 @@ def test_clean_returned_data():
         )
 
 
+def test_clean_returned_data_drops_missing_values():
+
+    test_object = FIdash.BanxicoDataFetcher()
+    banxico_data = generate_random_API_responses(1)[0]
+
+    # Banxico answers "N/E" for a price it has not published yet
+    missing = banxico_data["mbonos_px"][0]
+    missing["datos"][0]["dato"] = "N/E"
+
+    pxs, dtms, coups = test_object.clean_returned_data(
+        banxico_data["mbonos_px"],
+        banxico_data["mbonos_dtm"],
+        banxico_data["mbonos_coup"],
+    )
+    assert missing["idSerie"] not in [x["idSerie"] for x in pxs]
+    assert len(pxs) == len(dtms) - 1 == len(coups) - 1
+
+    # and the instrument is dropped from every role
+    pxs, dtms, coups = test_object.reorder_data(pxs, dtms, coups)
+    assert len(pxs) == len(dtms) == len(coups) == 4
+
+
 def test_reorder_data():
 
     test_object = FIdash.BanxicoDataFetcher()
@@ -528,6 +550,37 @@ def test_get_labels_dates_yields():
                 ), f"Date string '{expected_date}' is not in the expected format DD/MM/YYYY"
 
 
+def test_get_data_snapshot_cache(monkeypatch):
+    test_object = FIdash.BanxicoDataFetcher()
+    banxico_data = generate_random_API_responses(1)[0]
+
+    calls = []
+
+    def mock_call_api():
+        calls.append(1)
+        return banxico_data
+
+    monkeypatch.setattr(test_object, "call_api", mock_call_api)
+
+    # caching disabled, every call refetches
+    test_object.config = test_object.config._replace(snapshot_ttl=0)
+    test_object.get_data()
+    test_object.get_data()
+    assert len(calls) == 2
+
+    # caching enabled, fresh snapshot is served without refetching
+    test_object.config = test_object.config._replace(snapshot_ttl=60)
+    first = test_object.warm()
+    second = test_object.get_data()
+    assert len(calls) == 3
+    assert first is second
+    assert len(second) == 5
+
+    # warming always refetches
+    test_object.warm()
+    assert len(calls) == 4
+
+
 def generate_random_API_responses(n):
 
     # simulates n random API responses for yield curve and summary data
@@ -686,6 +739,31 @@ def generate_random_API_responses(n):
             "summary": summary,
         }
 
+        # generate random off-curve data, e.g. udibonos and bondes f
+        for group in test_object.registry.groups:
+            if group.curve:
+                continue
+            for role in group.roles:
+                response[f"{group.name}_{role}"] = [
+                    {
+                        "idSerie": instrument.series[role],
+                        "titulo": instrument.tenor,
+                        "datos": [
+                            {
+                                "fecha": rand_date,
+                                "dato": {
+                                    "px": f"{random.uniform(90, 110):.6f}",
+                                    "dtm": f"{convert_to_days(instrument.tenor):,}",
+                                    "coup": f"{random.choice(possible_coupons):.6f}",
+                                }[role],
+                            }
+                        ],
+                    }
+                    for instrument in random.sample(
+                        group.instruments, len(group.instruments)
+                    )
+                ]
+
         response_list.append(response)
 
     return response_list
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from src import app as app_module
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code):
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=PROJECT_ROOT,
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_import_defers_data_subsystem():
+    loaded = run_python(
+        "import sys, src.app; "
+        "print(sorted(m for m in ('requests', 'numpy', 'cpp_engine', 'src.FIdash') "
+        "if m in sys.modules))"
+    )
+    assert loaded == "[]"
+
+
+def test_pages_served_before_fetcher_is_built(monkeypatch):
+    monkeypatch.setattr(app_module, "banxico_data_fetcher", app_module.NOT_INITIALISED)
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        assert client.get("/").status_code == 200
+        assert client.get("/options_pricing").status_code == 200
+
+    assert app_module.banxico_data_fetcher is app_module.NOT_INITIALISED
+
+
+def test_fetcher_built_once(monkeypatch):
+    monkeypatch.setattr(app_module, "banxico_data_fetcher", app_module.NOT_INITIALISED)
+
+    built = []
+    barrier = threading.Barrier(8)
+
+    def init():
+        built.append(object())
+        return built[-1]
+
+    monkeypatch.setattr(app_module, "init_banxico_data_fetcher", init)
+
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(app_module.get_banxico_data_fetcher())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(result is built[0] for result in results)
+
+
+def test_failed_initialisation(monkeypatch):
+    monkeypatch.setattr(app_module, "banxico_data_fetcher", app_module.NOT_INITIALISED)
+    monkeypatch.setenv("BANXICO_API_KEY", " ")
+
+    # missing API key, the dashboard reports the failed setup
+    assert app_module.get_banxico_data_fetcher() is None
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        response = client.get("/fi_dashboard")
+
+    assert response.status_code == 503
+    assert b"Banxico API Key setup failed." in response.data
+
+
+def test_create_app_is_independent():
+    first, second = app_module.create_app(), app_module.create_app()
+
+    assert first is not second
+    assert {r.endpoint for r in first.url_map.iter_rules()} >= {
+        "home",
+        "fi_dashboard",
+        "options_pricer",
+        "metrics",
+    }
+
+
+@pytest.mark.parametrize("path", ["/", "/options_pricing"])
+def test_factory_app_serves_static_pages(path):
+    app = app_module.create_app()
+    app.testing = True
+    with app.test_client() as client:
+        assert client.get(path).status_code == 200
@@ -0,0 +1,163 @@
+import json
+import math
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from src import FIdash
+from src.backfill import backfill, date_chunks, main
+from src.history import MAX_SERIES_PER_REQUEST, HistoryStore, history_series_ids
+from tests.banxico_stub import BanxicoStubServer
+
+
+class RecordingFetcher:
+
+    # counts the ranges requested and the rate limit waits asked for, failing
+    # every request for `fail_chunk`
+    def __init__(self, fetcher, fail_chunk=None):
+        self.fetcher = fetcher
+        self.fail_chunk = fail_chunk
+        self.ranges = []
+        self.waits = set()
+        self.lock = threading.Lock()
+
+    def fetch_history(self, series_ids, start, end, **kwargs):
+        with self.lock:
+            self.ranges.append((start, end))
+            self.waits.add(kwargs.get("rate_limit_wait"))
+        if (start, end) == self.fail_chunk:
+            raise ConnectionError("connection dropped")
+        return self.fetcher.fetch_history(series_ids, start, end, **kwargs)
+
+
+def test_date_chunks():
+    assert date_chunks("2024-01-01", "2024-01-10", 4) == [
+        ("2024-01-01", "2024-01-04"),
+        ("2024-01-05", "2024-01-08"),
+        ("2024-01-09", "2024-01-10"),
+    ]
+    assert date_chunks("2024-01-01", "2024-01-01", 365) == [
+        ("2024-01-01", "2024-01-01")
+    ]
+
+    with pytest.raises(ValueError):
+        date_chunks("2024-01-02", "2024-01-01", 30)
+    with pytest.raises(ValueError):
+        date_chunks("2024-01-01", "2024-01-10", 0)
+
+
+def test_backfill_matches_single_fetch(monkeypatch, tmp_path):
+    path = str(tmp_path / "history.npz")
+
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        fetcher = FIdash.BanxicoDataFetcher()
+        report = backfill(fetcher, "2024-01-01", "2024-12-31", path, chunk_days=60)
+        expected = HistoryStore().fetch(fetcher, "2024-01-01", "2024-12-31")
+
+    store = HistoryStore.load(path)
+    np.testing.assert_array_equal(store.dates, expected.dates)
+    assert sorted(store.series_ids) == sorted(expected.series_ids)
+    np.testing.assert_array_equal(
+        store.values[:, [store.columns[s] for s in expected.series_ids]],
+        expected.values,
+    )
+
+    assert report.chunks == 7 and report.skipped == 0 and not report.failed
+    assert report.points == np.count_nonzero(~np.isnan(expected.values))
+
+
+def test_interrupted_backfill_resumes(monkeypatch, tmp_path):
+    path = str(tmp_path / "history.npz")
+    chunks = date_chunks("2024-01-01", "2024-12-31", 60)
+    n_requests = -(-len(history_series_ids()) // MAX_SERIES_PER_REQUEST)
+
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        fetcher = FIdash.BanxicoDataFetcher()
+
+        first = RecordingFetcher(fetcher, fail_chunk=chunks[3])
+        report = backfill(first, "2024-01-01", "2024-12-31", path, chunk_days=60)
+        assert report.failed == [chunks[3]]
+        assert report.chunks == len(chunks) - 1
+
+        # workers queue for the shared rate limit rather than fail
+        assert first.waits == {math.inf}
+
+        with open(path + ".checkpoint.json", encoding="utf-8") as f:
+            done = {tuple(x) for x in json.load(f)["done"]}
+        assert done == set(chunks) - {chunks[3]}
+
+        # only the failed chunk is fetched again
+        second = RecordingFetcher(fetcher)
+        report = backfill(second, "2024-01-01", "2024-12-31", path, chunk_days=60)
+        assert set(second.ranges) == {chunks[3]}
+        assert len(second.ranges) == n_requests
+        assert report.chunks == 1 and report.skipped == len(chunks) - 1
+
+        expected = HistoryStore().fetch(fetcher, "2024-01-01", "2024-12-31")
+
+    store = HistoryStore.load(path)
+    np.testing.assert_array_equal(store.dates, expected.dates)
+    np.testing.assert_array_equal(
+        store.values[:, [store.columns[s] for s in expected.series_ids]],
+        expected.values,
+    )
+
+
+def test_store_saved_before_checkpoint(monkeypatch, tmp_path):
+    path = str(tmp_path / "history.npz")
+    checkpoint_path = path + ".checkpoint.json"
+    save = HistoryStore.save
+    marked_at_save = []
+
+    def recording_save(store, path):
+        # chunks the checkpoint already records when the store is saved
+        done = []
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, encoding="utf-8") as f:
+                done = json.load(f)["done"]
+        marked_at_save.append(len(done))
+        save(store, path)
+
+    monkeypatch.setattr(HistoryStore, "save", recording_save)
+
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        report = backfill(
+            FIdash.BanxicoDataFetcher(),
+            "2024-01-01",
+            "2024-12-31",
+            path,
+            chunk_days=60,
+            save_every=3,
+        )
+
+    # saved every three chunks and at the end, never ahead of the checkpoint
+    assert report.chunks == 7
+    assert marked_at_save == [0, 3, 6]
+    with open(checkpoint_path, encoding="utf-8") as f:
+        assert len(json.load(f)["done"]) == 7
+
+    report = backfill(
+        FIdash.BanxicoDataFetcher(), "2024-01-01", "2024-12-31", path, chunk_days=60
+    )
+    assert report.chunks == 0 and report.points == 0
+
+
+def test_cli_reports_throughput(monkeypatch, tmp_path, capsys):
+    path = str(tmp_path / "history.npz")
+
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        status = main(
+            ["--start", "2024-01-01", "--end", "2024-03-31", "--path", path]
+            + ["--chunk-days", "31", "--workers", "2"]
+        )
+
+    assert status == 0
+    assert "points/sec" in capsys.readouterr().out
+    # the UDI is published every calendar day
+    assert len(HistoryStore.load(path)) == 31 + 29 + 31
@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+
+from src import banxico_parsing
+from src.banxico_parsing import parse_dates, parse_ints, parse_values
+from tests.test_FIdash import generate_random_API_responses
+
+
+def test_parse_values():
+    values, missing = parse_values(
+        ["7.8114", "1,092.000000", " 18.4315 ", "N/E", "", "12,345,678.5"]
+    )
+
+    assert values.dtype == np.float64
+    np.testing.assert_array_equal(
+        values, [7.8114, 1092.0, 18.4315, np.nan, np.nan, 12345678.5]
+    )
+    assert missing.tolist() == [False, False, False, True, True, False]
+
+
+def test_parse_values_masks_unexpected_placeholders(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(
+        banxico_parsing.logger, "warning", lambda *args: warnings.append(args)
+    )
+
+    values, missing = parse_values([b"1.5", b"n.d.", b"2", b"N/E"])
+
+    assert values[0] == 1.5 and values[2] == 2.0
+    assert math.isnan(values[1]) and math.isnan(values[3])
+    assert missing.tolist() == [False, True, False, True]
+
+    # known placeholders are masked without a warning
+    assert len(warnings) == 1 and warnings[0][1] == b"n.d."
+
+
+def test_parse_values_matches_python_conversion():
+    banxico_data = generate_random_API_responses(50)
+    datos = [
+        x["datos"][0]["dato"]
+        for response in banxico_data
+        for x in response["mbonos_px"] + response["summary"]
+    ]
+
+    values, missing = parse_values(datos)
+
+    assert not missing.any()
+    assert values.tolist() == [float(x.replace(",", "")) for x in datos]
+
+
+def test_parse_ints():
+    banxico_data = generate_random_API_responses(50)
+    datos = [
+        x["datos"][0]["dato"]
+        for response in banxico_data
+        for x in response["mbonos_dtm"] + response["cetes_dtm"]
+    ]
+
+    ints, missing = parse_ints(datos + ["N/E"], fill_value=-1)
+
+    assert ints.dtype == np.int32
+    assert ints[:-1].tolist() == [int(float(x.replace(",", ""))) for x in datos]
+    assert ints[-1] == -1
+    assert missing[-1] and not missing[:-1].any()
+
+
+def test_parse_dates():
+    # zero padded fast path
+    dates = parse_dates(["27/10/2025", "01/09/2025", "29/02/2024"])
+    assert dates.dtype == np.dtype("datetime64[D]")
+    assert dates.tolist() == [
+        np.datetime64("2025-10-27").item(),
+        np.datetime64("2025-09-01").item(),
+        np.datetime64("2024-02-29").item(),
+    ]
+
+    # unpadded dates and invalid entries
+    dates = parse_dates(["5/3/2010", "27/10/2025", "N/E"])
+    np.testing.assert_array_equal(
+        dates, np.array(["2010-03-05", "2025-10-27", "NaT"], dtype="datetime64[D]")
+    )
+
+    # zero padded but invalid dates fall back to the per-element path
+    dates = parse_dates(["01/02/2020", "32/13/2020"])
+    np.testing.assert_array_equal(
+        dates, np.array(["2020-02-01", "NaT"], dtype="datetime64[D]")
+    )
+    dates = parse_dates([b"01/02/2020", b"29/02/2023"])
+    np.testing.assert_array_equal(
+        dates, np.array(["2020-02-01", "NaT"], dtype="datetime64[D]")
+    )
+
+    assert len(parse_dates([])) == 0
@@ -0,0 +1,121 @@
+import json
+import math
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src import FIdash
+from src.banxico_stream import BanxicoStreamParser
+
+
+def generate_history_payload(series_ids, n_points, seed=42):
+
+    # simulates a Banxico /datos/{start}/{end} response
+    rng = random.Random(seed)
+    start = np.datetime64("2000-01-03")
+
+    series = []
+    for series_id in series_ids:
+        datos = []
+        for i in range(n_points):
+            date = (start + i).astype(datetime)
+            dato = "N/E" if rng.random() < 0.05 else f"{rng.uniform(0, 2000):,.6f}"
+            datos.append({"fecha": date.strftime("%d/%m/%Y"), "dato": dato})
+        series.append(
+            {"idSerie": series_id, "titulo": f"Serie {series_id}", "datos": datos}
+        )
+
+    return json.dumps({"bmx": {"series": series}}, indent=1).encode("utf-8")
+
+
+def reference_parse(payload):
+
+    # parse with the json module for comparison
+    parsed = {}
+    for series in json.loads(payload)["bmx"]["series"]:
+        dates = [datetime.strptime(x["fecha"], "%d/%m/%Y") for x in series["datos"]]
+        values = [
+            math.nan if x["dato"] == "N/E" else float(x["dato"].replace(",", ""))
+            for x in series["datos"]
+        ]
+        parsed[series["idSerie"]] = (
+            np.array(dates, dtype="datetime64[D]"),
+            np.array(values),
+        )
+    return parsed
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 4096, 10**7])
+def test_parser_matches_json_module(chunk_size):
+    payload = generate_history_payload(["SF43783", "SF61745", "SP30578"], 300)
+    expected = reference_parse(payload)
+
+    # small batches so each series is converted in several passes
+    parser = BanxicoStreamParser(batch_size=97)
+    for i in range(0, len(payload), chunk_size):
+        parser.feed(payload[i : i + chunk_size])
+    parsed = parser.close()
+
+    assert parsed.keys() == expected.keys()
+    for series_id, (dates, values) in expected.items():
+        assert parsed[series_id].dates.dtype == np.dtype("datetime64[D]")
+        assert parsed[series_id].values.dtype == np.float64
+        np.testing.assert_array_equal(parsed[series_id].dates, dates)
+        np.testing.assert_array_equal(parsed[series_id].values, values)
+
+
+def test_parser_buffer_stays_bounded():
+    payload = generate_history_payload(["SF43783"], 2000)
+
+    parser = BanxicoStreamParser()
+    for i in range(0, len(payload), 1024):
+        parser.feed(payload[i : i + 1024])
+        assert len(parser.buffer) <= BanxicoStreamParser.MAX_TOKEN + 1024
+
+    assert len(parser.close()["SF43783"].values) == 2000
+
+
+class MockStreamResponse:
+    """Mocks a streamed requests response."""
+
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.payload), chunk_size):
+            yield self.payload[i : i + chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def test_fetch_history(monkeypatch):
+    test_object = FIdash.BanxicoDataFetcher()
+    payload = generate_history_payload(["SF43783", "SF61745"], 50)
+    requested = {}
+
+    def mock_get(url, **kwargs):
+        requested.update(kwargs, url=url)
+        return MockStreamResponse(payload)
+
+    monkeypatch.setattr(test_object.session, "get", mock_get)
+
+    history = test_object.fetch_history(
+        ["SF43783", "SF61745"], "2000-01-03", "2000-02-21", chunk_size=100
+    )
+
+    assert requested["url"].endswith(
+        "SF43783,SF61745/datos/2000-01-03/2000-02-21?decimales=sinCeros"
+    )
+    assert requested["stream"] is True
+    assert len(history["SF43783"].dates) == 50
+    assert history["SF61745"].dates[-1] == np.datetime64("2000-02-21")
@@ -0,0 +1,233 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+import requests
+
+from src import FIdash
+from tests.banxico_stub import BanxicoStubServer
+
+
+@pytest.fixture
+def stub_fetcher(monkeypatch, request):
+    """
+    BanxicoDataFetcher pointed at a local stub server, configured through
+    indirect parametrisation.
+    """
+    options = getattr(request, "param", {})
+
+    with BanxicoStubServer(**options) as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        monkeypatch.setenv("BANXICO_MAX_RETRIES", "0")
+        monkeypatch.setenv("BANXICO_READ_TIMEOUT", "1")
+        yield FIdash.BanxicoDataFetcher(), stub
+
+
+def test_call_api_against_stub(stub_fetcher):
+    test_object, stub = stub_fetcher
+
+    test_data = test_object.call_api()
+
+    # every requested series is returned
+    assert [x["idSerie"] for x in test_data["cetes_yld"]] == list(
+        test_object.CETES_MATURITY_MAP_YLD.keys()
+    )
+    assert [x["idSerie"] for x in test_data["summary"]] == list(
+        test_object.SUMMARY_MAP.keys()
+    )
+    # every series in batches of at most 20 ids
+    assert stub.requests == len(test_object.api_urls_oportuno) == 2
+
+
+def test_get_data_against_stub(stub_fetcher):
+    test_object, _ = stub_fetcher
+
+    curve_labels, curve_dates, curve_yields, curve_dtms, summary_data = (
+        test_object.get_data()
+    )
+
+    assert curve_labels[0] == "28 Days" and curve_labels[-1] == "30 Years"
+    assert curve_dtms == sorted(curve_dtms)
+    assert -1.0 not in curve_yields
+    assert summary_data["TIIE28"]["value"] == 7.8114
+
+
+def test_fetch_history_against_stub(stub_fetcher):
+    test_object, _ = stub_fetcher
+
+    history = test_object.fetch_history(
+        ["SF43783", "SF45427"], "2024-01-01", "2024-12-31"
+    )
+
+    dates, values = history["SF43783"]
+    assert len(dates) == np.busday_count("2024-01-01", "2025-01-01")
+    assert np.is_busday(dates).all()
+    assert not np.isnan(values).any()
+
+    # integer series (days to maturity) stay integral
+    assert (history["SF45427"].values == np.round(history["SF45427"].values)).all()
+
+    # overlapping ranges agree
+    later = test_object.fetch_history(["SF43783"], "2024-06-03", "2024-06-07")
+    np.testing.assert_array_equal(
+        later["SF43783"].values, values[dates >= np.datetime64("2024-06-03")][:5]
+    )
+
+
+@pytest.mark.parametrize("stub_fetcher", [{"missing_rate": 0.2}], indirect=True)
+def test_stub_missing_values(stub_fetcher):
+    test_object, _ = stub_fetcher
+
+    values = test_object.fetch_history(["SF43783"], "2020-01-01", "2020-12-31")[
+        "SF43783"
+    ].values
+
+    assert 0.1 < np.isnan(values).mean() < 0.3
+
+
+@pytest.mark.parametrize(
+    "stub_fetcher", [{"error_rate": 1.0, "error_status": 503}], indirect=True
+)
+def test_stub_errors(stub_fetcher):
+    test_object, stub = stub_fetcher
+
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        test_object.call_api()
+
+    assert e.value.response.status_code == 503
+    assert stub.errors == 1
+
+
+@pytest.mark.parametrize("stub_fetcher", [{"latency": 0.3}], indirect=True)
+def test_stub_latency(stub_fetcher, monkeypatch):
+    test_object, _ = stub_fetcher
+
+    start = time.perf_counter()
+    test_object.call_api()
+    assert time.perf_counter() - start >= len(test_object.api_urls_oportuno) * 0.3
+
+    # slower than the read timeout
+    test_object.config = test_object.config._replace(timeout=(1, 0.1))
+    with pytest.raises(requests.exceptions.Timeout):
+        test_object.call_api()
+
+
+@pytest.mark.parametrize("stub_fetcher", [{"latency": 0.2}], indirect=True)
+def test_call_api_within_retry_budget(stub_fetcher):
+    test_object, _ = stub_fetcher
+
+    # every batch times out and would be retried for longer than the budget
+    test_object.config = test_object.config._replace(
+        timeout=(1, 0.1), max_retries=10, retry_budget=0.5
+    )
+    test_object.local = threading.local()
+    test_object.circuit_breaker.failure_threshold = 100
+
+    start = time.perf_counter()
+    with pytest.raises(requests.exceptions.Timeout):
+        test_object.call_api()
+    assert time.perf_counter() - start < 1.0
+
+
+@pytest.mark.parametrize("stub_fetcher", [{"token": "secret"}], indirect=True)
+def test_stub_rejects_bad_token(stub_fetcher):
+    test_object, _ = stub_fetcher
+
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        test_object.call_api()
+
+    assert e.value.response.status_code == 401
+
+
+def test_stub_is_deterministic():
+    outcomes = []
+    for _ in range(2):
+        with BanxicoStubServer(error_rate=0.5, seed=7) as stub:
+            session = requests.Session()
+            outcomes.append(
+                [
+                    session.get(stub.url + "SF43783/datos/oportuno").status_code
+                    for _ in range(20)
+                ]
+            )
+
+    assert outcomes[0] == outcomes[1]
+    assert 200 in outcomes[0] and 503 in outcomes[0]
+
+
+def concurrent_fetcher(monkeypatch, stub, snapshot_ttl):
+
+    # fetcher allowed to call the stub as fast as the threads ask
+    monkeypatch.setenv("BANXICO_API_URL", stub.url)
+    monkeypatch.setenv("BANXICO_SNAPSHOT_TTL", str(snapshot_ttl))
+    monkeypatch.setenv("BANXICO_RATE_LIMIT", "1e9")
+    monkeypatch.setenv("BANXICO_RATE_BURST", "100000")
+    monkeypatch.setenv("BANXICO_POOL_SIZE", "64")
+    monkeypatch.delenv("BANXICO_SNAPSHOT_PATH", raising=False)
+    return FIdash.BanxicoDataFetcher()
+
+
+def run_threads(target, n_threads):
+
+    # starts every thread at once, returns their results and exceptions
+    barrier = threading.Barrier(n_threads)
+    results, errors = [], []
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_get_data(monkeypatch):
+    with BanxicoStubServer(latency=0.02, jitter=0.01) as stub:
+        test_object = concurrent_fetcher(monkeypatch, stub, 0)
+        expected = test_object.get_data()
+        sessions = []
+
+        def get_data():
+            sessions.append(test_object.session)
+            return test_object.get_data()
+
+        # caching disabled, every call fetches at the same time
+        results, errors = run_threads(get_data, 32)
+        requests_made = stub.requests
+
+    assert not errors
+    assert len(results) == 32
+    assert all(result == expected for result in results)
+    assert requests_made == 33 * len(test_object.api_urls_oportuno)
+
+    # one session per thread over the shared connection pool
+    assert len({id(session) for session in sessions}) == 32
+    assert test_object.adapter.connection_stats()["hosts"] == 1
+
+
+def test_concurrent_refresh_fetches_once(monkeypatch):
+    with BanxicoStubServer(latency=0.05) as stub:
+        test_object = concurrent_fetcher(monkeypatch, stub, 60)
+
+        # cold start: the first thread fetches, the others wait for it
+        results, errors = run_threads(test_object.get_data, 32)
+        assert not errors
+        assert all(result is results[0] for result in results)
+        assert stub.requests == len(test_object.api_urls_oportuno)
+
+        # expired: one thread refreshes, the others serve the old snapshot
+        stale = test_object.latest
+        test_object.latest = stale._replace(fetched_at=stale.fetched_at - 120)
+        results, errors = run_threads(test_object.get_data, 32)
+        assert not errors
+        assert stub.requests == 2 * len(test_object.api_urls_oportuno)
+        assert all(result == stale.data for result in results)
+        assert test_object.latest.fetched_at > stale.fetched_at
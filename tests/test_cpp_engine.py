@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+import cpp_engine
+from cpp_engine import _numpy_engine
+from benchmarks.conftest import generate_bonds
+from tests.test_app_startup import run_python
+
+
+def test_numpy_price_to_yield_matches_cpp():
+    pxs, dtms, coups = generate_bonds(2000)
+
+    # inputs the solver must flag rather than solve
+    pxs += [float("nan"), 0.0, -5.0, 1e6]
+    dtms += [1000] * 4
+    coups += [8.5] * 4
+
+    cpp = np.array(cpp_engine.price_to_yield(pxs, dtms, coups))
+    fallback, iterations = _numpy_engine.price_to_yield_iterations(pxs, dtms, coups)
+    fallback = np.array(fallback)
+
+    np.testing.assert_array_equal(fallback == -1.0, cpp == -1.0)
+    assert (fallback[-4:] == -1.0).all()
+    np.testing.assert_allclose(fallback, cpp, rtol=0, atol=1e-7)
+
+    # every valid yield reprices to the quoted 6dp price
+    valid = fallback != -1.0
+    K, d = _numpy_engine.find_k(dtms), _numpy_engine.find_d(dtms)
+    repriced = _numpy_engine.round_to(
+        _numpy_engine.px(np.array(coups), fallback, K, d), 6
+    )
+    np.testing.assert_array_equal(repriced[valid], np.array(pxs)[valid])
+    assert max(iterations) < 50
+
+
+def test_numpy_udibono_and_bondes_match_cpp():
+    pxs, dtms, coups = generate_bonds(200, seed=7)
+    udi = 8.537924
+
+    np.testing.assert_allclose(
+        _numpy_engine.udibono_price_to_yield(
+            [p * udi for p in pxs], dtms, coups, [udi]
+        ),
+        cpp_engine.udibono_price_to_yield([p * udi for p in pxs], dtms, coups, [udi]),
+        atol=1e-7,
+    )
+    with pytest.raises(ValueError):
+        _numpy_engine.udibono_price_to_yield(pxs, dtms, coups, [udi, udi])
+
+    prices = [100.0, 99.9, 100.05, 101.2, 0.0]
+    dtms, coups = [28, 700, 1500, 29, 90], [7.25, 7.25, 7.3, 9.1, 7.0]
+    np.testing.assert_allclose(
+        _numpy_engine.bondes_discount_margin(prices, dtms, coups),
+        cpp_engine.bondes_discount_margin(prices, dtms, coups),
+        atol=1e-6,
+    )
+
+
+@pytest.mark.parametrize(
+    "setup, backend",
+    [
+        # the extension failing to import falls back to NumPy
+        ("sys.modules['cpp_engine._cpp_engine'] = None", "numpy"),
+        ("os.environ['CPP_ENGINE_BACKEND'] = 'numpy'", "numpy"),
+        ("pass", "cpp"),
+    ],
+)
+def test_backend_selection(setup, backend):
+    selected = run_python(
+        f"import os, sys; {setup}; import cpp_engine; "
+        "print(cpp_engine.BACKEND, cpp_engine.price_to_yield([101.5], [1000], [8.5]))"
+    )
+    assert selected.split(" ")[0] == backend
+    assert float(selected.split("[")[1].rstrip("]")) == pytest.approx(7.8795468)
+
+
+def test_cpp_newton_iterations():
+    pxs, dtms, coups = generate_bonds(2000)
+    _, iterations = cpp_engine.price_to_yield_iterations(pxs, dtms, coups)
+    assert max(iterations) < 50
+
+
+@pytest.fixture
+def restore_kernel_variant():
+    active = cpp_engine.kernel_variant()
+    yield
+    cpp_engine.set_kernel_variant(active)
+
+
+def test_kernel_variants_agree(restore_kernel_variant):
+    pxs, dtms, coups = generate_bonds(2000, seed=3)
+    variants = cpp_engine.kernel_variants()
+    assert cpp_engine.kernel_variant() in variants
+
+    results = {}
+    for variant in variants:
+        cpp_engine.set_kernel_variant(variant)
+        assert cpp_engine.kernel_variant() == variant
+        results[variant] = (
+            cpp_engine.price_to_yield(pxs, dtms, coups),
+            cpp_engine.bondes_discount_margin(pxs, dtms, coups),
+        )
+
+    for yields, margins in results.values():
+        np.testing.assert_allclose(yields, results[variants[0]][0], rtol=0, atol=1e-9)
+        np.testing.assert_allclose(margins, results[variants[0]][1], rtol=0, atol=1e-6)
+
+    with pytest.raises(ValueError):
+        cpp_engine.set_kernel_variant("sse9")
+
+
+@pytest.mark.parametrize(
+    "setup, variant",
+    [
+        ("os.environ['CPP_ENGINE_KERNEL'] = 'baseline'", "baseline"),
+        ("os.environ['CPP_ENGINE_BACKEND'] = 'numpy'", "numpy"),
+        # a variant the backend cannot run is ignored
+        (
+            "os.environ.update(CPP_ENGINE_BACKEND='numpy', CPP_ENGINE_KERNEL='avx2')",
+            "numpy",
+        ),
+        ("os.environ['CPP_ENGINE_KERNEL'] = 'sse9'", None),
+    ],
+)
+def test_kernel_variant_selection(setup, variant):
+    selected = run_python(
+        f"import os; {setup}; import cpp_engine; print(cpp_engine.kernel_variant())"
+    )
+
+    # None for the best variant of this CPU, the one picked by default
+    assert selected == (variant or cpp_engine.kernel_variants()[-1])
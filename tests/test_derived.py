@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from src import FIdash
+from src import app as app_module
+from src.derived import DerivedSeries, DerivedSeriesEngine
+from src.history import HistoryStore, HistoryStoreCache
+from tests.banxico_stub import BanxicoStubServer
+from tests.test_history import recorded_store
+
+
+def test_matches_live_pipeline(monkeypatch):
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        curve_labels, _, curve_yields, _, summary_data = (
+            FIdash.BanxicoDataFetcher().get_data()
+        )
+
+    yields = dict(zip(curve_labels, curve_yields))
+    engine = DerivedSeriesEngine().update(recorded_store())
+    _, values = engine.series()
+
+    # the latest row carries every series forward to the last publication
+    expected = {
+        "2s10s": 100 * (yields["10 Years"] - yields["2 Years"]),
+        "10s30s": 100 * (yields["30 Years"] - yields["10 Years"]),
+        "2s5s10s": 100
+        * (2 * yields["5 Years"] - yields["2 Years"] - yields["10 Years"]),
+        "TIIE28-Target": 100
+        * (
+            float(summary_data["TIIE28"]["value"])
+            - float(summary_data["TargetRate"]["value"])
+        ),
+        "Real10Y": yields["10 Years"] - float(summary_data["Inflation"]["value"]),
+    }
+    for name, value in expected.items():
+        assert values[name][-1] == pytest.approx(value, abs=1e-4)
+
+
+def test_missing_leg_only_affects_its_series(copy_of):
+    engine = DerivedSeriesEngine(
+        [
+            DerivedSeries("a", "", "bp", {"TIIE28": 100.0, "TargetRate": -100.0}),
+            DerivedSeries("b", "", "%", {"TargetRate": 1.0, "USD_MXN": 0.0}),
+        ]
+    )
+    store = recorded_store()
+    store.values[:, store.columns["SF43783"]] = np.nan
+
+    _, values = engine.update(copy_of(store)).series()
+
+    assert np.isnan(values["a"]).all()
+    assert not np.isnan(values["b"]).all()
+
+    with pytest.raises(ValueError):
+        DerivedSeriesEngine([DerivedSeries("c", "", "bp", {"7 Years": 1.0})])
+    with pytest.raises(ValueError):
+        engine.series(["2s10s"])
+
+
+def test_appended_day_is_computed_alone(stub_history, copy_of, first_days):
+    history, new_days = stub_history
+    store = copy_of(history)
+
+    engine = DerivedSeriesEngine().update(store)
+    assert engine.rows_computed == len(history)
+
+    # unchanged store, nothing to do
+    engine.update(store)
+    assert engine.rows_computed == len(history)
+
+    store.merge(first_days(new_days, 1))
+    engine.update(store)
+    assert engine.rows_computed == len(history) + 1
+
+    fresh = DerivedSeriesEngine().update(copy_of(store))
+    np.testing.assert_array_equal(engine.dates, fresh.dates)
+    np.testing.assert_allclose(engine.values, fresh.values, equal_nan=True)
+
+
+def test_revised_observation_recomputes_from_its_row(stub_history, copy_of):
+    history, _ = stub_history
+    engine = DerivedSeriesEngine().update(copy_of(history))
+
+    revised = copy_of(history)
+    column = revised.columns["SF61745"]
+    row = int(np.flatnonzero(~np.isnan(revised.values[:, column]))[-10])
+    revised.values[row, column] += 0.25
+    revised = HistoryStore(revised.dates, revised.series_ids, revised.values)
+
+    before = engine.rows_computed
+    engine.update(revised)
+
+    assert engine.rows_computed - before == len(history) - row
+    fresh = DerivedSeriesEngine().update(revised)
+    np.testing.assert_allclose(engine.values, fresh.values, equal_nan=True)
+
+
+def test_api_derived(monkeypatch, tmp_path):
+    path = str(tmp_path / "history.npz")
+    monkeypatch.setattr(app_module, "history_cache", HistoryStoreCache(path))
+    monkeypatch.setattr(app_module, "derived_engine", None)
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        # no store yet
+        assert client.get("/api/derived").status_code == 503
+
+        recorded_store().save(path)
+        response = client.get("/api/derived?series=2s10s,Real10Y&start=2025-10-27")
+
+        assert response.status_code == 200
+        assert response.json["dates"][0] == "2025-10-27"
+        assert list(response.json["series"]) == ["2s10s", "Real10Y"]
+        assert response.json["series"]["2s10s"]["units"] == "bp"
+        assert len(response.json["series"]["Real10Y"]["values"]) == len(
+            response.json["dates"]
+        )
+
+        assert client.get("/api/derived?series=7s").status_code == 400
+        assert client.get("/api/derived?start=yesterday").status_code == 400
+
+
+def test_api_derived_reads_engine_under_lock(monkeypatch, tmp_path):
+    path = str(tmp_path / "history.npz")
+    recorded_store().save(path)
+    monkeypatch.setattr(app_module, "history_cache", HistoryStoreCache(path))
+    monkeypatch.setattr(app_module, "derived_engine", None)
+
+    # the dates and values handed to the response come from one update
+    locked = []
+    series = DerivedSeriesEngine.series
+
+    def recording_series(engine, *args, **kwargs):
+        locked.append(app_module.derived_lock.locked())
+        return series(engine, *args, **kwargs)
+
+    monkeypatch.setattr(DerivedSeriesEngine, "series", recording_series)
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        assert client.get("/api/derived?start=2025-10-27&width=400").status_code == 200
+
+    assert locked == [True]
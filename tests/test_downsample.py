@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from src import app as app_module
+from src.downsample import DownsampleCache, chart_points, downsample_rows, lttb
+from src.history import HistoryStoreCache
+
+
+def test_lttb_keeps_ends_and_extremes():
+    y = np.sin(np.linspace(0, 20, 5000))
+    y[2500] = 5.0
+
+    rows = lttb(y, 200)
+
+    assert len(rows) == 200
+    assert rows[0] == 0 and rows[-1] == 4999
+    assert (np.diff(rows) > 0).all()
+    assert 2500 in rows
+
+
+def test_lttb_skips_missing_values():
+    y = np.arange(100, dtype=float)
+    y[:10] = np.nan
+    y[-5:] = np.nan
+
+    rows = lttb(y, 20)
+    assert len(rows) == 20
+    assert rows[0] == 10 and rows[-1] == 94
+
+    # short series are sent whole
+    np.testing.assert_array_equal(lttb(y, 500), np.arange(10, 95))
+
+
+def test_rows_shared_by_every_series():
+    x = np.linspace(0, 10, 1000)
+    rows = downsample_rows([np.sin(x), np.cos(3 * x)], 50)
+
+    assert 50 <= len(rows) <= 100
+    np.testing.assert_array_equal(rows, np.unique(rows))
+
+
+@pytest.mark.parametrize("width, points", [(None, None), ("800", 800), ("9999", 4000)])
+def test_chart_points(width, points):
+    assert chart_points(width) == points
+
+    with pytest.raises(ValueError):
+        chart_points("wide")
+    with pytest.raises(ValueError):
+        chart_points("2")
+
+
+def test_cache_recomputes_for_new_source():
+    cache = DownsampleCache(maxsize=1)
+    source = np.sin(np.linspace(0, 10, 1000))
+
+    rows = cache.rows("a", source, [source], 50)
+    assert cache.rows("a", source, [None], 50) is rows
+
+    # new history replaces the source array
+    revised = source.copy()
+    assert cache.rows("a", revised, [revised], 50) is not rows
+
+    cache.rows("b", source, [source], 50)
+    assert len(cache) == 1
+
+
+def test_api_payload_is_bounded_by_width(monkeypatch, tmp_path, stub_history):
+    path = str(tmp_path / "history.npz")
+    stub_history[0].save(path)
+    monkeypatch.setattr(app_module, "history_cache", HistoryStoreCache(path))
+    monkeypatch.setattr(app_module, "rolling_analytics", None)
+    monkeypatch.setattr(app_module, "derived_engine", None)
+    monkeypatch.setattr(app_module, "downsample_cache", DownsampleCache())
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        full = client.get("/api/rolling?series=10 Years&window=1M&start=1Y").json
+        body = client.get("/api/rolling?series=10 Years&window=1M&start=1Y&width=50")
+        body = body.json
+
+        assert len(full["dates"]) > 200
+        assert len(body["dates"]) == len(body["yields"]) == len(body["mean"]) == 50
+        assert body["dates"][-1] == full["dates"][-1]
+        assert body["zscore"][-1] == full["zscore"][-1]
+        assert set(body["dates"]) <= set(full["dates"])
+
+        derived = client.get("/api/derived?series=2s10s,Real10Y&width=40").json
+        assert 40 <= len(derived["dates"]) <= 80
+        assert len(derived["series"]["2s10s"]["values"]) == len(derived["dates"])
+        assert len(app_module.downsample_cache) == 2
+
+        assert client.get("/api/derived?width=narrow").status_code == 400
@@ -4,6 +4,7 @@ import requests
 # Import the main Flask app instance and the real DataFetcher class
 from src.app import app
 from src.FIdash import BanxicoDataFetcher
+from src.resilience import CircuitOpenError
 
 # ----------------------------------------------
 # Mock classes for simulating failure conditions
@@ -13,6 +14,23 @@ from src.FIdash import BanxicoDataFetcher
 class MockSuccessFetcher(BanxicoDataFetcher):
     """Mocks a successful data fetch."""
 
+    # solved off-curve groups of the same snapshot
+    off_curve = {
+        "udibonos": {
+            "type": "real_coupon",
+            "labels": ["3 Years", "10 Years", "30 Years"],
+            "dtms": [1127, 3318, 10528],
+            "values": [4.401234, 4.512345, -1.0],
+            "breakeven": [3.012345, 3.123456, None],
+        },
+        "bondes_f": {
+            "type": "floating",
+            "labels": ["1 Years", "3 Years", "5 Years"],
+            "dtms": [350, 1078, 1806],
+            "values": [5.1, 11.7, None],
+        },
+    }
+
     def __init__(self):
         pass
 
@@ -96,6 +114,16 @@ class MockHTTPErrorFetcher:
         raise http_error
 
 
+class MockCircuitOpenFetcher:
+    """Mocks an open circuit breaker to test the fail fast 503 handling."""
+
+    def __init__(self):
+        pass
+
+    def get_data(self):
+        raise CircuitOpenError("Mocked open circuit.")
+
+
 class MockGenericErrorFetcher:
     """Mocks an unexpected error (like a parsing error) to test the 500 handling."""
 
@@ -132,6 +160,7 @@ def client_ready(monkeypatch):
     params=[
         (MockConnectionErrorFetcher, 504, b"Connection failed"),
         (MockHTTPErrorFetcher, 503, b"Service Unavailable"),
+        (MockCircuitOpenFetcher, 503, b"temporarily unavailable"),
         (MockGenericErrorFetcher, 500, b"An unexpected error occurred."),
     ]
 )
@@ -179,6 +208,11 @@ def test_fi_dashboard_successful_data_fetch(client_ready):
     # Check for content that proves the data was processed
     assert b"7.345685" in response.data
 
+    # off-curve groups are charted alongside the nominal curve
+    assert b"offCurveChart-udibonos" in response.data
+    assert b"offCurveChart-bondes_f" in response.data
+    assert b"3.012345" in response.data
+
 
 # --- Critical Startup Failure Test ---
 def test_fi_dashboard_critical_init_failure(client_failing_init):
@@ -197,8 +231,9 @@ def test_fi_dashboard_critical_init_failure(client_failing_init):
 
 def test_fi_dashboard_route_errors(client_failing_route):
     """
-    Tests the try/except blocks for Connection, HTTP, and Generic errors.
-    This fixture is run three times due to the 'params' defined above.
+    Tests the try/except blocks for Connection, HTTP, circuit breaker and Generic
+    errors.
+    This fixture is run four times due to the 'params' defined above.
     """
     client, expected_code, expected_msg = client_failing_route
 
@@ -0,0 +1,97 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+
+from src import FIdash
+from src import app as app_module
+from src.export import csv_stream
+from src.history import HistoryStoreCache
+from tests.test_history import recorded_store
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path, stub_history):
+    path = str(tmp_path / "history.npz")
+    stub_history[0].save(path)
+    monkeypatch.setattr(app_module, "history_cache", HistoryStoreCache(path))
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        yield client
+
+
+def test_curve_csv_matches_curves():
+    store = recorded_store()
+    curve = store.curves([store.latest])[0]
+
+    # the later dates only carry summary series, so no curve is exported for them
+    start = np.datetime64(curve["date"])
+    rows = list(
+        csv.DictReader(
+            io.StringIO("".join(csv_stream("curves", store, start, store.latest)))
+        )
+    )
+
+    expected = {
+        label: y for label, y in zip(curve["labels"], curve["yields"]) if y is not None
+    }
+    assert {r["tenor"]: float(r["yield"]) for r in rows} == pytest.approx(expected)
+    assert {r["date"] for r in rows} == {curve["date"]}
+
+
+def test_curve_export_skips_dates_without_quotes(stub_history):
+    store = stub_history[0]
+
+    # the UDI is published on weekends too
+    assert np.isin(np.datetime64("2024-12-07"), store.dates)
+
+    start, end = np.datetime64("2024-12-06"), np.datetime64("2024-12-09")
+    body = "".join(csv_stream("curves", store, start, end))
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert {r["date"] for r in rows} == {"2024-12-06", "2024-12-09"}
+
+
+def test_export_streams_in_chunks(client, stub_history, monkeypatch):
+    monkeypatch.setattr("src.export.EXPORT_CHUNK_ROWS", 50)
+
+    response = client.get("/api/export?data=curves&start=2024-01-01")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert "attachment" in response.headers["Content-Disposition"]
+
+    pieces = list(response.response)
+    assert pieces[0] == b"date,tenor,dtm,yield\n"
+
+    # header, then one piece per 50 stored dates
+    assert len(pieces) == 1 + -(-len(stub_history[0]) // 50)
+    rows = list(csv.DictReader(io.StringIO(b"".join(pieces).decode())))
+    assert rows[0]["date"] == "2024-01-01"
+    assert {r["tenor"] for r in rows} >= {"28 Days", "30 Years"}
+
+
+def test_summary_export(client):
+    body = client.get("/api/export?data=summary&start=2024-12-01").data.decode()
+    rows = list(csv.DictReader(io.StringIO(body)))
+
+    assert rows
+    assert {r["series"] for r in rows} <= set(
+        FIdash.BanxicoDataFetcher.SUMMARY_MAP.values()
+    )
+    assert min(r["date"] for r in rows) >= "2024-12-01"
+
+    assert client.get("/api/export?data=prices").status_code == 400
+    assert client.get("/api/export?format=xlsx").status_code == 400
+    assert client.get("/api/export?start=someday").status_code == 400
+
+
+def test_parquet_export(client):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    response = client.get("/api/export?data=curves&format=parquet&start=2024-12-01")
+    table = pq.read_table(io.BytesIO(response.data))
+
+    assert table.column_names == ["date", "tenor", "dtm", "yield"]
+    assert not np.isnan(table.column("yield").to_numpy()).any()
+    assert str(table.column("date")[0]) == "2024-12-02"
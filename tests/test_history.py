@@ -0,0 +1,211 @@
+import os
+
+import numpy as np
+import pytest
+
+import cpp_engine
+from src import FIdash
+from src import app as app_module
+from src import history
+from src.banxico_stream import BanxicoStreamParser, SeriesData
+from src.history import HistoryStore, HistoryStoreCache, resolve_date
+from src.yield_memo import YieldMemo
+from tests.banxico_stub import FIXTURES_DIR, BanxicoStubServer
+
+
+def recorded_store():
+
+    # one day of every series, from the recorded oportuno responses
+    parser = BanxicoStreamParser()
+    with open(os.path.join(FIXTURES_DIR, "oportuno.json"), "rb") as f:
+        parser.feed(f.read())
+    return HistoryStore().merge(parser.close())
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("latest", "2025-10-27"),
+        ("1D", "2025-10-26"),
+        ("1W", "2025-10-20"),
+        ("1M", "2025-09-27"),
+        ("1Y", "2024-10-27"),
+        ("2024-02-29", "2024-02-29"),
+    ],
+)
+def test_resolve_date(spec, expected):
+    assert resolve_date(spec, "2025-10-27") == np.datetime64(expected)
+
+
+def test_resolve_date_clamps_month_end():
+    assert resolve_date("1M", "2025-03-31") == np.datetime64("2025-02-28")
+    assert resolve_date("1Y", "2024-02-29") == np.datetime64("2023-02-28")
+
+    with pytest.raises(ValueError):
+        resolve_date("yesterday", "2025-10-27")
+
+
+def test_merge_and_asof():
+    store = HistoryStore().merge(
+        {
+            "A": SeriesData(
+                np.array(["2025-01-01", "2025-01-03"], dtype="datetime64[D]"),
+                np.array([1.0, 3.0]),
+            )
+        }
+    )
+    store.merge(
+        {
+            "A": SeriesData(
+                np.array(["2025-01-03"], dtype="datetime64[D]"), np.array([np.nan])
+            ),
+            "B": SeriesData(
+                np.array(["2025-01-02", "2025-01-03"], dtype="datetime64[D]"),
+                np.array([20.0, 30.0]),
+            ),
+        }
+    )
+
+    assert store.series_ids == ["A", "B"]
+    assert len(store) == 3
+
+    # missing observations never overwrite stored ones
+    dates = np.array(
+        ["2024-12-31", "2025-01-01", "2025-01-02", "2025-01-10"], dtype="datetime64[D]"
+    )
+    np.testing.assert_array_equal(
+        store.asof(dates, ["A", "B", "C"]),
+        [
+            [np.nan, np.nan, np.nan],
+            [1.0, np.nan, np.nan],
+            [1.0, 20.0, np.nan],
+            [3.0, 30.0, np.nan],
+        ],
+    )
+
+
+def test_save_and_reload(tmp_path):
+    path = str(tmp_path / "history.npz")
+    store = recorded_store()
+    store.save(path)
+
+    cache = HistoryStoreCache(path)
+    loaded = cache.get()
+
+    assert loaded.series_ids == store.series_ids
+    np.testing.assert_array_equal(loaded.dates, store.dates)
+    np.testing.assert_array_equal(loaded.values, store.values)
+
+    # unchanged file, same object
+    assert cache.get() is loaded
+    assert HistoryStoreCache(str(tmp_path / "missing.npz")).get() is None
+
+
+def test_curves_match_live_pipeline(monkeypatch):
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        curve_labels, _, curve_yields, curve_dtms, _ = (
+            FIdash.BanxicoDataFetcher().get_data()
+        )
+
+    (curve,) = recorded_store().curves([np.datetime64("2025-10-27")])
+
+    assert curve["date"] == "2025-10-27"
+    assert curve["labels"] == curve_labels
+    assert curve["dtms"] == curve_dtms
+    np.testing.assert_allclose(curve["yields"], curve_yields, atol=1e-6)
+
+
+def test_curves_solved_in_one_batch(monkeypatch):
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        store = HistoryStore().fetch(
+            FIdash.BanxicoDataFetcher(), "2024-01-01", "2024-12-31"
+        )
+
+    assert len(store) == 366
+    assert len(store.series_ids) == len(history.history_series_ids())
+
+    calls = []
+    price_to_yield_iterations = cpp_engine.price_to_yield_iterations
+
+    def counting_price_to_yield(*args):
+        calls.append(len(args[0]))
+        return price_to_yield_iterations(*args)
+
+    monkeypatch.setattr(history, "yield_memo", YieldMemo())
+    monkeypatch.setattr(
+        cpp_engine, "price_to_yield_iterations", counting_price_to_yield
+    )
+
+    dates = [resolve_date(x, store.latest) for x in ("latest", "1W", "1M", "3M")]
+    curves = store.curves(dates + [np.datetime64("2000-01-01")])
+
+    # distinct bonds of the four dates, solved once
+    assert len(calls) == 1 and 5 <= calls[0] <= 4 * 5
+
+    # a repeated query is served from the memo
+    assert store.curves(dates) == curves[:4]
+    assert len(calls) == 1
+    assert [c["date"] for c in curves[:2]] == ["2024-12-31", "2024-12-24"]
+    assert all(y is not None for c in curves[:4] for y in c["yields"])
+
+    # before the first stored date
+    assert curves[-1]["date"] is None
+    assert curves[-1]["yields"] == [None] * 10
+
+
+def test_api_curves(monkeypatch, tmp_path):
+    path = str(tmp_path / "history.npz")
+    monkeypatch.setattr(app_module, "history_cache", HistoryStoreCache(path))
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        # no store yet
+        assert client.get("/api/curves").status_code == 503
+
+        recorded_store().save(path)
+        response = client.get("/api/curves?dates=latest,2025-10-01")
+
+        assert response.status_code == 200
+        # UDI values are published ahead of the curve
+        assert response.json["latest"] == "2025-11-10"
+        assert [c["requested"] for c in response.json["curves"]] == [
+            "2025-11-10",
+            "2025-10-01",
+        ]
+        assert response.json["curves"][0]["date"] == "2025-10-27"
+        assert response.json["curves"][1]["date"] is None
+
+        assert client.get("/api/curves?dates=yesterday").status_code == 400
+        assert client.get("/api/curves?dates=" + ",".join(["1D"] * 65)).status_code == (
+            400
+        )
+
+
+def test_merge_tail_matches_full_rebuild():
+    dates = np.arange("2025-01-01", "2025-01-11", dtype="datetime64[D]")
+    a = np.array([1.0, np.nan, 3.0, np.nan, np.nan, 6.0, np.nan, 8.0, np.nan, np.nan])
+    b = np.array(
+        [np.nan, 20.0, np.nan, np.nan, 50.0, np.nan, np.nan, np.nan, 90.0, 0.0]
+    )
+
+    def chunk(lo, hi):
+        return {
+            "A": SeriesData(dates[lo:hi], a[lo:hi]),
+            "B": SeriesData(dates[lo:hi], b[lo:hi]),
+        }
+
+    full = HistoryStore().merge(chunk(0, 10))
+
+    # daily appends, revisiting the last stored day as chunked fetches do
+    store = HistoryStore().merge(chunk(0, 4))
+    store.merge(chunk(3, 7)).merge(chunk(6, 8)).merge(
+        {"B": SeriesData(dates[7:10], b[7:10])}
+    )
+    store.merge({"A": SeriesData(dates[8:10], a[8:10])})
+
+    np.testing.assert_array_equal(store.dates, full.dates)
+    np.testing.assert_array_equal(store.values, full.values)
+    np.testing.assert_array_equal(store.filled, full.filled)
+    np.testing.assert_array_equal(store.observed, full.observed)
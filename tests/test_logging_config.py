@@ -0,0 +1,114 @@
+import io
+import json
+import logging
+import os
+
+import pytest
+
+from src import logging_config
+
+
+@pytest.fixture
+def isolated_root():
+    """
+    Runs a test without the app's logging handler on the root logger,
+    restoring the previous configuration afterwards.
+    """
+    root = logging.getLogger()
+    saved = (root.handlers[:], root.level, logging_config.installed_handler)
+    root.handlers = []
+    logging_config.installed_handler = None
+
+    yield root
+
+    if logging_config.active_async_logging is not None:
+        logging_config.active_async_logging.stop()
+        logging_config.active_async_logging = None
+    root.handlers, level, logging_config.installed_handler = saved
+    root.setLevel(level)
+
+
+def test_json_format(isolated_root):
+    stream = io.StringIO()
+    logging_config.configure_logging("INFO", "json", False, stream)
+    logger = logging.getLogger("src.test")
+
+    logger.debug("filtered out")
+    logger.info("Fetched %s series.", 31, extra={"endpoint": "cetes_yld"})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed.")
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    assert len(lines) == 2
+    assert lines[0]["level"] == "INFO"
+    assert lines[0]["logger"] == "src.test"
+    assert lines[0]["message"] == "Fetched 31 series."
+    assert lines[0]["endpoint"] == "cetes_yld"
+    assert lines[0]["time"].endswith("Z")
+    assert "ValueError: boom" in lines[1]["exc_info"]
+
+
+def test_async_logging(isolated_root):
+    stream = io.StringIO()
+    async_logging = logging_config.configure_logging("DEBUG", "json", True, stream)
+    logger = logging.getLogger("src.test")
+
+    # arguments are merged at the call, even if they change before the write
+    values = [1]
+    logger.debug("Values: %s", values)
+    values.append(2)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed.")
+
+    # stopping the listener flushes the queue
+    async_logging.stop()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    assert logging_config.installed_handler is async_logging.queue_handler
+    assert async_logging.queue_handler in isolated_root.handlers
+    assert [x["message"] for x in lines[-2:]] == ["Values: [1]", "Failed."]
+    assert "ValueError: boom" in lines[-1]["exc_info"]
+
+
+def test_configuration_from_env(isolated_root, monkeypatch):
+    monkeypatch.setenv("LOG_LEVEL", "warning")
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    monkeypatch.setenv("LOG_ASYNC", "0")
+
+    assert logging_config.configure_logging(stream=io.StringIO()) is None
+    assert isolated_root.level == logging.WARNING
+    assert isinstance(
+        logging_config.installed_handler.formatter, logging_config.JsonFormatter
+    )
+
+    # reconfiguring replaces the handler instead of adding another one
+    previous = logging_config.installed_handler
+    logging_config.configure_logging(stream=io.StringIO())
+    assert previous not in isolated_root.handlers
+    assert logging_config.installed_handler in isolated_root.handlers
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_async_logging_after_fork(isolated_root, tmp_path):
+    path = tmp_path / "app.log"
+
+    with open(path, "w", encoding="utf-8") as stream:
+        async_logging = logging_config.configure_logging("INFO", "json", True, stream)
+
+        pid = os.fork()
+        if pid == 0:
+            # the child gets its own listener thread
+            logging.getLogger("src.test").info("From the child.")
+            async_logging.stop()
+            os._exit(0)
+
+        os.waitpid(pid, 0)
+        async_logging.stop()
+
+    messages = [json.loads(line)["message"] for line in path.read_text().splitlines()]
+    assert "From the child." in messages
@@ -0,0 +1,136 @@
+import pytest
+
+from src import FIdash
+from src.app import app
+from src.metrics import (
+    CONNECTION_POOL,
+    CONNECTION_REUSE_RATIO,
+    NEWTON_ITERATIONS,
+    SNAPSHOT_LOOKUPS,
+    STAGE_SECONDS,
+    UPSTREAM_SECONDS,
+    MetricsRegistry,
+)
+from tests.banxico_stub import BanxicoStubServer
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        "test_seconds", "Test histogram.", ["stage"], buckets=(0.1, 1.0)
+    )
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, stage="a")
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == [
+        "# HELP test_seconds Test histogram.",
+        "# TYPE test_seconds histogram",
+    ]
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{stage="a"} 2.65' in lines
+    assert 'test_seconds_count{stage="a"} 4' in lines
+
+
+def test_counter_and_label_escaping():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test counter.", ["path"])
+
+    counter.inc(path='a"b')
+    counter.inc(2, path='a"b')
+
+    assert 'test_total{path="a\\"b"} 3' in registry.render().splitlines()
+    assert counter.value(path='a"b') == 3
+
+    with pytest.raises(ValueError):
+        registry.counter("test_total", "Duplicate.")
+
+
+def test_histogram_timer():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test histogram.")
+
+    with pytest.raises(RuntimeError):
+        with histogram.time():
+            raise RuntimeError
+
+    # failures are timed too
+    assert histogram.count() == 1
+
+
+def test_pipeline_is_instrumented(monkeypatch):
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        monkeypatch.setenv("BANXICO_SNAPSHOT_TTL", "60")
+        test_object = FIdash.BanxicoDataFetcher()
+
+        upstream_before = UPSTREAM_SECONDS.count(endpoint="oportuno", status=200)
+        stage_before = STAGE_SECONDS.count(stage="price_to_yield")
+        newton_before = NEWTON_ITERATIONS.count()
+        hits_before = SNAPSHOT_LOOKUPS.value(result="hit")
+
+        test_object.get_data()
+        test_object.get_data()
+
+    assert UPSTREAM_SECONDS.count(endpoint="oportuno", status=200) == (
+        upstream_before + len(test_object.api_urls_oportuno)
+    )
+    assert STAGE_SECONDS.count(stage="price_to_yield") == stage_before + 1
+    assert NEWTON_ITERATIONS.count() == newton_before + 5
+    assert SNAPSHOT_LOOKUPS.value(result="hit") == hits_before + 1
+
+
+def test_gauge_is_overwritten():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("test_ratio", "Test gauge.", ["stat"])
+
+    gauge.set(3, stat="a")
+    gauge.set(0.5, stat="a")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_ratio gauge" in lines
+    assert 'test_ratio{stat="a"} 0.5' in lines
+
+
+def test_connection_pool_is_exported(monkeypatch):
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        test_object = FIdash.BanxicoDataFetcher()
+
+        test_object.call_api()
+        test_object.call_api()
+
+    # pool totals as of the last fetch, every request after the first on a
+    # kept-alive connection
+    stats = test_object.adapter.connection_stats()
+    assert stats["requests"] == 2 * len(test_object.api_urls_oportuno)
+    for stat in ("hosts", "requests", "connections", "reused"):
+        assert CONNECTION_POOL.value(stat=stat) == stats[stat]
+    assert CONNECTION_REUSE_RATIO.value() == stats["reuse_ratio"] > 0
+
+
+def test_metrics_endpoint(monkeypatch):
+    with BanxicoStubServer() as stub:
+        monkeypatch.setenv("BANXICO_API_URL", stub.url)
+        monkeypatch.setattr("src.app.banxico_data_fetcher", FIdash.BanxicoDataFetcher())
+
+        app.testing = True
+        with app.test_client() as client:
+            assert client.get("/fi_dashboard").status_code == 200
+            response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+
+    body = response.get_data(as_text=True)
+    assert "# TYPE banxico_upstream_request_seconds histogram" in body
+    assert 'banxico_pipeline_stage_seconds_count{stage="call_api"}' in body
+    assert 'banxico_connection_pool{stat="requests"}' in body
+    assert "banxico_connection_reuse_ratio " in body
+    assert "price_to_yield_newton_iterations_bucket" in body
+    assert 'flask_template_render_seconds_count{template="dashboard.html"}' in body
+    assert 'flask_request_seconds_count{endpoint="fi_dashboard",status="200"}' in body
@@ -0,0 +1,140 @@
+import cProfile
+import os
+import pstats
+
+import pytest
+from flask import Flask
+
+import cpp_engine
+from src.profiling import RequestProfiler, collapsed_stacks
+
+
+def solve(n):
+    return cpp_engine.price_to_yield([102.643974] * n, [874] * n, [8.5] * n)
+
+
+def outer():
+    solve(50)
+    return inner()
+
+
+def inner():
+    return sum(i * i for i in range(20000))
+
+
+def test_collapsed_stacks():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    outer()
+    profiler.disable()
+
+    lines = collapsed_stacks(pstats.Stats(profiler))
+    stacks = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+
+    # C++ engine time is attributed below its Python caller
+    assert any(
+        stack.endswith(
+            "(solve);<built-in method cpp_engine._cpp_engine.price_to_yield>"
+        )
+        for stack in stacks
+    )
+    assert any("(outer);" in stack and "(inner)" in stack for stack in stacks)
+    assert all(weight > 0 for weight in stacks.values())
+
+
+def test_collapsed_stacks_bounded_by_edges():
+
+    # 40 layers of two functions each calling both of the next layer: 2**40
+    # call paths, but only 4 edges per layer
+    class Stats:
+        stats = {}
+
+    layers = [[("m.py", 2 * i + j, f"f{i}_{j}") for j in range(2)] for i in range(40)]
+    for i, layer in enumerate(layers):
+        for func in layer:
+            callers = {c: (1, 1, 1e-3, 1e-3) for c in layers[i - 1]} if i else {}
+            Stats.stats[func] = (2, 2, 2e-3, 2e-3, callers)
+
+    lines = collapsed_stacks(Stats)
+
+    assert len(lines) == 2 + 4 * 39
+    assert (
+        sum(int(line.rsplit(" ", 1)[1]) for line in lines) == 2 * 2000 + 4 * 39 * 1000
+    )
+
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    app = Flask(__name__)
+
+    @app.route("/solve")
+    def solve_route():
+        return {"yields": solve(100)}
+
+    profiler = RequestProfiler(app, output_dir=str(tmp_path), token="secret")
+    app.testing = True
+    with app.test_client() as client:
+        yield client, profiler, tmp_path
+
+
+def test_profiles_requests_with_header(profiled_app):
+    client, profiler, tmp_path = profiled_app
+
+    # not profiled without the header, or with the wrong token
+    assert "X-Profile-Id" not in client.get("/solve").headers
+    assert (
+        "X-Profile-Id"
+        not in client.get("/solve", headers={"X-Profile": "wrong"}).headers
+    )
+    assert profiler.profiled == 0
+
+    response = client.get("/solve", headers={"X-Profile": "secret"})
+    profile_id = response.headers["X-Profile-Id"]
+
+    # only the profile's name goes back, the server's path stays private
+    assert response.status_code == 200
+    assert "X-Profile-Output" not in response.headers
+    assert os.sep not in profile_id and str(tmp_path) not in profile_id
+    assert profiler.profiled == 1
+
+    path = os.path.join(tmp_path, profile_id)
+    stats = pstats.Stats(path + ".prof")
+    assert any("price_to_yield" in func[2] for func in stats.stats)
+
+    with open(path + ".collapsed", encoding="utf-8") as f:
+        assert "price_to_yield" in f.read()
+
+
+def test_header_needs_a_token(tmp_path):
+    app = Flask(__name__)
+    app.route("/solve")(lambda: {"yields": solve(10)})
+    profiler = RequestProfiler(app, output_dir=str(tmp_path))
+
+    # without a configured token the header is ignored, whatever its value
+    app.testing = True
+    with app.test_client() as client:
+        for value in ("", "1", "secret"):
+            response = client.get("/solve", headers={"X-Profile": value})
+            assert "X-Profile-Id" not in response.headers
+
+    assert profiler.profiled == 0
+    assert not os.listdir(tmp_path)
+
+
+def test_sampled_profiling(profiled_app):
+    client, profiler, _ = profiled_app
+
+    profiler.sample_rate = 1.0
+    assert "X-Profile-Id" in client.get("/solve").headers
+
+    profiler.sample_rate = 0.0
+    assert "X-Profile-Id" not in client.get("/solve").headers
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("PROFILE_ENABLED", raising=False)
+    app = Flask(__name__)
+
+    assert RequestProfiler.from_env(app) is None
+    assert not app.before_request_funcs
+    assert not app.teardown_request_funcs
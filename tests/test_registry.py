@@ -0,0 +1,341 @@
+import json
+
+import pytest
+
+import cpp_engine
+from src import FIdash
+from src.registry import DEFAULT_INSTRUMENTS_PATH, InstrumentRegistry, tenor_days
+
+
+def registry_config(n_mbonos):
+
+    # the recorded Cetes plus n synthetic Mbono issues
+    with open(DEFAULT_INSTRUMENTS_PATH, encoding="utf-8") as f:
+        default = json.load(f)
+
+    mbonos = [
+        {
+            "tenor": f"{i + 1} Years",
+            "px": f"PX{i:04d}",
+            "dtm": f"DTM{i:04d}",
+            "coup": f"CP{i:04d}",
+        }
+        for i in reversed(range(n_mbonos))
+    ]
+    return {
+        "groups": [
+            default["groups"][0],
+            {"name": "mbonos", "type": "fixed_coupon", "instruments": mbonos},
+        ],
+        "summary": default["summary"],
+    }
+
+
+def off_curve_groups(udibono_units="udis"):
+
+    # synthetic Udibonos and Bondes F, kept off the nominal curve
+    return [
+        {
+            "name": "udibonos",
+            "type": "real_coupon",
+            "curve": False,
+            "units": udibono_units,
+            "instruments": [
+                {
+                    "tenor": f"{n} Years",
+                    "px": f"UPX{n}",
+                    "dtm": f"UDTM{n}",
+                    "coup": f"UCP{n}",
+                }
+                for n in (3, 10, 30)
+            ],
+        },
+        {
+            "name": "bondes_f",
+            "type": "floating",
+            "curve": False,
+            "instruments": [
+                {
+                    "tenor": f"{n} Years",
+                    "px": f"FPX{n}",
+                    "dtm": f"FDTM{n}",
+                    "coup": f"FCP{n}",
+                }
+                for n in (1, 3)
+            ],
+        },
+    ]
+
+
+class FakeResponse:
+    def __init__(self, series):
+        self.status_code = 200
+        self.series = series
+
+    def json(self):
+        return {"bmx": {"series": self.series}}
+
+    def raise_for_status(self):
+        pass
+
+
+def fake_series(registry, series_id):
+
+    # a plausible latest observation for each role
+    instrument, role, _ = registry.index[series_id]
+    years = 0 if instrument is None else tenor_days(instrument.tenor) / 364
+    value = {
+        "yld": "7.25",
+        "px": "101.5",
+        "dtm": f"{int(years * 364):,}",
+        "coup": "8.5",
+        "summary": "7.5",
+    }[role]
+    return {
+        "idSerie": series_id,
+        "titulo": series_id,
+        "datos": [{"fecha": "27/10/2025", "dato": value}],
+    }
+
+
+@pytest.mark.parametrize("tenor, days", [("28 Days", 28), ("2 Years", 728)])
+def test_tenor_days(tenor, days):
+    assert tenor_days(tenor) == days
+
+    with pytest.raises(ValueError):
+        tenor_days("2Y")
+
+
+def test_default_registry_matches_class_maps():
+    registry = InstrumentRegistry.load()
+    fetcher = FIdash.BanxicoDataFetcher
+
+    assert registry.series_map("cetes", "yld") == fetcher.CETES_MATURITY_MAP_YLD
+    assert registry.series_map("mbonos", "coup") == fetcher.MBONOS_MATURITY_MAP_COUP
+    assert list(registry.series_map("mbonos", "px").values()) == [
+        "3 Years",
+        "5 Years",
+        "10 Years",
+        "20 Years",
+        "30 Years",
+    ]
+    assert registry.response_key("SF45454") == "mbonos_px"
+    assert registry.response_key("SF43783") == "summary"
+    assert len(registry.series_ids()) == 31
+
+    # Udibono and Bondes F series ids are not tracked until they are verified
+    # against the SIE catalogue
+    assert all(g.curve for g in registry.groups)
+
+
+@pytest.mark.parametrize(
+    "group, error",
+    [
+        ({"name": "x", "type": "swap", "instruments": []}, "Unknown instrument"),
+        (
+            {"name": "x", "type": "discount", "instruments": [{"tenor": "1 Years"}]},
+            "missing series",
+        ),
+        (
+            {
+                "name": "x",
+                "type": "discount",
+                "instruments": [{"tenor": "1 Years", "yld": "SF43783", "dtm": "D"}],
+            },
+            "registered twice",
+        ),
+        (
+            {
+                "name": "x",
+                "type": "discount",
+                "instruments": [
+                    {"tenor": "1 Years", "yld": "A", "dtm": "B", "issue": "X"},
+                    {"tenor": "2 Years", "yld": "C", "dtm": "D", "issue": "X"},
+                ],
+            },
+            "Issue X is registered twice",
+        ),
+    ],
+)
+def test_invalid_registry(group, error):
+    with pytest.raises(ValueError, match=error):
+        InstrumentRegistry([group], {"SF43783": "TIIE28"})
+
+
+def test_many_issues_in_one_fetch_and_one_solve(monkeypatch):
+    registry = InstrumentRegistry(**registry_config(32))
+    monkeypatch.setattr(FIdash.BanxicoDataFetcher, "REGISTRY", registry)
+    test_object = FIdash.BanxicoDataFetcher()
+
+    # 5 + 3 x 32 + 6 series, in batches of 20 ids
+    assert len(test_object.api_urls_oportuno) == 6
+
+    def fake_get(endpoint, url, **kwargs):
+        ids = url.split("/")[-3].split(",")
+        return FakeResponse([fake_series(registry, s) for s in reversed(ids)])
+
+    solves = []
+    price_to_yield_iterations = cpp_engine.price_to_yield_iterations
+
+    def counting_solver(pxs, dtms, coups):
+        solves.append(len(pxs))
+        return price_to_yield_iterations(pxs, dtms, coups)
+
+    monkeypatch.setattr(test_object, "timed_get", fake_get)
+    monkeypatch.setattr(cpp_engine, "price_to_yield_iterations", counting_solver)
+
+    curve_labels, _, curve_yields, curve_dtms, summary_data = test_object.fetch_data()
+
+    assert solves == [32]
+    assert len(curve_labels) == 5 + 32
+    assert curve_labels[5:8] == ["1 Years", "2 Years", "3 Years"]
+    assert curve_dtms[5:] == sorted(curve_dtms[5:])
+    assert -1.0 not in curve_yields
+    assert summary_data["TIIE28"]["value"] == 7.5
+
+
+def test_same_tenor_issues_ordered_by_returned_dtm(monkeypatch):
+    config = registry_config(0)
+
+    # two 10 year issues, the older one listed first, and a 5 year
+    config["groups"][1]["instruments"] = [
+        {"tenor": t, "px": f"PX{n}", "dtm": f"DTM{n}", "coup": f"CP{n}"}
+        for n, t in enumerate(["10 Years", "10 Years", "5 Years"])
+    ]
+    registry = InstrumentRegistry(**config)
+    assert [i.issue for i in registry.group("mbonos").instruments] == [
+        "PX2",
+        "PX0",
+        "PX1",
+    ]
+
+    monkeypatch.setattr(FIdash.BanxicoDataFetcher, "REGISTRY", registry)
+    test_object = FIdash.BanxicoDataFetcher()
+    returned_dtms = {"DTM0": "3,900", "DTM1": "3,500", "DTM2": "1,800"}
+
+    def fake_get(endpoint, url, **kwargs):
+        series = [fake_series(registry, s) for s in url.split("/")[-3].split(",")]
+        for x in series:
+            if x["idSerie"] in returned_dtms:
+                x["datos"][0]["dato"] = returned_dtms[x["idSerie"]]
+        return FakeResponse(series)
+
+    monkeypatch.setattr(test_object, "timed_get", fake_get)
+    curve_labels, _, _, curve_dtms, _ = test_object.fetch_data()
+
+    # both issues are kept, in order of their actual maturity
+    assert curve_labels[5:] == ["5 Years", "10 Years", "10 Years"]
+    assert curve_dtms[5:] == [1800, 3500, 3900]
+
+
+def test_incomplete_instrument_is_dropped():
+    test_object = FIdash.BanxicoDataFetcher()
+    registry = test_object.registry
+
+    pxs, dtms, coups = (
+        [fake_series(registry, s) for s in test_object.MBONOS_MATURITY_MAP_PX],
+        [fake_series(registry, s) for s in test_object.MBONOS_MATURITY_MAP_DTM],
+        [fake_series(registry, s) for s in test_object.MBONOS_MATURITY_MAP_COUP],
+    )
+    del dtms[2]
+
+    pxs, dtms, coups = test_object.reorder_data(
+        *test_object.clean_returned_data(pxs, dtms, coups)
+    )
+
+    # the 10 year bond has no days to maturity, the others stay aligned
+    assert [registry.tenor(x["idSerie"]) for x in pxs] == [
+        registry.tenor(x["idSerie"]) for x in dtms
+    ]
+    assert len(pxs) == len(coups) == 4
+
+
+def test_real_yields_and_margins_are_solved_off_curve(monkeypatch):
+    config = registry_config(5)
+    config["groups"] += off_curve_groups()
+    registry = InstrumentRegistry(**config)
+    monkeypatch.setattr(FIdash.BanxicoDataFetcher, "REGISTRY", registry)
+    test_object = FIdash.BanxicoDataFetcher()
+
+    def fake_get(endpoint, url, **kwargs):
+        ids = url.split("/")[-3].split(",")
+        return FakeResponse([fake_series(registry, s) for s in ids])
+
+    monkeypatch.setattr(test_object, "timed_get", fake_get)
+    curve_labels, _, curve_yields, curve_dtms, _ = test_object.fetch_data()
+
+    # only the nominal groups are on the curve
+    assert len(curve_labels) == 5 + 5
+
+    udibonos = test_object.off_curve["udibonos"]
+    assert udibonos["labels"] == ["3 Years", "10 Years", "30 Years"]
+    real = cpp_engine.udibono_price_to_yield([101.5] * 3, udibonos["dtms"], [8.5] * 3)
+    assert udibonos["values"] == real
+    assert udibonos["breakeven"][0] == pytest.approx(
+        curve_yields[curve_dtms.index(udibonos["dtms"][0])] - real[0], abs=1e-6
+    )
+
+    # margins of bonds priced above par are below the coupon rate
+    margins = test_object.off_curve["bondes_f"]["values"]
+    assert len(margins) == 2
+    assert all(m < 0 for m in margins)
+    assert "breakeven" not in test_object.off_curve["bondes_f"]
+
+
+def test_breakeven_skips_invalid_nominal_yields(monkeypatch):
+    registry = InstrumentRegistry(off_curve_groups(), {})
+    monkeypatch.setattr(FIdash.BanxicoDataFetcher, "REGISTRY", registry)
+    test_object = FIdash.BanxicoDataFetcher()
+    udibonos = registry.group("udibonos")
+
+    def series(role, values):
+        return [
+            {"idSerie": i.series[role], "datos": [{"dato": v}]}
+            for i, v in zip(udibonos.instruments, values)
+        ]
+
+    dtms = series("dtm", [1000, 2000, 3000])
+    reordered = {"udibonos": (None, dtms, None)}
+    ylds = {"udibonos": series("px", [4.0, 4.0, -1.0])}
+
+    # the nominal 2000 day point failed to solve and is interpolated over
+    off_curve = test_object.get_off_curve_data(
+        [udibonos], reordered, ylds, [500, 2000, 3500], [7.0, -1.0, 8.0]
+    )
+    assert off_curve["udibonos"]["breakeven"] == [
+        pytest.approx(7.0 + 500 / 3000 - 4.0, abs=1e-6),
+        pytest.approx(7.0 + 1500 / 3000 - 4.0, abs=1e-6),
+        None,
+    ]
+
+
+def test_peso_udibono_prices_are_converted_at_the_udi(monkeypatch):
+    config = registry_config(5)
+    config["groups"] += off_curve_groups(udibono_units="pesos")
+    registry = InstrumentRegistry(**config)
+    monkeypatch.setattr(FIdash.BanxicoDataFetcher, "REGISTRY", registry)
+    test_object = FIdash.BanxicoDataFetcher()
+
+    def fake_get(endpoint, url, **kwargs):
+        ids = url.split("/")[-3].split(",")
+        return FakeResponse([fake_series(registry, s) for s in ids])
+
+    # the summary answers 7.5 for every series, the UDI included
+    monkeypatch.setattr(test_object, "timed_get", fake_get)
+    test_object.fetch_data()
+
+    udibonos = test_object.off_curve["udibonos"]
+    real = cpp_engine.udibono_price_to_yield(
+        [101.5] * 3, udibonos["dtms"], [8.5] * 3, [7.5]
+    )
+    assert udibonos["values"] == real
+    assert real != cpp_engine.udibono_price_to_yield(
+        [101.5] * 3, udibonos["dtms"], [8.5] * 3
+    )
+
+
+def test_only_real_coupon_groups_are_quoted_in_udis():
+    config = registry_config(1)
+    config["groups"][1]["units"] = "udis"
+    with pytest.raises(ValueError):
+        InstrumentRegistry(**config)
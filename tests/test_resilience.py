@@ -0,0 +1,303 @@
+import math
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from src import FIdash
+from src.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimitedError,
+    ResilientSession,
+    TokenBucket,
+)
+from tests.test_FIdash import generate_random_API_responses
+
+# ----------------------------------------------
+# Helpers
+# ----------------------------------------------
+
+
+class FakeClock:
+    """Manually advanced clock, also usable as a sleep function."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ScriptedAdapter(BaseAdapter):
+    """Transport adapter returning scripted status codes or raising errors."""
+
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.timeouts = []
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        self.timeouts.append(kwargs.get("timeout"))
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        response = requests.Response()
+        response.status_code = outcome
+        response.request = request
+        response.url = request.url
+        response._content = b"{}"
+        return response
+
+    def close(self):
+        pass
+
+
+def make_session(outcomes, clock, **kwargs):
+    session = ResilientSession(sleep=clock.sleep, clock=clock, **kwargs)
+    adapter = ScriptedAdapter(outcomes)
+    session.mount("https://", adapter)
+    return session, adapter
+
+
+# ----------------------------------------------
+# Tests
+# ----------------------------------------------
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+    # burst up to capacity, then empty
+    assert all(bucket.try_acquire() == 0 for _ in range(3))
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+    # refills at the configured rate
+    clock.sleep(0.5)
+    assert bucket.try_acquire() == 0
+
+    # waits for a token only within the allowed time
+    assert not bucket.acquire(max_wait=0.1)
+    assert bucket.acquire(max_wait=1.0)
+    assert clock.now == pytest.approx(1.0)
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, capacity=1)
+
+
+def test_circuit_breaker_states():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, clock=clock)
+
+    # opens after consecutive failures
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    # half-opens after the recovery timeout and lets a single probe through
+    clock.sleep(10)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+    # a failed probe reopens the circuit
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # a successful probe closes it
+    clock.sleep(10)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_session_retries_with_backoff():
+    clock = FakeClock()
+    session, adapter = make_session(
+        [503, requests.exceptions.ConnectionError("reset"), 200],
+        clock,
+        max_retries=2,
+    )
+
+    response = session.get("https://example.test/series")
+
+    assert response.status_code == 200
+    assert adapter.calls == 3
+    # full jitter never exceeds the exponential backoff
+    assert 0 <= clock.now <= 0.25 + 0.5
+
+
+def test_session_honours_retry_after():
+    clock = FakeClock()
+    session, adapter = make_session([429, 200], clock, max_retries=1)
+
+    def send_with_retry_after(request, **kwargs):
+        response = ScriptedAdapter.send(adapter, request, **kwargs)
+        response.headers["Retry-After"] = "2"
+        return response
+
+    adapter.send = send_with_retry_after
+
+    assert session.get("https://example.test/series").status_code == 200
+    assert clock.now == 2
+
+
+def test_session_returns_last_response_when_retries_exhausted():
+    clock = FakeClock()
+    session, adapter = make_session([500, 500, 500], clock, max_retries=2)
+
+    response = session.get("https://example.test/series")
+
+    assert response.status_code == 500
+    assert adapter.calls == 3
+    with pytest.raises(requests.exceptions.HTTPError):
+        response.raise_for_status()
+
+
+def test_session_fails_fast_when_circuit_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30, clock=clock)
+    session, adapter = make_session(
+        [500, 500], clock, circuit_breaker=breaker, max_retries=5
+    )
+
+    # the breaker opens mid retries and stops them
+    with pytest.raises(CircuitOpenError):
+        session.get("https://example.test/series")
+    assert adapter.calls == 2
+
+    # later calls never reach the transport
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get("https://example.test/series")
+    assert adapter.calls == 2
+
+
+def test_unexpected_error_fails_half_open_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30, clock=clock)
+    session, adapter = make_session(
+        [500, requests.exceptions.ContentDecodingError("bad gzip"), 200],
+        clock,
+        circuit_breaker=breaker,
+        max_retries=0,
+    )
+
+    session.get("https://example.test/series")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # the probe fails with an error that is not retried, the circuit reopens
+    # rather than staying half-open with no probes left
+    clock.sleep(30)
+    with pytest.raises(requests.exceptions.ContentDecodingError):
+        session.get("https://example.test/series")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.sleep(30)
+    assert session.get("https://example.test/series").status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_session_retries_within_deadline():
+    clock = FakeClock()
+    session, adapter = make_session(
+        [503] * 10, clock, max_retries=10, backoff_base=1.0, backoff_cap=4.0
+    )
+
+    # retries stop before the backoff would run past the deadline, and the
+    # timeout of each attempt is cut to the time left
+    response = session.get(
+        "https://example.test/series", timeout=(3.05, 10), deadline=clock() + 5
+    )
+    assert response.status_code == 503
+    assert clock.now < 5
+    assert 1 <= adapter.calls < 10
+    assert adapter.timeouts[0] == (3.05, 5)
+    reads = [read for _, read in adapter.timeouts]
+    assert reads == sorted(reads, reverse=True) and reads[-1] == 5 - clock.now
+
+    # nothing is sent once the deadline has passed
+    calls = adapter.calls
+    with pytest.raises(requests.exceptions.Timeout):
+        session.get("https://example.test/series", deadline=clock() - 1)
+    assert adapter.calls == calls
+
+
+def test_rate_limited_probe_releases_its_slot():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30, clock=clock)
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+    session, adapter = make_session(
+        [500, 200],
+        clock,
+        circuit_breaker=breaker,
+        rate_limiter=bucket,
+        max_retries=0,
+        rate_limit_wait=0,
+    )
+
+    session.get("https://example.test/series")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # the probe is refused a token and never sent, so its slot is given back
+    bucket.tokens = 0.0
+    bucket.rate = 1e-9
+    clock.sleep(30)
+    with pytest.raises(RateLimitedError):
+        session.get("https://example.test/series")
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.half_open_calls == 0
+
+    # the next probe goes through and closes the circuit
+    bucket.tokens = 1.0
+    assert session.get("https://example.test/series").status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert adapter.calls == 2
+
+
+def test_session_rate_limited():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+    session, adapter = make_session(
+        [200, 200], clock, rate_limiter=bucket, rate_limit_wait=0
+    )
+
+    session.get("https://example.test/series")
+    with pytest.raises(RateLimitedError):
+        session.get("https://example.test/series")
+    assert adapter.calls == 1
+
+    # a single call may queue for the next token instead
+    start = clock()
+    response = session.get("https://example.test/series", rate_limit_wait=math.inf)
+    assert response.status_code == 200
+    assert adapter.calls == 2 and clock() - start == pytest.approx(1.0)
+
+
+def test_get_data_serves_stale_snapshot_on_upstream_failure(monkeypatch):
+    test_object = FIdash.BanxicoDataFetcher()
+    banxico_data = generate_random_API_responses(1)[0]
+
+    monkeypatch.setattr(test_object, "call_api", lambda: banxico_data)
+    snapshot = test_object.get_data()
+
+    def failing_call_api():
+        raise CircuitOpenError("open")
+
+    monkeypatch.setattr(test_object, "call_api", failing_call_api)
+    assert test_object.get_data() is snapshot
+
+    # without a previous snapshot the error propagates
+    test_object.latest = None
+    with pytest.raises(CircuitOpenError):
+        test_object.get_data()
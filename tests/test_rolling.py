@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+
+from src import app as app_module
+from src.history import HistoryStore, HistoryStoreCache
+from src.rolling import RollingAnalytics, window_days
+
+
+def reference_stats(values, row, window):
+
+    # the statistics of one row, straight from its window
+    levels = values[row + 1 - window : row + 1]
+    changes = np.diff(values[row - window : row + 1])
+    others = np.delete(levels, -1)
+    return {
+        "mean": levels.mean(),
+        "std": levels.std(),
+        "vol": 100 * changes.std() * np.sqrt(252),
+        "percentile": 100
+        * ((others < values[row]).sum() + 0.5 * (others == values[row]).sum())
+        / (window - 1),
+        "zscore": (values[row] - levels.mean()) / levels.std(),
+    }
+
+
+@pytest.mark.parametrize(
+    "spec, expected", [("63", 63), ("3M", 63), ("1y", 252), ("2W", 10)]
+)
+def test_window_days(spec, expected):
+    assert window_days(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["1D", "0", "3Q", "100Y"])
+def test_window_days_rejects(spec):
+    with pytest.raises(ValueError):
+        window_days(spec)
+
+
+def test_stats_match_reference(stub_history):
+    history, _ = stub_history
+    analytics = RollingAnalytics().update(history)
+
+    # windows run over the business days the tenor was quoted, not the
+    # weekend rows the UDI adds to the store
+    quoted = np.is_busday(analytics.dates)
+    assert not quoted.all()
+    np.testing.assert_array_equal(analytics.engine.observed("10 Years"), quoted)
+    values = analytics.engine.values[quoted, analytics.names.index("10 Years")]
+
+    stats = analytics.stats("10 Years", 21)
+    assert np.isnan(stats["mean"][~quoted]).all()
+    stats = {key: value[quoted] for key, value in stats.items()}
+
+    # the first full window needs 21 daily changes
+    assert np.isnan(stats["mean"][:21]).all()
+    for row in (21, 100, len(values) - 1):
+        expected = reference_stats(values, row, 21)
+        for key, value in expected.items():
+            assert stats[key][row] == pytest.approx(value, rel=1e-8, abs=1e-8)
+
+    with pytest.raises(ValueError):
+        analytics.stats("7 Years", 21)
+
+
+def test_appended_day_extends_cache(stub_history, copy_of, first_days):
+    history, new_days = stub_history
+    store = copy_of(history)
+    analytics = RollingAnalytics().update(store)
+
+    analytics.stats("10 Years", 21)
+    analytics.stats("10 Years", 63)
+    before = analytics.rows_computed
+
+    # cached, nothing to compute
+    analytics.stats("10 Years", 21)
+    assert analytics.rows_computed == before
+
+    store.merge(first_days(new_days, 2))
+    analytics.update(store)
+    stats = analytics.stats("10 Years", 21)
+    analytics.stats("10 Years", 63)
+
+    assert analytics.rows_computed == before + 2 * 2
+
+    fresh = RollingAnalytics().update(copy_of(store)).stats("10 Years", 21)
+    for key in stats:
+        np.testing.assert_allclose(stats[key], fresh[key], rtol=1e-9, equal_nan=True)
+
+
+def test_revision_invalidates_every_window(stub_history, copy_of):
+    history, _ = stub_history
+    analytics = RollingAnalytics().update(copy_of(history))
+    analytics.stats("5 Years", 21)
+    analytics.stats("5 Years", 63)
+
+    revised = copy_of(history)
+    revised.values[len(history) - 5, revised.columns["SF45450"]] += 0.5
+    revised = HistoryStore(revised.dates, revised.series_ids, revised.values)
+    analytics.update(revised)
+
+    # the first window to see the revision syncs the shared sums, the other
+    # still has to drop its stale rows
+    analytics.stats("5 Years", 21)
+    stats = analytics.stats("5 Years", 63)
+
+    fresh = RollingAnalytics().update(revised).stats("5 Years", 63)
+    for key in stats:
+        np.testing.assert_allclose(stats[key], fresh[key], rtol=1e-9, equal_nan=True)
+
+
+def test_api_rolling(monkeypatch, tmp_path, stub_history):
+    path = str(tmp_path / "history.npz")
+    monkeypatch.setattr(app_module, "history_cache", HistoryStoreCache(path))
+    monkeypatch.setattr(app_module, "rolling_analytics", None)
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        # no store yet
+        assert client.get("/api/rolling").status_code == 503
+
+        stub_history[0].save(path)
+        response = client.get("/api/rolling?series=2 Years&window=1M&start=3M")
+
+        assert response.status_code == 200
+        body = response.json
+        assert body["series"] == "2 Years"
+        assert body["window"] == 21
+        assert len(body["dates"]) == len(body["yields"]) == len(body["zscore"])
+        assert all(p is None or 0 <= p <= 100 for p in body["percentile"])
+
+        assert client.get("/api/rolling?series=7 Years").status_code == 400
+        assert client.get("/api/rolling?window=1D").status_code == 400
+
+
+def test_percentile_rank_matches_window_with_ties():
+    values = np.round(np.random.default_rng(7).normal(size=300), 1)
+    rows = np.arange(len(values))
+
+    ranks = RollingAnalytics.percentile_rank(values, rows, 50)
+    assert np.isnan(ranks[:49]).all()
+    for row in range(49, len(values)):
+        others = values[row - 49 : row]
+        expected = (
+            100
+            * ((others < values[row]).sum() + 0.5 * (others == values[row]).sum())
+            / 49
+        )
+        assert ranks[row] == pytest.approx(expected)
+
+
+def test_cache_evicts_least_recently_used(stub_history):
+    history, _ = stub_history
+    analytics = RollingAnalytics(maxsize=2).update(history)
+
+    analytics.stats("10 Years", 21)
+    analytics.stats("10 Years", 63)
+    analytics.stats("10 Years", 21)
+    analytics.stats("5 Years", 21)
+
+    assert list(analytics.cache) == [("10 Years", 21), ("5 Years", 21)]
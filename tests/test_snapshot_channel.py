@@ -0,0 +1,241 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+import requests
+
+from src import FIdash
+from src.registry import DEFAULT_INSTRUMENTS_PATH, InstrumentRegistry
+from src.snapshot_channel import SnapshotChannel
+from tests.test_FIdash import generate_random_API_responses
+from tests.test_registry import off_curve_groups
+
+
+@pytest.fixture
+def channel_path(tmp_path):
+    return str(tmp_path / "banxico_snapshot")
+
+
+def test_publish_and_read(channel_path):
+    channel = SnapshotChannel(channel_path)
+
+    # nothing published yet
+    assert channel.version() == 0
+    assert channel.read() is None
+
+    meta = {"labels": ["28 Days", "3 Years"], "dates": ["27/10/2025"] * 2}
+    version = channel.publish([7.0, 8.5], [28, 1092], meta, 123.0)
+
+    shared = channel.read()
+    assert version == shared.version == 1
+    assert shared.published_at == 123.0
+    assert shared.yields.tolist() == [7.0, 8.5]
+    assert shared.dtms.tolist() == [28, 1092]
+    assert shared.meta == meta
+
+    # columns are copied out, later publishes reusing the slot leave them alone
+    assert shared.yields.dtype == np.float64
+    channel.publish([1.0, 1.0], [1, 1], meta, 124.0)
+    channel.publish([2.0, 2.0], [2, 2], meta, 125.0)
+    assert shared.yields.tolist() == [7.0, 8.5]
+
+
+def test_read_skips_torn_and_corrupt_slots(channel_path):
+    channel = SnapshotChannel(channel_path)
+    channel.publish([7.0], [28], {"n": 1}, 1.0)
+    offset = channel.HEADER.size + channel.slot_size
+
+    # a slot mid-write (odd sequence) is never returned
+    channel.SEQUENCE.pack_into(channel.buffer, offset, 1)
+    assert channel.read() is None
+
+    # nor is one with unreadable metadata
+    channel.SEQUENCE.pack_into(channel.buffer, offset, 2)
+    meta_offset = offset + channel.SLOT_HEADER.size + 16
+    channel.buffer[meta_offset : meta_offset + 1] = b"}"
+    assert channel.read() is None
+
+
+def publish_forever(path, stop):
+    channel = SnapshotChannel(path)
+    k = 0
+    while not stop.is_set():
+        # publishes back to back, far more often than a real refresher
+        time.sleep(1e-4)
+        k += 1
+        channel.publish(
+            np.full(64, k), np.full(64, k), {"k": k, "pad": "x" * (k % 4096)}, k
+        )
+
+
+def test_concurrent_reads_are_consistent(channel_path):
+    ctx = multiprocessing.get_context("fork")
+    stop = ctx.Event()
+    SnapshotChannel(channel_path).publish([0.0], [0], {"k": 0, "pad": ""}, 0.0)
+    writer = ctx.Process(target=publish_forever, args=(channel_path, stop))
+    writer.start()
+
+    # every read matches a single publish while another process keeps writing
+    reader = SnapshotChannel(channel_path)
+    try:
+        versions = set()
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            shared = reader.read()
+            k = shared.meta["k"]
+            assert shared.published_at == k
+            assert (shared.yields == k).all() and (shared.dtms == k).all()
+            assert shared.meta["pad"] == "x" * (k % 4096)
+            versions.add(shared.version)
+    finally:
+        stop.set()
+        writer.join()
+
+    assert len(versions) > 1
+
+
+def test_publish_is_visible_across_mappings(channel_path):
+    writer = SnapshotChannel(channel_path)
+    reader = SnapshotChannel(channel_path)
+
+    writer.publish([1.0], [10], {"n": 1}, 1.0)
+    first = reader.read()
+    writer.publish([2.0], [20], {"n": 2}, 2.0)
+    second = reader.read()
+
+    # consecutive versions live in different slots
+    assert (first.version, second.version) == (1, 2)
+    assert first.yields.tolist() == [1.0]
+    assert second.yields.tolist() == [2.0]
+    assert second.meta == {"n": 2}
+
+
+def test_publish_rejects_oversized_snapshot(channel_path):
+    channel = SnapshotChannel(channel_path, slot_size=128)
+
+    with pytest.raises(ValueError):
+        channel.publish(np.zeros(100), np.zeros(100), {}, 0.0)
+
+    with pytest.raises(ValueError):
+        channel.publish([1.0, 2.0], [1], {}, 0.0)
+
+    assert channel.version() == 0
+
+
+def test_refresh_lock_is_exclusive(channel_path):
+    first = SnapshotChannel(channel_path)
+    second = SnapshotChannel(channel_path)
+
+    with first.refresh_lock() as first_acquired:
+        with second.refresh_lock() as second_acquired:
+            assert first_acquired
+            assert not second_acquired
+
+    # released once the refresher is done
+    with second.refresh_lock() as acquired:
+        assert acquired
+
+
+def test_fetchers_share_snapshot(channel_path, monkeypatch):
+    monkeypatch.setenv("BANXICO_SNAPSHOT_PATH", channel_path)
+    monkeypatch.setenv("BANXICO_SNAPSHOT_TTL", "60")
+
+    # the default instruments plus groups kept off the curve
+    with open(DEFAULT_INSTRUMENTS_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config["groups"] += off_curve_groups()
+    monkeypatch.setattr(
+        FIdash.BanxicoDataFetcher, "REGISTRY", InstrumentRegistry(**config)
+    )
+
+    banxico_data = generate_random_API_responses(1)[0]
+    calls = []
+
+    def mock_call_api():
+        calls.append(1)
+        return banxico_data
+
+    # two fetchers standing in for two worker processes
+    refresher = FIdash.BanxicoDataFetcher()
+    reader = FIdash.BanxicoDataFetcher()
+    monkeypatch.setattr(refresher, "call_api", mock_call_api)
+    monkeypatch.setattr(reader, "call_api", mock_call_api)
+
+    published = refresher.get_data()
+    adopted = reader.get_data()
+
+    # only one upstream fetch, the second fetcher reads the shared snapshot
+    assert len(calls) == 1
+    assert adopted == published
+    assert reader.shared_version == refresher.shared_version == 1
+
+    # the off-curve groups travel with the curve they were solved against
+    assert set(reader.off_curve) == {"udibonos", "bondes_f"}
+    assert reader.off_curve == refresher.off_curve
+
+    # a stale shared snapshot is refreshed by whichever fetcher gets the lock
+    channel = SnapshotChannel(channel_path)
+    shared = channel.read()
+    channel.publish(shared.yields, shared.dtms, shared.meta, time.time() - 120)
+    reader.latest = None
+
+    assert reader.get_data() == published
+    assert len(calls) == 2
+    assert channel.version() == 3
+
+    assert os.path.exists(channel_path + ".lock")
+
+
+def test_reader_waits_for_first_publish(channel_path, monkeypatch):
+    monkeypatch.setenv("BANXICO_SNAPSHOT_PATH", channel_path)
+    monkeypatch.setenv("BANXICO_SNAPSHOT_TTL", "60")
+    monkeypatch.setenv("BANXICO_RETRY_BUDGET", "5")
+
+    banxico_data = generate_random_API_responses(1)[0]
+    calls = []
+
+    def mock_call_api():
+        calls.append(1)
+        return banxico_data
+
+    refresher = FIdash.BanxicoDataFetcher()
+    reader = FIdash.BanxicoDataFetcher()
+    monkeypatch.setattr(refresher, "call_api", mock_call_api)
+    monkeypatch.setattr(reader, "call_api", mock_call_api)
+
+    # another worker holds the refresh lock and publishes a moment later
+    snapshot = refresher.fetch_snapshot()
+    channel = SnapshotChannel(channel_path)
+    with channel.refresh_lock() as acquired:
+        assert acquired
+        timer = threading.Timer(0.2, refresher.publish_snapshot, [snapshot])
+        timer.start()
+        adopted = reader.get_data()
+        timer.join()
+
+    # the reader adopted the publish instead of calling Banxico itself
+    assert len(calls) == 1
+    assert adopted == snapshot.data
+    assert reader.shared_version == 1
+
+
+def test_reader_wait_is_bounded(channel_path, monkeypatch):
+    monkeypatch.setenv("BANXICO_SNAPSHOT_PATH", channel_path)
+    monkeypatch.setenv("BANXICO_SNAPSHOT_TTL", "60")
+    monkeypatch.setenv("BANXICO_RETRY_BUDGET", "0.2")
+
+    reader = FIdash.BanxicoDataFetcher()
+    monkeypatch.setattr(reader, "call_api", lambda: generate_random_API_responses(1)[0])
+
+    # a refresher that never publishes
+    with SnapshotChannel(channel_path).refresh_lock():
+        with pytest.raises(requests.exceptions.Timeout):
+            reader.get_data()
+
+    # once it has given up the lock, the reader refreshes itself
+    assert reader.get_data() is not None
+    assert reader.shared_version == 1
@@ -0,0 +1,112 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src import FIdash
+from src.transport import PooledHTTPAdapter
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Minimal HTTP/1.1 handler that keeps connections open."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"bmx": {"series": []}}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(local_server):
+    session = requests.Session()
+    adapter = PooledHTTPAdapter(pool_connections=2, pool_maxsize=4)
+    session.mount("http://", adapter)
+
+    for _ in range(5):
+        assert session.get(local_server + "/series", timeout=(1, 1)).ok
+
+    stats = adapter.connection_stats()
+
+    # one connection (and handshake) for all five requests
+    assert stats["hosts"] == 1
+    assert stats["requests"] == 5
+    assert stats["connections"] == 1
+    assert stats["reused"] == 4
+    assert stats["reuse_ratio"] == pytest.approx(0.8)
+
+
+def test_connection_stats_empty():
+    stats = PooledHTTPAdapter().connection_stats()
+    assert stats == {
+        "hosts": 0,
+        "requests": 0,
+        "connections": 0,
+        "reused": 0,
+        "reuse_ratio": 0.0,
+    }
+
+
+def test_fetcher_session_configuration(monkeypatch):
+    monkeypatch.setenv("BANXICO_POOL_SIZE", "16")
+    monkeypatch.setenv("BANXICO_CONNECT_TIMEOUT", "2")
+    monkeypatch.setenv("BANXICO_READ_TIMEOUT", "20")
+
+    test_object = FIdash.BanxicoDataFetcher()
+    headers = test_object.session.headers
+
+    # default headers are kept alongside the Banxico ones
+    assert "User-Agent" in headers
+    assert headers["Bmx-Token"] == test_object.api_key
+    assert headers["Accept"] == "application/json"
+    assert "gzip" in headers["Accept-Encoding"]
+
+    # pooled adapter mounted for both schemes, split timeouts
+    assert test_object.session.get_adapter("https://x") is test_object.adapter
+    assert test_object.session.get_adapter("http://x") is test_object.adapter
+    assert test_object.adapter._pool_maxsize == 16
+    assert test_object.timeout == (2.0, 20.0)
+
+
+def test_fork_rebuilds_pool_and_sessions(local_server):
+    test_object = FIdash.BanxicoDataFetcher()
+    assert test_object.session.get(local_server + "/series", timeout=(1, 1)).ok
+    adapter, session = test_object.adapter, test_object.session
+
+    # the child checks its own state and reports through the exit status
+    pid = os.fork()
+    if pid == 0:
+        ok = (
+            test_object.adapter is not adapter
+            and test_object.adapter.connection_stats()["connections"] == 0
+            and test_object.session is not session
+            and test_object.session.get_adapter("https://x") is test_object.adapter
+            and test_object.refresh_lock.acquire(blocking=False)
+        )
+        os._exit(0 if ok else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    # the parent keeps its pool
+    assert test_object.adapter is adapter
+    assert test_object.session is session
+    assert adapter.connection_stats()["connections"] == 1
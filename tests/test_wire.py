@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from werkzeug.datastructures import MIMEAccept
+
+from src import app as app_module
+from src import wire
+from src.history import HistoryStoreCache
+from tests.test_history import recorded_store
+
+
+def columns():
+    return {
+        "dates": np.arange("2025-01-01", "2025-01-06", dtype="datetime64[D]"),
+        "yields": np.array([9.1, np.nan, 9.3, 9.25, 9.2]),
+        "dtms": np.arange(10, dtype=float).reshape(5, 2),
+    }
+
+
+@pytest.mark.parametrize("media_type", [wire.NPZ, wire.MSGPACK, wire.ARROW])
+def test_round_trip(media_type):
+    if media_type not in wire.available_formats():
+        pytest.skip(f"{media_type} support is not installed")
+
+    payload = wire.encode(columns(), {"latest": "2025-01-05"}, media_type)
+    decoded, meta = wire.decode(payload, media_type)
+
+    assert meta == {"latest": "2025-01-05"}
+    for name, values in columns().items():
+        np.testing.assert_array_equal(decoded[name], values)
+
+
+@pytest.mark.parametrize(
+    "accept, media_type",
+    [
+        ([], wire.JSON),
+        ([("*/*", 1)], wire.JSON),
+        ([("text/html", 1), ("*/*", 0.8)], wire.JSON),
+        ([("application/x-npz", 1), ("application/json", 0.5)], wire.NPZ),
+        ([("application/x-parquet", 1)], None),
+    ],
+)
+def test_negotiate(accept, media_type):
+    assert wire.negotiate(MIMEAccept(accept)) == media_type
+
+
+def test_binary_routes_match_json(monkeypatch, tmp_path):
+    path = str(tmp_path / "history.npz")
+    recorded_store().save(path)
+    monkeypatch.setattr(app_module, "history_cache", HistoryStoreCache(path))
+    monkeypatch.setattr(app_module, "derived_engine", None)
+    monkeypatch.setattr(app_module, "rolling_analytics", None)
+
+    npz = {"Accept": wire.NPZ}
+
+    app_module.app.testing = True
+    with app_module.app.test_client() as client:
+        url = "/api/derived?series=2s10s,Real10Y&start=2025-10-20"
+        as_json = client.get(url).json
+        response = client.get(url, headers=npz)
+
+        assert response.content_type == wire.NPZ
+        assert "Accept" in response.headers["Vary"]
+        decoded, meta = wire.decode(response.data, wire.NPZ)
+        assert meta["units"] == {"2s10s": "bp", "Real10Y": "%"}
+        assert [str(d) for d in decoded["dates"]] == as_json["dates"]
+        np.testing.assert_allclose(
+            decoded["2s10s"], as_json["series"]["2s10s"]["values"], atol=1e-4
+        )
+
+        url = "/api/curves?dates=latest,1W"
+        as_json = client.get(url).json
+        decoded, meta = wire.decode(client.get(url, headers=npz).data, wire.NPZ)
+        assert meta["labels"] == as_json["curves"][0]["labels"]
+        assert decoded["yields"].shape == (2, len(meta["labels"]))
+        np.testing.assert_allclose(
+            decoded["yields"][1], as_json["curves"][1]["yields"], atol=1e-6
+        )
+
+        url = "/api/rolling?series=10 Years&window=5&start=2025-10-01"
+        decoded, meta = wire.decode(client.get(url, headers=npz).data, wire.NPZ)
+        assert meta["window"] == 5
+        assert set(decoded) == {
+            "dates",
+            "yields",
+            "mean",
+            "std",
+            "vol",
+            "percentile",
+            "zscore",
+        }
+
+        response = client.get(url, headers={"Accept": "application/x-parquet"})
+        assert response.status_code == 406
@@ -0,0 +1,56 @@
+import cpp_engine
+from benchmarks.conftest import generate_bonds
+from src.metrics import YIELD_MEMO_LOOKUPS
+from src.yield_memo import YieldMemo
+
+
+def counting(monkeypatch):
+    calls = []
+    price_to_yield_iterations = cpp_engine.price_to_yield_iterations
+
+    def solver(pxs, dtms, coups):
+        calls.append(len(pxs))
+        return price_to_yield_iterations(pxs, dtms, coups)
+
+    monkeypatch.setattr(cpp_engine, "price_to_yield_iterations", solver)
+    return calls
+
+
+def test_repeated_solves_are_lookups(monkeypatch):
+    calls = counting(monkeypatch)
+    pxs, dtms, coups = generate_bonds(20)
+    memo = YieldMemo()
+    hits_before = YIELD_MEMO_LOOKUPS.value(result="hit")
+
+    ylds = memo.price_to_yield(pxs, dtms, coups)
+    assert ylds == cpp_engine.price_to_yield(pxs, dtms, coups)
+    assert calls == [20]
+
+    # same bonds, plus inputs that round to an already solved bond
+    again = memo.price_to_yield(
+        pxs + [pxs[0] + 1e-8], dtms + [float(dtms[0])], coups + [coups[0] + 1e-4]
+    )
+    assert again == ylds + [ylds[0]]
+    assert calls == [20]
+    assert memo.hit_rate == 21 / 41
+    assert YIELD_MEMO_LOOKUPS.value(result="hit") == hits_before + 21
+
+    # only the new bond of a batch is solved, duplicates once
+    memo.price_to_yield([101.5, 101.5] + pxs[:3], [1000, 1000] + dtms[:3], [8.5] * 5)
+    assert calls == [20, 4]
+
+
+def test_least_recently_used_bonds_are_evicted(monkeypatch):
+    calls = counting(monkeypatch)
+    pxs, dtms, coups = generate_bonds(3)
+    memo = YieldMemo(maxsize=2)
+
+    memo.price_to_yield(pxs[:2], dtms[:2], coups[:2])
+    memo.price_to_yield(pxs[:1], dtms[:1], coups[:1])
+    memo.price_to_yield(pxs[2:], dtms[2:], coups[2:])
+    assert len(memo) == 2
+
+    # the second bond was least recently used
+    memo.price_to_yield(pxs[:1], dtms[:1], coups[:1])
+    memo.price_to_yield(pxs[1:2], dtms[1:2], coups[1:2])
+    assert calls == [2, 1, 1]